@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Answer keys of many variants: one CSV and one JSON file written by
+answerkey.write_answer_keys against the correction PDFs (one is
+rendered, the total is estimated from it).
+
+Usage: PYTHONPATH=src/ python3 benchmarks/bench_answer_key.py [questions] [variants]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+import batch
+from answerkey import write_answer_keys
+from exam import Exam, MultiChoiceQuest, MultiChoiceAnswer
+from parameter import get_default
+from permutation import PermutationEngine
+
+
+def synthetic_exam(questions: int) -> Exam:
+    exam = Exam()
+    for number in range(questions):
+        question = MultiChoiceQuest(f"question {number}", f"subject {number % 10}")
+        question.answers = [
+            MultiChoiceAnswer(f"answer {number}.{option}") for option in range(4)
+        ]
+        exam.add_question(question)
+    return exam
+
+
+def main(questions: int, variants: int) -> None:
+    exam = synthetic_exam(questions)
+    engine = PermutationEngine(exam, "benchmark")
+    parameters = get_default()
+    with tempfile.TemporaryDirectory() as folder:
+        seconds = {}
+        for suffix in ("csv", "json"):
+            start = time.perf_counter()
+            write_answer_keys(
+                Path(folder) / f"key.{suffix}",
+                engine,
+                variants,
+                lambda number: f"Exam_{number}.pdf",
+            )
+            seconds[suffix] = time.perf_counter() - start
+
+        documents = batch.variant_documents(engine.variant(0), 0, parameters)
+        start = time.perf_counter()
+        batch.write_documents(documents[1:], Path(folder))
+        seconds["pdf"] = (time.perf_counter() - start) * variants
+
+    print(f"questions: {questions}, variants: {variants}")
+    print(f"CSV answer key:        {seconds['csv']:8.2f} s")
+    print(f"JSON answer key:       {seconds['json']:8.2f} s")
+    print(f"correction PDFs (est): {seconds['pdf']:8.2f} s")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 500,
+    )
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Variants of an exam served as a zip archive: PDF files written in a
+temporary folder, read back and archived, or written by
+batch.write_archive straight to the archive, that is written to a
+non-seekable stream as a socket is. Time and bytes written on disk.
+
+Usage: PYTHONPATH=src/ python3 benchmarks/bench_archive.py [questions] [variants]
+"""
+
+import io
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+import batch
+from exam import Exam, MultiChoiceQuest, MultiChoiceAnswer
+from parameter import get_default
+
+
+class Socket(io.RawIOBase):
+    """Count and drop the bytes written, as a socket sending them."""
+
+    def __init__(self):
+        self.sent = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.sent += len(data)
+        return len(data)
+
+
+def synthetic_exam(questions: int) -> Exam:
+    exam = Exam()
+    for number in range(questions):
+        question = MultiChoiceQuest(f"question {number} " * 10, "subject")
+        question.answers = [
+            MultiChoiceAnswer(f"answer {number}.{option}") for option in range(4)
+        ]
+        exam.add_question(question)
+    return exam
+
+
+def on_disk(exam: Exam, parameters, socket: Socket) -> int:
+    with tempfile.TemporaryDirectory() as folder:
+        output = batch.generate(exam, parameters, Path(folder))
+        files = [file for group in output for file in group]
+        written = sum(file.stat().st_size for file in files)
+        with zipfile.ZipFile(socket, "w") as zip_file:
+            for file in files:
+                zip_file.writestr(file.name, file.read_bytes())
+    return written
+
+
+def in_memory(exam: Exam, parameters, socket: Socket) -> int:
+    batch.write_archive(exam, parameters, socket)
+    return 0
+
+
+def main(questions: int, variants: int) -> None:
+    print(f"questions: {questions}, variants: {variants}")
+    exam = synthetic_exam(questions)
+    parameters = get_default()
+    parameters["number"] = variants
+    parameters["seed"] = "benchmark"
+    parameters["workers"] = 1
+    for label, serve in (("on disk", on_disk), ("in memory", in_memory)):
+        socket = Socket()
+        start = time.perf_counter()
+        written = serve(exam, parameters, socket)
+        seconds = time.perf_counter() - start
+        print(
+            f"{label:10} {seconds:8.2f} s, sent {socket.sent / 2**10:9.1f} KiB, "
+            f"on disk {written / 2**10:9.1f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20,
+    )
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Responsiveness of an asyncio event loop converting a CSV file: worst
+delay of a 10 ms ticker while batch.convert is called on the loop, and
+while aiobatch.AsyncConverter converts it.
+
+Usage: PYTHONPATH=src/ python3 benchmarks/bench_async.py [questions] [variants]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+import aiobatch
+import batch
+from parameter import get_default
+
+TICK = 0.01
+
+
+async def ticker(stop: asyncio.Event) -> float:
+    """Return the worst delay of the ticks until stop is set."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        worst = max(worst, time.perf_counter() - start - TICK)
+    return worst
+
+
+async def measure(convert) -> tuple:
+    stop = asyncio.Event()
+    ticks = asyncio.ensure_future(ticker(stop))
+    await asyncio.sleep(TICK)
+    start = time.perf_counter()
+    await convert()
+    seconds = time.perf_counter() - start
+    stop.set()
+    return seconds, await ticks
+
+
+def main(questions: int, variants: int) -> None:
+    with tempfile.TemporaryDirectory() as folder:
+        input_file = Path(folder) / "questions.csv"
+        rows = ["question,subject,image,void,A,B,C,D"]
+        rows += [f"Q{number},S1,,,a,b,c,d" for number in range(questions)]
+        input_file.write_text("\n".join(rows))
+        parameters = {"number": variants, "seed": "benchmark"}
+
+        async def blocking():
+            complete = get_default()
+            complete.update(parameters, delimiter=",")
+            (Path(folder) / "blocking").mkdir()
+            batch.convert(input_file, complete, Path(folder) / "blocking")
+
+        async def offloaded():
+            async with aiobatch.AsyncConverter() as converter:
+                await converter.convert(
+                    input_file, parameters, Path(folder) / "offloaded"
+                )
+
+        print(f"questions: {questions}, variants: {variants}")
+        for label, convert in (("on the loop", blocking), ("aiobatch", offloaded)):
+            seconds, worst = asyncio.run(measure(convert))
+            print(
+                f"{label:12} {seconds:8.2f} s, worst tick delay {worst * 1000:8.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10,
+    )
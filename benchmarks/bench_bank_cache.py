@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Time batch.load_exam on a synthetic CSV bank: parsing the CSV (and
+writing the bank cache) against reading the questions back from the
+cache, whose size is reported too.
+
+Usage: PYTHONPATH=src/ python3 benchmarks/bench_bank_cache.py [rows] [runs]
+"""
+
+import csv
+import sys
+import tempfile
+import time
+from pathlib import Path
+import batch
+from parameter import get_default
+
+
+def synthetic_csv(file_name: Path, rows: int) -> None:
+    with open(file_name, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["question", "subject", "image", "void", "A", "B", "C", "D"])
+        for index in range(rows):
+            image = "image.png" if index % 10 == 0 else ""
+            answers = [f"answer {index}.{option}" for option in "ABCD"]
+            writer.writerow(
+                [f"question {index}", f"subject {index % 10}", image, ""] + answers
+            )
+
+
+def main(rows: int, runs: int) -> None:
+    parameters = get_default()
+    parameters["delimiter"] = ","
+    with tempfile.TemporaryDirectory() as folder:
+        input_file = Path(folder) / "bank.csv"
+        synthetic_csv(input_file, rows)
+        cache_file = Path(folder) / batch.BANK_CACHE_NAME
+
+        parse = float("inf")
+        cached = float("inf")
+        for _ in range(runs):
+            cache_file.unlink(missing_ok=True)
+            start = time.perf_counter()
+            batch.load_exam(input_file, parameters, Path(folder))
+            parse = min(parse, time.perf_counter() - start)
+            start = time.perf_counter()
+            batch.load_exam(input_file, parameters, Path(folder))
+            cached = min(cached, time.perf_counter() - start)
+
+        print(
+            f"rows: {rows}, CSV {input_file.stat().st_size / 2**20:.1f} MiB, "
+            f"cache {cache_file.stat().st_size / 2**20:.1f} MiB"
+        )
+    print(f"CSV parsed:    {parse * 1e3:9.1f} ms")
+    print(f"cache read:    {cached * 1e3:9.1f} ms")
+    print(f"speed up: {parse / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 3,
+    )
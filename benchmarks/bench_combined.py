@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Variants of an exam with images written one file each, in two combined
+files ("variants") and in one interleaved file: time and total size.
+
+Usage: PYTHONPATH=src/ python3 benchmarks/bench_combined.py [questions] [variants]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+import batch
+from exam import Exam, MultiChoiceQuest, MultiChoiceAnswer
+from parameter import get_default
+
+IMAGES = sorted(Path("tests/unit/resources").glob("*.png"))
+
+
+def synthetic_exam(questions: int) -> Exam:
+    exam = Exam()
+    for number in range(questions):
+        question = MultiChoiceQuest(
+            f"question {number}",
+            f"subject {number % 10}",
+            IMAGES[number % len(IMAGES)].resolve(),
+        )
+        question.answers = [
+            MultiChoiceAnswer(f"answer {number}.{option}") for option in range(4)
+        ]
+        exam.add_question(question)
+    return exam
+
+
+def main(questions: int, variants: int) -> None:
+    exam = synthetic_exam(questions)
+    print(f"questions: {questions}, variants: {variants}")
+    for combine in batch.COMBINE_MODES:
+        parameters = get_default()
+        parameters["number"] = variants
+        parameters["workers"] = 1
+        parameters["seed"] = "benchmark"
+        parameters["combine"] = combine
+        with tempfile.TemporaryDirectory() as folder:
+            start = time.perf_counter()
+            output = batch.generate(exam, parameters, Path(folder))
+            seconds = time.perf_counter() - start
+            files = {file for files in output for file in files}
+            size = sum(file.stat().st_size for file in files)
+        print(
+            f"{combine or 'separate':12} {len(files):5d} files "
+            f"{size / 1024:10.1f} KiB {seconds:8.2f} s"
+        )
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 50,
+    )
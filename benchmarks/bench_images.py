@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Exams whose questions have camera sized photos, written with the
+images embedded as they are and resampled by imageprep.ImagePipeline
+(first run, converting the images, and second run, reading the cached
+ones): time and total size of the PDF files.
+
+Usage: PYTHONPATH=src/ python3 benchmarks/bench_images.py [photos] [variants] [dpi]
+"""
+
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from PIL import Image, ImageFilter
+import batch
+from exam import Exam, MultiChoiceQuest, MultiChoiceAnswer
+from parameter import get_default
+
+
+def synthetic_photo(file_name: Path, number: int) -> None:
+    """A 12 megapixel JPEG: smoothed noise, compressing as a photo does."""
+    rng = random.Random(number)
+    noise = Image.frombytes("RGB", (400, 300), rng.randbytes(400 * 300 * 3))
+    noise = noise.filter(ImageFilter.GaussianBlur(2))
+    noise.resize((4000, 3000), Image.BICUBIC).save(file_name, quality=92)
+
+
+def synthetic_exam(photos: Path, count: int) -> Exam:
+    exam = Exam()
+    for number in range(count):
+        image = photos / f"photo_{number}.jpg"
+        if not image.exists():
+            synthetic_photo(image, number)
+        question = MultiChoiceQuest(f"question {number}", "subject", image)
+        question.answers = [
+            MultiChoiceAnswer(f"answer {number}.{option}") for option in range(4)
+        ]
+        exam.add_question(question)
+    return exam
+
+
+def run(photos: Path, count: int, parameters, output: Path) -> None:
+    exam = synthetic_exam(photos, count)
+    for label in ("first run", "second run"):
+        start = time.perf_counter()
+        batch.prepare_images(exam, parameters, output)
+        prepared = time.perf_counter() - start
+        for pdf_file in output.glob("*.pdf"):
+            pdf_file.unlink()
+        batch.generate(exam, parameters, output)
+        seconds = time.perf_counter() - start
+        size = sum(file.stat().st_size for file in output.glob("*.pdf"))
+        print(
+            f"dpi {parameters['image_dpi']:4} {label:10} {size / 2**20:9.2f} MiB "
+            f"{seconds:8.2f} s (images {prepared:.2f} s)"
+        )
+        if not int(parameters["image_dpi"]):
+            break
+        exam = synthetic_exam(photos, count)
+
+
+def main(count: int, variants: int, dpi: int) -> None:
+    print(f"photos: {count}, variants: {variants}")
+    with tempfile.TemporaryDirectory() as folder:
+        photos = Path(folder) / "photos"
+        photos.mkdir()
+        for image_dpi in (0, dpi):
+            parameters = get_default()
+            parameters["number"] = variants
+            parameters["seed"] = "benchmark"
+            parameters["image_dpi"] = image_dpi
+            output = Path(folder) / f"output_{image_dpi}"
+            output.mkdir()
+            run(photos, count, parameters, output)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 150,
+    )
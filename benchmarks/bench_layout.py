@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Peak memory and time of RLInterface.build laying out all the items at
+once ("whole") against laying them out while SerializeExam yields them
+("stream"), for exams of growing size. Peak memory is measured with
+tracemalloc, which slows both down.
+
+Usage: PYTHONPATH=src/ python3 benchmarks/bench_layout.py [questions,...]
+"""
+
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Tuple
+from exam import Exam, MultiChoiceQuest, MultiChoiceAnswer
+from export import SerializeExam, RLInterface
+
+
+def synthetic_exam(questions: int) -> Exam:
+    exam = Exam()
+    for number in range(questions):
+        question = MultiChoiceQuest(f"question {number} " * 10, f"subject {number}")
+        question.answers = [
+            MultiChoiceAnswer(f"answer {number}.{option} " * 3) for option in range(4)
+        ]
+        exam.add_question(question)
+    return exam
+
+
+def build(exam: Exam, layout: str, folder: Path) -> Tuple[float, float]:
+    """Return seconds and peak MiB of a build."""
+    interface = RLInterface(
+        SerializeExam(exam).assignment(),
+        Path(f"{layout}.pdf"),
+        destination=folder,
+        layout=layout,
+    )
+    tracemalloc.start()
+    start = time.perf_counter()
+    interface.build()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main(sizes: Tuple[int, ...]) -> None:
+    print(f"{'questions':>10} {'layout':>7} {'seconds':>8} {'peak MiB':>9}")
+    with tempfile.TemporaryDirectory() as folder:
+        for questions in sizes:
+            exam = synthetic_exam(questions)
+            for layout in ("whole", "stream"):
+                seconds, peak = build(exam, layout, Path(folder))
+                print(f"{questions:>10} {layout:>7} {seconds:8.2f} {peak:9.1f}")
+
+
+if __name__ == "__main__":
+    main(tuple(map(int, sys.argv[1].split(","))) if len(sys.argv) > 1 else (500, 2000))
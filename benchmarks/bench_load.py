@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Rows per second loaded by Exam.load, with the loaders compiled for
+each question type and selector, against load_sequentially called on
+each row (the loading before compiled loaders). Rows are dictionaries,
+as read by CSVReader, with the columns of batch.ATTRIBUTE_SELECTOR.
+
+Usage: PYTHONPATH=src/ python3 benchmarks/bench_load.py [rows] [runs]
+"""
+
+import sys
+import time
+from typing import Dict, List, Callable
+from batch import ATTRIBUTE_SELECTOR
+from exam import Exam, MultiChoiceQuest, _sequential_row_loader
+
+
+def synthetic_rows(number: int) -> List[Dict[str, str]]:
+    return [
+        {
+            "question": f"question {index}",
+            "subject": f"subject {index % 10}",
+            "image": "image.png" if index % 10 == 0 else "",
+            "void": "",
+            "A": f"answer {index}.A",
+            "B": f"answer {index}.B",
+            "C": f"answer {index}.C",
+            "D": "" if index % 4 == 0 else f"answer {index}.D",
+        }
+        for index in range(number)
+    ]
+
+
+def compiled(rows: List[Dict[str, str]]) -> Exam:
+    exam = Exam()
+    exam.attribute_selector = ATTRIBUTE_SELECTOR
+    exam.load(rows)
+    return exam
+
+
+def sequential(rows: List[Dict[str, str]]) -> Exam:
+    exam = Exam()
+    load_row = _sequential_row_loader(MultiChoiceQuest, ATTRIBUTE_SELECTOR)
+    for row in rows:
+        exam.add_question(load_row(row))
+    return exam
+
+
+def rows_per_second(load: Callable, rows: List[Dict[str, str]], runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        load(rows)
+        best = min(best, time.perf_counter() - start)
+    return len(rows) / best
+
+
+def main(number: int, runs: int) -> None:
+    rows = synthetic_rows(number)
+    assert str(compiled(rows[:100])) == str(sequential(rows[:100]))
+    before = rows_per_second(sequential, rows, runs)
+    after = rows_per_second(compiled, rows, runs)
+
+    print(f"rows: {number}")
+    print(f"load_sequentially: {before:12,.0f} rows/s")
+    print(f"compiled loader:   {after:12,.0f} rows/s")
+    print(f"speed up: {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 3,
+    )
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Memory taken by a synthetic bank of multi choice questions,
+four answers each, measured with tracemalloc.
+
+Usage: PYTHONPATH=src/ python3 benchmarks/bench_memory.py [questions]
+"""
+
+import sys
+import tracemalloc
+from pathlib import Path
+from exam import Exam, MultiChoiceQuest, MultiChoiceAnswer
+
+
+def synthetic_bank(questions: int) -> Exam:
+    bank = Exam()
+    for number in range(questions):
+        question = MultiChoiceQuest(f"question {number}", f"subject {number % 10}")
+        question.answers = [
+            MultiChoiceAnswer(f"answer {number}.{letter}") for letter in "ABCD"
+        ]
+        bank.add_question(question)
+    return bank
+
+
+def main(questions: int) -> None:
+    Path()  # interned default image, outside the measure
+    tracemalloc.start()
+    bank = synthetic_bank(questions)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"questions: {len(bank.questions)}")
+    print(
+        f"current: {current / 2 ** 20:8.1f} MiB ({current / questions:.0f} B/question)"
+    )
+    print(f"peak:    {peak / 2 ** 20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Time and peak memory of PDFDoc.build with page info added by replaying
+all the pages at the end ("replay") and by a form for each page ("form").
+
+Usage: PYTHONPATH=src/ python3 benchmarks/bench_page_numbering.py [pages]
+"""
+
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from pathlib import Path
+from rlwrapper import PDFDoc
+
+Item = namedtuple("Item", ["text", "image"])
+
+# about an item on an A4 page
+ITEM_TEXT = "question text " * 150
+
+
+def build(file_name: Path, pages: int, page_numbering: str, traced: bool) -> float:
+    """Return seconds of a build, or peak MiB if traced."""
+    doc = PDFDoc(file_name)
+    for _ in range(pages):
+        doc.add_item(Item(ITEM_TEXT, Path(".")))
+
+    if traced:
+        tracemalloc.start()
+    start = time.perf_counter()
+    doc.build(page_numbering)
+    elapsed = time.perf_counter() - start
+    if not traced:
+        return elapsed
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def main(pages: int) -> None:
+    print(f"pages: about {pages}")
+    with tempfile.TemporaryDirectory() as folder:
+        for page_numbering in ("replay", "form"):
+            file_name = Path(folder) / f"{page_numbering}.pdf"
+            elapsed = build(file_name, pages, page_numbering, traced=False)
+            size = file_name.stat().st_size / 2**20
+            peak = build(file_name, pages, page_numbering, traced=True)
+            print(
+                f"{page_numbering:>6}: {elapsed:6.2f} s, peak {peak:6.1f} MiB,"
+                f" file {size:5.2f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Cost of shuffling the variants of an exam: a copy of the exam shuffled
+in place (copy.deepcopy and Exam.shuffle) against PermutationEngine, both
+the index arrays alone and the variant Exam built from them. The memory
+of a permutation is reported too.
+
+Usage: PYTHONPATH=src/ python3 benchmarks/bench_permutation.py [questions] [variants]
+"""
+
+import copy
+import random
+import sys
+import time
+from typing import Callable
+from exam import Exam, MultiChoiceQuest, MultiChoiceAnswer
+from permutation import PermutationEngine
+
+
+def synthetic_exam(questions: int) -> Exam:
+    exam = Exam()
+    for number in range(questions):
+        question = MultiChoiceQuest(f"question {number}", f"subject {number % 10}")
+        question.answers = [
+            MultiChoiceAnswer(f"answer {number}.{option}") for option in range(4)
+        ]
+        exam.add_question(question)
+    return exam
+
+
+def per_variant(build: Callable[[int], object], variants: int) -> float:
+    """Mean milliseconds per variant."""
+    start = time.perf_counter()
+    for number in range(variants):
+        build(number)
+    return (time.perf_counter() - start) / variants * 1e3
+
+
+def deepcopy_shuffle(exam: Exam, number: int) -> Exam:
+    random.seed(f"benchmark:{number}")
+    variant = copy.deepcopy(exam)
+    variant.shuffle()
+    return variant
+
+
+def main(questions: int, variants: int) -> None:
+    exam = synthetic_exam(questions)
+    engine = PermutationEngine(exam, "benchmark")
+    results = (
+        ("deepcopy + Exam.shuffle", lambda n: deepcopy_shuffle(exam, n)),
+        ("PermutationEngine.permutation", engine.permutation),
+        ("PermutationEngine.variant", engine.variant),
+    )
+
+    print(f"questions: {questions}, variants: {variants}")
+    for name, build in results:
+        print(f"{name:>30}: {per_variant(build, variants):9.2f} ms/variant")
+    permutation = engine.permutation(0)
+    size = sum(
+        len(column) * column.itemsize
+        for column in (permutation.order, permutation.correct)
+    )
+    print(f"{'index arrays':>30}: {size / 1024:9.1f} KiB/variant")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10,
+    )
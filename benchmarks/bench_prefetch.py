@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Variants of an exam whose questions have distinct images, written with
+a cold image cache: images read and decoded while laid out, or
+prefetched by a pool of threads (see rlwrapper.ImageCache.prefetch).
+
+Usage: PYTHONPATH=src/ python3 benchmarks/bench_prefetch.py [images] [variants]
+"""
+
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from PIL import Image, ImageFilter
+import batch
+from exam import Exam, MultiChoiceQuest, MultiChoiceAnswer
+from parameter import get_default
+from rlwrapper import IMAGE_CACHE
+
+
+def synthetic_exam(folder: Path, images: int) -> Exam:
+    exam = Exam()
+    for number in range(images):
+        rng = random.Random(number)
+        noise = Image.frombytes("RGB", (100, 75), rng.randbytes(100 * 75 * 3))
+        image = folder / f"image_{number}.png"
+        noise.filter(ImageFilter.GaussianBlur(1)).resize((800, 600)).save(image)
+        question = MultiChoiceQuest(f"question {number}", "subject", image)
+        question.answers = [
+            MultiChoiceAnswer(f"answer {number}.{option}") for option in range(4)
+        ]
+        exam.add_question(question)
+    return exam
+
+
+def main(images: int, variants: int) -> None:
+    print(f"images: {images}, variants: {variants}")
+    with tempfile.TemporaryDirectory() as folder:
+        exam = synthetic_exam(Path(folder), images)
+        for prefetch in (False, True):
+            parameters = get_default()
+            parameters["number"] = variants
+            parameters["seed"] = "benchmark"
+            output = Path(folder) / f"output_{prefetch}"
+            output.mkdir()
+            IMAGE_CACHE.clear()
+            start = time.perf_counter()
+            if prefetch:
+                batch.prefetch_images(exam.images())
+            batch.generate(exam, parameters, output)
+            seconds = time.perf_counter() - start
+            label = "prefetched" if prefetch else "on layout"
+            print(f"{label:10} {seconds:8.2f} s")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 40,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+    )
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Startup cost of the entry points and of the main modules, measured
+by python -X importtime in a fresh interpreter: total import time and
+whether ReportLab and tkinter are loaded. The wall time of
+cli.py --version is measured too.
+
+Usage: python3 benchmarks/bench_startup.py [runs]
+"""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Tuple
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+MODULES = ("cli", "quest2pdf", "batch", "export", "rlwrapper")
+
+
+def import_time(module: str) -> Tuple[float, bool, bool]:
+    """Return milliseconds to import module, with the interpreter startup,
+    and whether ReportLab and tkinter have been imported.
+    """
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    imported = set()
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        imported.add(name.strip())
+        # top level imports are not indented
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+    return total / 1000, "reportlab" in imported, "tkinter" in imported
+
+
+def version_time() -> float:
+    """Milliseconds taken by cli.py --version."""
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "cli.py", "--version"],
+        cwd=SRC,
+        capture_output=True,
+        check=True,
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+def main(runs: int) -> None:
+    print(f"{'module':>10} {'import ms':>10} {'reportlab':>10} {'tkinter':>8}")
+    for module in MODULES:
+        results = [import_time(module) for _ in range(runs)]
+        best = min(result[0] for result in results)
+        _, reportlab, tkinter = results[0]
+        print(f"{module:>10} {best:10.1f} {reportlab!s:>10} {tkinter!s:>8}")
+    best = min(version_time() for _ in range(runs))
+    print(f"cli.py --version: {best:.1f} ms wall")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Per item cost of PDFDoc._build_item with a Style built for every
+item (before) and with the shared styles of get_style (after).
+
+Usage: PYTHONPATH=src/ python3 benchmarks/bench_style.py [items]
+"""
+
+import sys
+import timeit
+from collections import namedtuple
+from pathlib import Path
+import rlwrapper
+
+Item = namedtuple("Item", ["text", "image"])
+
+
+def build_items(items: int) -> None:
+    doc = rlwrapper.PDFDoc(Path("unused.pdf"))
+    item = Item("question text", Path("."))
+    for _ in range(items):
+        doc._build_item(item)
+
+
+def per_item(items: int) -> float:
+    """Best of five, in microseconds per item."""
+    timer = timeit.Timer(lambda: build_items(items))
+    return min(timer.repeat(repeat=5, number=1)) / items * 1e6
+
+
+def main(items: int) -> None:
+    get_style = rlwrapper.get_style
+    rlwrapper.get_style = rlwrapper.Style
+    try:
+        before = per_item(items)
+    finally:
+        rlwrapper.get_style = get_style
+    after = per_item(items)
+
+    print(f"items: {items}")
+    print(f"before (Style per item): {before:9.1f} us/item")
+    print(f"after (get_style):       {after:9.1f} us/item")
+    print(f"speed up: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Per variant cost of shuffling and writing the exam and correction
+PDF of a variant with paragraphs built for every variant (before) and
+shared by a FlowableCache (after).
+
+Usage: PYTHONPATH=src/ python3 benchmarks/bench_variants.py [questions] [variants]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+import batch
+from exam import Exam, MultiChoiceQuest, MultiChoiceAnswer
+from parameter import get_default
+from rlwrapper import FlowableCache
+
+
+def synthetic_exam(questions: int) -> Exam:
+    exam = Exam()
+    for number in range(questions):
+        question = MultiChoiceQuest(
+            f"question {number} " * 20, f"subject {number % 10}"
+        )
+        question.answers = [
+            MultiChoiceAnswer(f"answer {number}.{option} " * 5) for option in range(4)
+        ]
+        exam.add_question(question)
+    return exam
+
+
+def per_variant(
+    exam: Exam, variants: int, flowable_cache: Optional[FlowableCache]
+) -> float:
+    """Mean, in milliseconds per variant (exam and correction)."""
+    parameters = get_default()
+    engine = batch.permutation_engine(exam, parameters)
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        for number in range(variants):
+            documents = batch.variant_documents(
+                batch.variant_exam(engine, number), number, parameters
+            )
+            batch.write_documents(documents, Path(folder), flowable_cache)
+        return (time.perf_counter() - start) / variants * 1e3
+
+
+def main(questions: int, variants: int) -> None:
+    exam = synthetic_exam(questions)
+    before = per_variant(exam, variants, None)
+    after = per_variant(exam, variants, FlowableCache())
+
+    print(f"questions: {questions}, variants: {variants}")
+    print(f"before (no cache):     {before:9.1f} ms/variant")
+    print(f"after (FlowableCache): {after:9.1f} ms/variant")
+    print(f"speed up: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10,
+    )
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Time each stage of the CSV to PDF pipeline on synthetic question
+banks, with and without images, and write a JSON report to compare
+releases.
+
+Stages: CSVReader, Exam.load, Exam.shuffle, PermutationEngine.variant,
+SerializeExam.assignment, PDFDoc._build_item (all the items) and
+PDFDoc.build.
+
+Usage: PYTHONPATH=src/ python3 benchmarks/run.py [--sizes 100,1000]
+       [--output report.json]
+"""
+
+import argparse
+import csv
+import json
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Optional, Tuple
+from PIL import Image as PILImage
+import reportlab
+from batch import ATTRIBUTE_SELECTOR
+from exam import Exam
+from export import SerializeExam, ItemLevel
+from permutation import PermutationEngine
+from rlwrapper import PDFDoc
+from utility import CSVReader
+
+SIZES = (100, 1000, 10000, 100000)
+# distinct images, each one used by many questions
+IMAGES = 20
+# a question out of IMAGE_EVERY has an image
+IMAGE_EVERY = 10
+
+
+def synthetic_images(folder: Path, number: int = IMAGES) -> List[Path]:
+    """Write number PNG files, of different content, in folder."""
+    images = []
+    for index in range(number):
+        file_name = folder / f"image{index}.png"
+        color = (index * 12 % 256, 100, 200 - index * 7 % 200)
+        PILImage.new("RGB", (400, 300), color).save(file_name)
+        images.append(file_name)
+    return images
+
+
+def synthetic_csv(
+    file_name: Path, questions: int, images: Optional[List[Path]] = None
+) -> None:
+    """Write a bank of multi choice questions, four answers each,
+    in the columns read by quest2pdf.
+    """
+    with open(file_name, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(("question", "subject", "image", "void", "A", "B", "C", "D"))
+        for number in range(questions):
+            if images and number % IMAGE_EVERY == 0:
+                image = images[number // IMAGE_EVERY % len(images)].name
+            else:
+                image = ""
+            writer.writerow(
+                (
+                    f"question {number} " + "text " * 20,
+                    f"subject {number % 10}",
+                    image,
+                    "",
+                    *(f"answer {number}.{letter} text" for letter in "ABCD"),
+                )
+            )
+
+
+def timed(function: Callable[[], Any]) -> Tuple[float, Any]:
+    """Return seconds taken by function and its result."""
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def run_stages(folder: Path, questions: int, with_images: bool) -> Dict[str, float]:
+    """Return the seconds taken by each stage."""
+    images = synthetic_images(folder) if with_images else None
+    input_file = folder / f"bank{questions}.csv"
+    synthetic_csv(input_file, questions, images)
+    seconds = {}
+
+    seconds["CSVReader"], rows = timed(lambda: CSVReader(str(input_file)).to_dictlist())
+
+    exam = Exam()
+    exam.attribute_selector = ATTRIBUTE_SELECTOR
+    seconds["Exam.load"], _ = timed(lambda: exam.load(rows))
+    exam.add_path_parent(input_file)
+    seconds["Exam.shuffle"], _ = timed(exam.shuffle)
+    seconds["PermutationEngine.variant"], _ = timed(
+        lambda: PermutationEngine(exam, "benchmark").variant(1)
+    )
+    seconds["SerializeExam.assignment"], items = timed(
+        lambda: list(SerializeExam(exam).assignment())
+    )
+
+    doc = PDFDoc(folder / "unused.pdf")
+    seconds["PDFDoc._build_item"], _ = timed(
+        lambda: [doc._build_item(item) for item in items]
+    )
+
+    doc = PDFDoc(folder / f"bank{questions}.pdf")
+    for item in items:
+        if item.item_level == ItemLevel.top:
+            doc.add_item(item)
+        else:
+            doc.add_sub_item(item)
+    seconds["PDFDoc.build"], _ = timed(doc.build)
+
+    return seconds
+
+
+def report(sizes: List[int]) -> Dict[str, Any]:
+    results = []
+    for questions in sizes:
+        for with_images in (False, True):
+            with tempfile.TemporaryDirectory() as folder:
+                seconds = run_stages(Path(folder), questions, with_images)
+            for stage, value in seconds.items():
+                results.append(
+                    {
+                        "stage": stage,
+                        "questions": questions,
+                        "images": with_images,
+                        "seconds": value,
+                        "us_per_question": value / questions * 1e6,
+                    }
+                )
+                print(
+                    f"{stage:>25} {questions:>7} "
+                    f"{'images' if with_images else 'text':>6}: {value:9.3f} s",
+                    file=sys.stderr,
+                )
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "reportlab": reportlab.Version,
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in SIZES),
+        help="comma separated numbers of questions",
+    )
+    parser.add_argument(
+        "--output", type=Path, help="JSON report file, default standard output"
+    )
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    text = json.dumps(report(sizes), indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        args.output.write_text(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Convert CSV files from asyncio code, e.g. a web backend, without
+blocking the event loop: questions are loaded and variants shuffled on
+the loop default executor, variants are rendered on a process pool.
+Combined variants are shuffled and rendered together on the pool.
+
+    async with AsyncConverter(max_jobs=2) as converter:
+        async for event in converter.events(csv_file, {"number": 10}):
+            print(event.stage, event.done, event.total)
+
+Cancelling the task iterating the events, or awaiting convert, cancels
+the variants not rendered yet; the ones written are kept in the manifest.
+"""
+
+import asyncio
+import logging
+from collections import namedtuple
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Mapping, Optional
+from typing import Tuple
+import batch
+import parameter
+from exam import Exam
+
+LOGNAME = "quest2pdf." + __name__
+LOGGER = logging.getLogger(LOGNAME)
+
+# stage is "load", "variant" or "done"; variant is the number of the
+# variant written, if any; done of total variants are written; files are
+# the ones written by the variant, or by the whole conversion when done
+Progress = namedtuple("Progress", ["stage", "variant", "done", "total", "files"])
+
+
+class AsyncConverter:
+    """Run at most max_jobs conversions at a time, the others wait for
+    their turn. Variants are rendered by executor or, if None, by a pool
+    of worker processes (0: one for each CPU) made when first needed and
+    shut down by close.
+    """
+
+    def __init__(
+        self,
+        max_jobs: int = 1,
+        executor: Optional[Executor] = None,
+        workers: int = 0,
+    ):
+        self.max_jobs: int = max_jobs
+        self._executor: Optional[Executor] = executor
+        self._own_executor: bool = executor is None
+        self._workers: Optional[int] = workers if workers > 0 else None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "AsyncConverter":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _renderer(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers,
+                initializer=batch.init_worker,
+                initargs=(False,),
+            )
+        return self._executor
+
+    async def convert(
+        self,
+        input_file: Path,
+        parameters: Mapping[str, Any],
+        output_folder: Optional[Path] = None,
+        progress: Optional[Callable[[Progress], Any]] = None,
+    ) -> List[Path]:
+        """Convert input_file and return the written files; progress, if
+        given, is called with each event (see events).
+        """
+        files: List[Path] = []
+        async for event in self.events(input_file, parameters, output_folder):
+            if progress is not None:
+                progress(event)
+            if event.stage == "done":
+                files = event.files
+        return files
+
+    async def events(
+        self,
+        input_file: Path,
+        parameters: Mapping[str, Any],
+        output_folder: Optional[Path] = None,
+    ) -> AsyncIterator[Progress]:
+        """Convert input_file, as batch.convert does, in output_folder
+        (default: the folder of input_file), yielding an event when the
+        questions are loaded, one for each variant written, in the order
+        they are completed, and a last one with all the files. parameters
+        override the default ones; the delimiter is given by name.
+        Profiling is not supported: ValueError if parameters["profile"] is
+        set, use batch.convert instead.
+        """
+        input_file = Path(input_file)
+        output_folder = Path(output_folder or input_file.parent)
+        parameters = _complete(parameters)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_jobs)
+
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            exam, parameters = await loop.run_in_executor(
+                None, _load, input_file, parameters, output_folder
+            )
+            total = int(parameters["number"]) if exam.questions else 0
+            yield Progress("load", None, 0, total, [])
+            if not exam.questions:
+                LOGGER.warning("Empty rows.")
+                yield Progress("done", None, 0, 0, [])
+                return
+
+            if parameters["combine"] in batch.COMBINE_MODES[1:]:
+                # all the variants are in the same files, and every one is
+                # rendered right after being shuffled: generate is CPU bound
+                # as a whole, so it takes a renderer rather than a thread
+                output = await loop.run_in_executor(
+                    self._renderer(), batch.generate, exam, parameters, output_folder
+                )
+                files = [file for group in output for file in group]
+                yield Progress("done", None, total, total, files)
+                return
+
+            written: Dict[int, List[Path]] = {}
+            variants = self._variants(exam, parameters, output_folder)
+            try:
+                async for number, files in variants:
+                    written[number] = files
+                    yield Progress("variant", number, len(written), total, files)
+            finally:
+                # the manifest is saved even if the events are not all read
+                await variants.aclose()
+            files = [file for number in sorted(written) for file in written[number]]
+            yield Progress("done", None, total, total, files)
+
+    async def _variants(
+        self, exam: Exam, parameters: Mapping[str, Any], output_folder: Path
+    ) -> AsyncIterator[Tuple[int, List[Path]]]:
+        """Yield number and files of each variant when written: variants
+        are shuffled one at a time and rendered while the next ones are.
+        """
+        loop = asyncio.get_running_loop()
+        manifest = await loop.run_in_executor(
+            None, batch.open_manifest, parameters, output_folder
+        )
+        try:
+            engine = await loop.run_in_executor(
+                None, batch.permutation_engine, exam, parameters, manifest.seed
+            )
+            if parameters["answer_key"]:
+                await loop.run_in_executor(
+                    None, batch.write_key, engine, parameters, output_folder
+                )
+            variants = batch.outdated_variants(engine, parameters, manifest)
+            pending: Dict[asyncio.Future, Any] = {}
+            try:
+                while True:
+                    job = await loop.run_in_executor(None, next, variants, None)
+                    if job is not None:
+                        number, files, documents, digests = job
+                        future = loop.run_in_executor(
+                            self._renderer(),
+                            batch.write_worker_documents,
+                            number,
+                            documents,
+                            output_folder,
+                        )
+                        pending[future] = (number, files, digests)
+                        finished = [task for task in pending if task.done()]
+                    elif pending:
+                        finished, _ = await asyncio.wait(
+                            pending, return_when=asyncio.FIRST_COMPLETED
+                        )
+                    else:
+                        break
+                    for future in sorted(finished, key=lambda f: pending[f][0]):
+                        number, files, digests = pending.pop(future)
+                        future.result()
+                        batch.record_digests(manifest, digests)
+                        yield number, list(files)
+            finally:
+                for future in pending:
+                    future.cancel()
+        finally:
+            manifest.save()
+
+
+async def convert(
+    input_file: Path,
+    parameters: Mapping[str, Any],
+    output_folder: Optional[Path] = None,
+    progress: Optional[Callable[[Progress], Any]] = None,
+) -> List[Path]:
+    """Convert input_file on a process pool of its own and return the
+    written files (see AsyncConverter.convert).
+    """
+    async with AsyncConverter() as converter:
+        return await converter.convert(input_file, parameters, output_folder, progress)
+
+
+def _complete(parameters: Mapping[str, Any]) -> Dict[str, Any]:
+    complete = parameter.get_default()
+    complete.update(parameters)
+    complete["delimiter"] = parameter.translate_delimiter(complete["delimiter"])
+    if complete["profile"]:
+        # the stages run on threads and processes shared with the other
+        # conversions, whose timings would be mixed up with these ones
+        raise ValueError(
+            f"profile {complete['profile']!r} not supported: use batch.convert"
+        )
+    return complete
+
+
+def _load(
+    input_file: Path, parameters: Mapping[str, Any], output_folder: Path
+) -> Tuple[Exam, Dict[str, Any]]:
+    """Return the exam, with the images used by the variants prepared, and
+    the parameters with the seed of the variants (see batch.seeded).
+    """
+    output_folder.mkdir(parents=True, exist_ok=True)
+    exam = batch.load_exam(input_file, parameters, output_folder)
+    if not exam.questions:
+        return exam, dict(parameters)
+    parameters = batch.seeded(parameters, output_folder)
+    batch.prepare_images(
+        exam, parameters, output_folder, batch.used_images(exam, parameters)
+    )
+    return exam, parameters
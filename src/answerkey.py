@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import csv
+import json
+import logging
+from pathlib import Path
+from typing import Callable, List
+from _version import __version__
+from bank import NO_CORRECT
+from exam import LETTER_A, TrueFalseQuest
+from permutation import PermutationEngine, VariantPermutation
+
+LOGNAME = "quest2pdf." + __name__
+LOGGER = logging.getLogger(LOGNAME)
+
+ANSWER_KEY_FORMATS = ("csv", "json")
+
+
+def variant_keys(
+    engine: PermutationEngine, permutation: VariantPermutation
+) -> List[str]:
+    """Correct option of each question of a variant, as printed in its
+    correction ("None" if there is none), computed from the permutation only.
+    """
+    questions = engine.exam.questions
+    keys = []
+    for row, correct in zip(permutation.questions, permutation.correct):
+        if correct == NO_CORRECT or isinstance(questions[row], TrueFalseQuest):
+            # not moved by the permutation
+            keys.append(f"{getattr(questions[row], 'correct_option', None)}")
+        else:
+            keys.append(chr(ord(LETTER_A) + correct))
+    return keys
+
+
+def write_answer_keys(
+    file_name: Path,
+    engine: PermutationEngine,
+    variants: int,
+    exam_name: Callable[[int], str],
+) -> None:
+    """Write the correct options of all the variants in one file, CSV or
+    JSON according to its suffix, in one pass over the variants.
+    CSV has a row for each variant: number, exam file name and the key
+    of each question. JSON has the same data by column, along with the
+    loaded row of each question.
+    """
+    file_name = Path(file_name)
+    answer_format = file_name.suffix.lstrip(".")
+    if answer_format not in ANSWER_KEY_FORMATS:
+        raise ValueError(f"unknown answer key format {answer_format}")
+
+    if answer_format == "csv":
+        with open(file_name, "w", newline="") as key_file:
+            writer = csv.writer(key_file)
+            header_written = False
+            for number in range(variants):
+                permutation = engine.permutation(number)
+                if not header_written:
+                    questions = range(1, len(permutation) + 1)
+                    writer.writerow(["variant", "exam", *map(str, questions)])
+                    header_written = True
+                writer.writerow(
+                    [number, exam_name(number), *variant_keys(engine, permutation)]
+                )
+        return
+
+    columns = {"variant": [], "exam": [], "keys": [], "rows": []}
+    for number in range(variants):
+        permutation = engine.permutation(number)
+        columns["variant"].append(number)
+        columns["exam"].append(exam_name(number))
+        columns["keys"].append(variant_keys(engine, permutation))
+        columns["rows"].append(permutation.questions.tolist())
+    content = {"version": __version__, "seed": engine.seed, **columns}
+    file_name.write_text(json.dumps(content))
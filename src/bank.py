@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import hashlib
+import io
+import json
+import logging
+import mmap
+import operator
+import os
+import struct
+import sys
+from array import array
+from itertools import compress, repeat
+from pathlib import Path
+from typing import Tuple, List, Optional, Iterable, Mapping, Any, Dict
+from _version import __version__
+from exam import Exam, Question, MultiChoiceQuest, TrueFalseQuest
+from exam import MultiChoiceAnswer, TrueFalseAnswer
+
+LOGNAME = "quest2pdf." + __name__
+LOGGER = logging.getLogger(LOGNAME)
+
+QUESTION_TYPES = (MultiChoiceQuest, TrueFalseQuest)
+NO_CORRECT = -1
+
+# cache file: magic, format and header length, JSON header, then the columns
+CACHE_MAGIC = b"Q2PBANK\0"
+CACHE_FORMAT = 2
+CACHE_PREFIX = struct.Struct("<8sII")
+# types of the stored 64 bit columns, from the narrowest, and their range
+NARROW_TYPES = (
+    ("b", -(2**7), 2**7 - 1),
+    ("h", -(2**15), 2**15 - 1),
+    ("i", -(2**31), 2**31 - 1),
+    ("I", 0, 2**32 - 1),
+)
+CACHE_COLUMNS = (
+    "_subject",
+    "_level",
+    "_type",
+    "_correct",
+    "_first_field",
+    "_field_end",
+)
+
+Mask = bytes
+
+
+class QuestionBank:
+    """Questions stored by column: subject codes (interned subjects),
+    levels, question types and correct answer indexes are arrays; texts
+    and image paths are fields of a single text buffer, located by
+    offsets. Rows are selected by masks, computed on whole columns, and
+    Question objects are built only for the selected rows.
+    """
+
+    def __init__(self, questions: Iterable[Question] = ()):
+        self._subjects: List[str] = []
+        self._subject_code: Dict[str, int] = {}
+        self._subject = array("H")
+        self._subject_rows: List[array] = []
+        self._level = array("q")
+        self._type = array("b")
+        self._correct = array("q")
+        # fields of the i-th question are first_field[i] ... first_field[i+1]-1:
+        # question text, question image, then text and image of each answer
+        self._first_field = array("q", [0])
+        self._field_end = array("q")
+        self._buffer = io.StringIO()
+        self._text: Optional[str] = ""
+        self._paths: Dict[str, Path] = {}
+
+        for question in questions:
+            self.add_question(question)
+
+    def __len__(self) -> int:
+        return len(self._level)
+
+    @property
+    def subjects(self) -> Tuple[str, ...]:
+        """Distinct subjects, in order of appearance."""
+        return tuple(self._subjects)
+
+    def add_question(self, question: Question) -> None:
+        """Append a question: only multi choice and true/false
+        questions can be stored.
+        """
+        try:
+            question_type = QUESTION_TYPES.index(type(question))
+        except ValueError:
+            raise TypeError(f"{question} can not be stored in a bank") from None
+
+        code = self._subject_code.get(question.subject)
+        if code is None:
+            code = self._subject_code[question.subject] = len(self._subjects)
+            self._subjects.append(question.subject)
+            self._subject_rows.append(array("q"))
+
+        self._subject_rows[code].append(len(self))
+        self._subject.append(code)
+        self._level.append(question.level)
+        self._type.append(question_type)
+        correct_index = question.correct_index
+        self._correct.append(NO_CORRECT if correct_index is None else correct_index)
+
+        self._add_field(question.text)
+        self._add_field(str(question.image))
+        for answer in question.answers:
+            self._add_field(answer.text)
+            self._add_field(str(answer.image))
+        self._first_field.append(len(self._field_end))
+
+    def load(
+        self, iterable: Iterable[Mapping[str, Any]], attribute_selector=()
+    ) -> None:
+        """Append the questions of the rows, as Exam.load would do:
+        one row at a time is turned into a Question.
+        """
+        exam = Exam()
+        exam.attribute_selector = attribute_selector
+        for row in iterable:
+            exam.questions = ()
+            exam.load((row,))
+            for question in exam.questions:
+                self.add_question(question)
+
+    def _add_field(self, text: str) -> None:
+        self._buffer.write(text)
+        self._field_end.append(self._buffer.tell())
+        self._text = None
+
+    def _field(self, field: int) -> str:
+        if self._text is None:
+            self._text = self._buffer.getvalue()
+        start = self._field_end[field - 1] if field > 0 else 0
+        return self._text[start : self._field_end[field]]
+
+    def _path(self, field: int) -> Path:
+        """Image paths are shared among the questions using the same image."""
+        text = self._field(field)
+        path = self._paths.get(text)
+        if path is None:
+            path = self._paths[text] = Path(text)
+        return path
+
+    def subject_rows(self, subject: str) -> array:
+        """Indexes of the rows of the given subject: they are kept
+        up to date while questions are added.
+        """
+        try:
+            return array("q", self._subject_rows[self._subject_code[subject]])
+        except KeyError:
+            return array("q")
+
+    def subject_mask(self, *subjects: str) -> Mask:
+        """Select the rows of any of the given subjects."""
+        codes = [
+            self._subject_code[name] for name in subjects if name in self._subject_code
+        ]
+        if not codes:
+            return bytes(len(self))
+        mask = bytes(map(operator.eq, self._subject, repeat(codes[0])))
+        for code in codes[1:]:
+            mask = self.union(
+                mask, bytes(map(operator.eq, self._subject, repeat(code)))
+            )
+        return mask
+
+    def level_mask(
+        self, minimum: Optional[int] = None, maximum: Optional[int] = None
+    ) -> Mask:
+        """Select the rows with minimum <= level <= maximum."""
+        return self._range_mask(self._level, minimum, maximum)
+
+    @classmethod
+    def _range_mask(
+        cls, column: array, minimum: Optional[int], maximum: Optional[int]
+    ) -> Mask:
+        mask = bytes([1]) * len(column)
+        if minimum is not None:
+            mask = bytes(map(operator.ge, column, repeat(minimum)))
+        if maximum is not None:
+            mask = cls.intersection(
+                mask, bytes(map(operator.le, column, repeat(maximum)))
+            )
+        return mask
+
+    @staticmethod
+    def intersection(*masks: Mask) -> Mask:
+        # masks are made of 0 and 1 bytes: bitwise is bytewise
+        value = int.from_bytes(masks[0], "little")
+        for other in masks[1:]:
+            value &= int.from_bytes(other, "little")
+        return value.to_bytes(len(masks[0]), "little")
+
+    @staticmethod
+    def union(*masks: Mask) -> Mask:
+        value = int.from_bytes(masks[0], "little")
+        for other in masks[1:]:
+            value |= int.from_bytes(other, "little")
+        return value.to_bytes(len(masks[0]), "little")
+
+    def select(
+        self,
+        subject: Optional[str] = None,
+        min_level: Optional[int] = None,
+        max_level: Optional[int] = None,
+    ) -> array:
+        """Return the indexes of the rows matching all the given criteria:
+        with a subject, only the levels of its rows are compared.
+        """
+        if subject is None:
+            return self.indexes(self.level_mask(min_level, max_level))
+
+        rows = self.subject_rows(subject)
+        levels = array("q", map(self._level.__getitem__, rows))
+        return array(
+            "q", compress(rows, self._range_mask(levels, min_level, max_level))
+        )
+
+    def indexes(self, mask: Mask) -> array:
+        return array("q", compress(range(len(self)), mask))
+
+    def question(self, index: int) -> Question:
+        """Build the question stored in the given row."""
+        question_type = QUESTION_TYPES[self._type[index]]
+        first = self._first_field[index]
+        last = self._first_field[index + 1]
+
+        question = question_type(
+            self._field(first),
+            self._subjects[self._subject[index]],
+            self._path(first + 1),
+            self._level[index],
+        )
+        correct = self._correct[index]
+        for ordinal, field in enumerate(range(first + 2, last, 2)):
+            text, image = self._field(field), self._path(field + 1)
+            if question_type is TrueFalseQuest:
+                answer = TrueFalseAnswer(text == "True", image)
+            else:
+                answer = MultiChoiceAnswer(text, image)
+            question.add_answer(answer, is_correct=(ordinal == correct))
+        return question
+
+    def questions(self, indexes: Optional[Iterable[int]] = None) -> List[Question]:
+        """Build the questions of the given rows, all if None."""
+        if indexes is None:
+            indexes = range(len(self))
+        return [self.question(index) for index in indexes]
+
+    def to_exam(self, indexes: Optional[Iterable[int]] = None) -> Exam:
+        return Exam(*self.questions(indexes))
+
+    def save(self, file_name: Path, source: Optional[Mapping[str, Any]] = None) -> None:
+        """Write the bank in a binary cache file: columns are written as
+        they are in memory, along with source, a description of where the
+        questions come from (see source_signature).
+        """
+        if self._text is None:
+            self._text = self._buffer.getvalue()
+        text = self._text.encode("utf-8")
+        columns = [getattr(self, name) for name in CACHE_COLUMNS]
+        stored = [_narrow(column) for column in columns]
+        header = json.dumps(
+            {
+                "version": __version__,
+                "byteorder": sys.byteorder,
+                "source": dict(source or {}),
+                "subjects": self._subjects,
+                "columns": [
+                    [
+                        name,
+                        column.typecode,
+                        narrow.typecode,
+                        len(narrow) * narrow.itemsize,
+                    ]
+                    for name, column, narrow in zip(CACHE_COLUMNS, columns, stored)
+                ],
+                "text": len(text),
+            }
+        ).encode("utf-8")
+
+        file_name = Path(file_name)
+        temporary = file_name.with_name(f".{file_name.name}.tmp")
+        with open(temporary, "wb") as cache:
+            cache.write(CACHE_PREFIX.pack(CACHE_MAGIC, CACHE_FORMAT, len(header)))
+            cache.write(header)
+            for column in stored:
+                column.tofile(cache)
+            cache.write(text)
+        os.replace(temporary, file_name)
+
+    @classmethod
+    def open(cls, file_name: Path) -> Tuple["QuestionBank", Dict[str, Any]]:
+        """Read a bank written by save, memory mapping the file: nothing
+        is parsed, columns are copied as they are. Return the bank and its
+        source. Raise ValueError if the file is not a valid cache.
+        """
+        with open(file_name, "rb") as cache, mmap.mmap(
+            cache.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped:
+            with memoryview(mapped) as view:
+                return cls._from_buffer(view)
+
+    @classmethod
+    def _from_buffer(cls, view: memoryview) -> Tuple["QuestionBank", Dict[str, Any]]:
+        try:
+            magic, cache_format, header_length = CACHE_PREFIX.unpack_from(view)
+        except struct.error:
+            raise ValueError("truncated bank cache") from None
+        if magic != CACHE_MAGIC or cache_format != CACHE_FORMAT:
+            raise ValueError("not a bank cache of this format")
+        offset = CACHE_PREFIX.size
+        header = json.loads(bytes(view[offset : offset + header_length]))
+        offset += header_length
+        if header["version"] != __version__ or header["byteorder"] != sys.byteorder:
+            raise ValueError("bank cache written by another version or machine")
+
+        bank = cls()
+        for name, typecode, stored, length in header["columns"]:
+            column = array(stored)
+            column.frombytes(view[offset : offset + length])
+            if len(column) * column.itemsize != length:
+                raise ValueError("truncated bank cache")
+            offset += length
+            setattr(
+                bank, name, column if stored == typecode else array(typecode, column)
+            )
+        if offset + header["text"] != len(view):
+            raise ValueError("truncated bank cache")
+        bank._text = str(view[offset:], "utf-8")
+        bank._buffer.write(bank._text)
+
+        bank._subjects = header["subjects"]
+        bank._subject_code = {name: code for code, name in enumerate(bank._subjects)}
+        bank._subject_rows = [array("q") for _ in bank._subjects]
+        for row, code in enumerate(bank._subject):
+            bank._subject_rows[code].append(row)
+        return bank, header["source"]
+
+
+def _narrow(column: array) -> array:
+    """64 bit columns are stored in the narrowest type their values fit:
+    levels and answer indexes usually in 8 bits, offsets in 32.
+    """
+    if column.typecode != "q":
+        return column
+    low, high = (min(column), max(column)) if column else (0, 0)
+    for typecode, minimum, maximum in NARROW_TYPES:
+        if minimum <= low and high <= maximum:
+            return array(typecode, column)
+    return column
+
+
+def source_signature(file_name: Path, digest: bool = True) -> Dict[str, Any]:
+    """Describe a file by path, size, modification time and, if digest,
+    SHA-256 of the content.
+    """
+    path = Path(file_name).resolve()
+    stat = path.stat()
+    signature: Dict[str, Any] = {
+        "path": str(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+    if digest:
+        with open(path, "rb") as source:
+            signature["sha256"] = hashlib.sha256(source.read()).hexdigest()
+    return signature
+
+
+def open_cached(
+    cache_file: Path, source_file: Path, options: Mapping[str, Any]
+) -> Optional["QuestionBank"]:
+    """Return the bank cached in cache_file if it has been made from
+    source_file, as it is now, with the same options; None otherwise.
+    A source file touched but not changed still matches: its content
+    is hashed only when size or modification time differ, and the cache
+    is signed again so that it is not hashed next time.
+    """
+    try:
+        bank, source = QuestionBank.open(cache_file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, IndexError, TypeError) as err:
+        LOGGER.warning("bank cache %s ignored: %s", cache_file, err)
+        return None
+
+    current = source_signature(source_file, digest=False)
+    if source.get("options") != dict(options) or source["path"] != current["path"]:
+        return None
+    if (source["size"], source["mtime_ns"]) != (current["size"], current["mtime_ns"]):
+        current = source_signature(source_file)
+        if current["sha256"] != source["sha256"]:
+            return None
+        current["options"] = source["options"]
+        try:
+            bank.save(cache_file, current)
+        except (OSError, OverflowError) as err:
+            LOGGER.warning("bank cache %s not signed again: %s", cache_file, err)
+    return bank
@@ -0,0 +1,597 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import logging
+import secrets
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import (
+    Mapping,
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+    Optional,
+    TYPE_CHECKING,
+)
+from answerkey import ANSWER_KEY_FORMATS, write_answer_keys
+from bank import QuestionBank, open_cached, source_signature
+from exam import Exam
+from export import SerializeExam, RLInterface, CombinedRLInterface, Item, Section
+from manifest import BuildManifest, items_digest, sections_digest
+from permutation import PermutationEngine, QUESTION_ORDERS
+from timing import STAGES, Records, instrument
+from utility import CSVReader
+
+# ReportLab (rlwrapper) is imported only when variants are built
+if TYPE_CHECKING:
+    from rlwrapper import FlowableCache
+
+LOGNAME = "quest2pdf." + __name__
+LOGGER = logging.getLogger(LOGNAME)
+
+# columns of the input CSV loaded into an Exam
+ATTRIBUTE_SELECTOR = (
+    "question",
+    "subject",
+    "image",
+    "void",
+    "A",
+    "void",
+    "B",
+    "void",
+    "C",
+    "void",
+    "D",
+    "void",
+)
+
+# questions of the last input file, next to its outputs
+BANK_CACHE_NAME = "quest2pdf-bank.cache"
+# images resampled for the PDF files, next to them
+IMAGE_CACHE_NAME = "quest2pdf-images"
+
+# variants in a file for each variant ("") or in one file for all the
+# exams and one for all the corrections ("variants"), or in a single file
+# with each exam followed by its correction ("interleaved")
+COMBINE_MODES = ("", "variants", "interleaved")
+
+# file name, items and RLInterface options of a PDF file
+Document = Tuple[Path, List[Item], Dict[str, Any]]
+# number, files, documents to be written and their digests of a variant
+Variant = Tuple[int, Tuple[Path, Path], List[Document], Dict[Path, str]]
+
+# flowables of the variants rendered by a pool worker
+_worker_cache: Optional["FlowableCache"] = None
+
+
+def variant_file_names(parameters: Mapping[str, Any], number: int) -> Tuple[Path, Path]:
+    """Return exam and correction file names of the given variant:
+    names depend on the variant number only.
+    """
+    return (
+        Path(f"{parameters['exam']}_{number}.pdf"),
+        Path(f"{parameters['correction']}_{number}.pdf"),
+    )
+
+
+def permutation_engine(
+    exam: Exam, parameters: Mapping[str, Any], seed: Optional[str] = None
+) -> PermutationEngine:
+    """Return the engine computing the variants of exam according to
+    parameters: answers are shuffled unless not_shuffle is set, questions
+    are sampled if parameters["questions"] > 0 and are in question_order.
+    """
+    question_order = parameters["question_order"]
+    if question_order not in QUESTION_ORDERS:
+        LOGGER.warning("unknown question order %s: loaded is used", question_order)
+    return PermutationEngine(
+        exam,
+        seed,
+        questions=int(parameters["questions"]),
+        shuffle_questions=question_order == "shuffled",
+        shuffle_answers=parameters["not_shuffle"] is False,
+    )
+
+
+def variant_exam(engine: PermutationEngine, number: int) -> Exam:
+    """Return the exam of the given variant, computed by engine: the same
+    variant is written again given the same seed.
+    """
+    with STAGES.stage("shuffle"):
+        return engine.variant(number)
+
+
+def variant_documents(
+    exam: Exam, number: int, parameters: Mapping[str, Any]
+) -> List[Document]:
+    """Return file name, items and RLInterface options of the exam and
+    correction PDF of the given variant of an already shuffled exam.
+    """
+    output_file_name_exam, output_file_name_correction = variant_file_names(
+        parameters, number
+    )
+
+    if parameters["page_heading"] != "":
+        exam_heading = f"{parameters['page_heading']} file n. {number}"
+    else:
+        exam_heading = ""
+
+    serial_exam = SerializeExam(exam)
+    return [
+        (
+            output_file_name_exam,
+            list(serial_exam.assignment()),
+            {
+                "heading": exam_heading,
+                "footer": parameters["page_footer"],
+                "layout": parameters["layout"],
+            },
+        ),
+        (
+            output_file_name_correction,
+            list(serial_exam.correction()),
+            {
+                "top_item_bullet_type": "A",
+                "sub_item_bullet_type": "1",
+                "heading": output_file_name_exam.name,
+                "layout": parameters["layout"],
+            },
+        ),
+    ]
+
+
+def write_documents(
+    documents: Iterable[Document],
+    output_folder: Path,
+    flowable_cache: Optional["FlowableCache"] = None,
+) -> None:
+    """Write the PDF files of documents in output_folder."""
+    for file_name, items, options in documents:
+        to_pdf_interface = RLInterface(
+            iter(items),
+            file_name,
+            destination=output_folder,
+            flowable_cache=flowable_cache,
+            **options,
+        )
+        to_pdf_interface.build()
+
+
+def write_archive(
+    exam: Exam,
+    parameters: Mapping[str, Any],
+    archive: BinaryIO,
+) -> List[Path]:
+    """Write the exam and correction PDF of parameters["number"] variants
+    in a zip archive written to archive, e.g. an HTTP response or a socket
+    file, that needs not be seekable. Nothing is written on disk: each PDF
+    goes from memory to its archive member. Variants are shuffled with
+    parameters["seed"], if any. Return the archived files.
+    """
+    from rlwrapper import FlowableCache
+
+    flowable_cache = FlowableCache()
+    engine = permutation_engine(exam, parameters, parameters["seed"] or None)
+    files = []
+    # PDF streams are compressed already
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as zip_file:
+        for variant in range(int(parameters["number"])):
+            with STAGES.variant(variant):
+                documents = variant_documents(
+                    variant_exam(engine, variant), variant, parameters
+                )
+                for file_name, items, options in documents:
+                    with zip_file.open(file_name.name, "w") as member:
+                        RLInterface(
+                            iter(items),
+                            member,
+                            flowable_cache=flowable_cache,
+                            **options,
+                        ).build()
+                    files.append(file_name)
+    return files
+
+
+def open_manifest(parameters: Mapping[str, Any], output_folder: Path) -> BuildManifest:
+    """Return the manifest of output_folder with the seed of the variants:
+    parameters["seed"], or else the one of the manifest, or else a new one.
+    """
+    manifest = BuildManifest.load(output_folder)
+    if parameters.get("seed"):
+        manifest.seed = str(parameters["seed"])
+    elif manifest.seed is None:
+        manifest.seed = secrets.token_hex(8)
+    return manifest
+
+
+def generate(
+    exam: Exam, parameters: Mapping[str, Any], output_folder: Path
+) -> List[Tuple[Path, ...]]:
+    """Write parameters["number"] variants of the exam. A manifest in
+    output_folder keeps the digest of what each file is made of, so only
+    files whose questions, images or parameters have changed, or that are
+    missing, are written again; the shuffling seed, parameters["seed"] or
+    else the one of the manifest, is kept there too.
+    With more than one worker the files are spread over a pool of
+    processes, each one with its own PDF documents;
+    the returned list is ordered by variant number anyway.
+    With parameters["answer_key"], csv or json, the correct options of all
+    the variants are written in a single file too (see write_key).
+    With parameters["combine"] the variants are written in one or two
+    files instead (see write_combined).
+    """
+    number = int(parameters["number"])
+    workers = int(parameters["workers"])
+
+    manifest = open_manifest(parameters, output_folder)
+    engine = permutation_engine(exam, parameters, manifest.seed)
+    if parameters["answer_key"]:
+        write_key(engine, parameters, output_folder)
+    combine = parameters["combine"]
+    if combine not in COMBINE_MODES:
+        LOGGER.warning("unknown combine mode %s: not combined", combine)
+    elif combine:
+        try:
+            return [write_combined(engine, parameters, output_folder, manifest)]
+        finally:
+            manifest.save()
+    variants = outdated_variants(engine, parameters, manifest)
+
+    from rlwrapper import FlowableCache
+
+    output = []
+    try:
+        if workers == 1 or number <= 1:
+            flowable_cache = FlowableCache()
+            for variant, files, documents, digests in _prefetched(variants):
+                with STAGES.variant(variant):
+                    write_documents(documents, output_folder, flowable_cache)
+                record_digests(manifest, digests)
+                output.append(files)
+            return output
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        max_workers = workers if workers > 0 else None
+        LOGGER.info("%d variants on %s workers", number, max_workers or "all the")
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=init_worker,
+            initargs=(STAGES.enabled,),
+        ) as pool:
+            futures = [
+                (
+                    pool.submit(
+                        write_worker_documents, variant, documents, output_folder
+                    ),
+                    files,
+                    digests,
+                )
+                for variant, files, documents, digests in variants
+            ]
+            for future, files, digests in futures:
+                STAGES.merge(future.result())
+                record_digests(manifest, digests)
+                output.append(files)
+        return output
+    finally:
+        manifest.save()
+
+
+def _prefetched(variants: Iterator[Variant]) -> Iterator[Variant]:
+    """Yield the outdated variants, prefetching the images of each one
+    while the previous one is written.
+    """
+    previous = None
+    for variant in variants:
+        prefetch_images(document_images(variant[2]))
+        if previous is not None:
+            yield previous
+        previous = variant
+    if previous is not None:
+        yield previous
+
+
+def write_key(
+    engine: PermutationEngine, parameters: Mapping[str, Any], output_folder: Path
+) -> Optional[Path]:
+    """Write the answer key of all the variants, in parameters["answer_key"]
+    format, and return its file name; None if the format is unknown.
+    """
+    answer_format = parameters["answer_key"]
+    if answer_format not in ANSWER_KEY_FORMATS:
+        LOGGER.warning("unknown answer key format %s: not written", answer_format)
+        return None
+    file_name = output_folder / f"{parameters['correction']}_key.{answer_format}"
+    with STAGES.stage("answer key"):
+        write_answer_keys(
+            file_name,
+            engine,
+            int(parameters["number"]),
+            lambda number: variant_file_names(parameters, number)[0].name,
+        )
+    LOGGER.info("answer key written in %s", file_name)
+    return file_name
+
+
+def combined_file_names(parameters: Mapping[str, Any]) -> Tuple[Path, ...]:
+    """Return the files written by the parameters["combine"] mode."""
+    if parameters["combine"] == "interleaved":
+        return (Path(f"{parameters['exam']}_all.pdf"),)
+    return (
+        Path(f"{parameters['exam']}_all.pdf"),
+        Path(f"{parameters['correction']}_all.pdf"),
+    )
+
+
+def write_combined(
+    engine: PermutationEngine,
+    parameters: Mapping[str, Any],
+    output_folder: Path,
+    manifest: BuildManifest,
+) -> Tuple[Path, ...]:
+    """Write all the variants in combined files (see COMBINE_MODES), a
+    section for each exam or correction, bookmarked with its file name,
+    and return them. Variants are computed again while the files are laid
+    out, so that they are never all in memory; images are embedded once
+    in each file.
+    """
+    file_names = combined_file_names(parameters)
+    # indexes of the documents of a variant written in each file
+    if len(file_names) == 1:
+        contents = {file_names[0]: (0, 1)}
+    else:
+        contents = {file_names[0]: (0,), file_names[1]: (1,)}
+
+    digests: Dict[Path, List[str]] = {file_name: [] for file_name in file_names}
+    for variant in range(int(parameters["number"])):
+        with STAGES.variant(variant):
+            documents = variant_documents(
+                variant_exam(engine, variant), variant, parameters
+            )
+        for file_name, indexes in contents.items():
+            for index in indexes:
+                _, items, options = documents[index]
+                digests[file_name].append(items_digest(items, options))
+
+    from rlwrapper import FlowableCache
+
+    flowable_cache = FlowableCache()
+    for file_name, indexes in contents.items():
+        digest = sections_digest(digests[file_name])
+        if manifest.is_current(file_name, digest):
+            LOGGER.info("%s up to date", file_name)
+            continue
+        CombinedRLInterface(
+            _sections(engine, parameters, indexes),
+            file_name,
+            destination=output_folder,
+            flowable_cache=flowable_cache,
+        ).build()
+        manifest.record(file_name, digest)
+        LOGGER.info("variants written in %s", file_name)
+    return tuple(output_folder / file_name for file_name in file_names)
+
+
+def _sections(
+    engine: PermutationEngine, parameters: Mapping[str, Any], indexes: Tuple[int, ...]
+) -> Iterator[Section]:
+    """Yield the sections of a combined file: the given documents of
+    each variant.
+    """
+    for variant in range(int(parameters["number"])):
+        documents = variant_documents(
+            variant_exam(engine, variant), variant, parameters
+        )
+        prefetch_images(document_images(documents[index] for index in indexes))
+        for index in indexes:
+            file_name, items, options = documents[index]
+            yield Section(file_name.stem, items, options)
+
+
+def outdated_variants(
+    engine: PermutationEngine, parameters: Mapping[str, Any], manifest: BuildManifest
+) -> Iterator[Variant]:
+    """Yield number, files, documents to be written and their digests of
+    each variant.
+    """
+    up_to_date = 0
+    for variant in range(int(parameters["number"])):
+        with STAGES.variant(variant):
+            documents = variant_documents(
+                variant_exam(engine, variant),
+                variant,
+                parameters,
+            )
+        outdated = []
+        digests = {}
+        for document in documents:
+            file_name, items, options = document
+            digest = items_digest(items, options)
+            if manifest.is_current(file_name, digest):
+                up_to_date += 1
+            else:
+                outdated.append(document)
+                digests[file_name] = digest
+        exam_file, correction_file = (file_name for file_name, _, _ in documents)
+        files = (manifest.folder / exam_file, manifest.folder / correction_file)
+        yield variant, files, outdated, digests
+    LOGGER.info("%d files up to date", up_to_date)
+
+
+def record_digests(manifest: BuildManifest, digests: Mapping[Path, str]) -> None:
+    for file_name, digest in digests.items():
+        manifest.record(file_name, digest)
+
+
+def load_exam(
+    input_file: Path, parameters: Mapping[str, Any], cache_folder: Path
+) -> Exam:
+    """Read the questions of input_file, streaming its rows, with images
+    relative to its folder. The questions are cached in cache_folder, so
+    that input_file is not parsed again until it changes.
+    """
+    options = {
+        "encoding": parameters["encoding"],
+        "delimiter": parameters["delimiter"],
+        "selector": list(ATTRIBUTE_SELECTOR),
+    }
+    cache_file = Path(cache_folder) / BANK_CACHE_NAME
+    bank = open_cached(cache_file, input_file, options)
+    if bank is not None:
+        LOGGER.info("%d questions read from %s", len(bank), cache_file)
+        exam = bank.to_exam()
+        exam.attribute_selector = ATTRIBUTE_SELECTOR
+        exam.add_path_parent(input_file)
+        return exam
+
+    source = source_signature(input_file)
+    source["options"] = options
+    rows = CSVReader(
+        str(input_file),
+        parameters["encoding"],
+        parameters["delimiter"],
+        stream=True,
+    ).iter_rows()
+    exam = Exam()
+    exam.attribute_selector = ATTRIBUTE_SELECTOR
+    exam.load(rows)
+
+    if exam.questions:
+        # images are cached relative to input_file, that can be given
+        # relative to another working directory next time
+        try:
+            QuestionBank(exam.questions).save(cache_file, source)
+        except (OSError, OverflowError) as err:
+            LOGGER.warning("questions not cached in %s: %s", cache_file, err)
+    exam.add_path_parent(input_file)
+    return exam
+
+
+def prepare_images(
+    exam: Exam,
+    parameters: Mapping[str, Any],
+    cache_folder: Path,
+    images: Optional[Iterable[Path]] = None,
+) -> None:
+    """Replace the images of exam, or only the given ones (see
+    used_images), with copies resampled to parameters["image_dpi"] at the
+    width they are printed with, and recompressed, cached in cache_folder
+    (see imageprep.ImagePipeline), on a pool of threads; with image_dpi 0
+    images are embedded as they are.
+    """
+    dpi = int(parameters["image_dpi"])
+    if dpi <= 0:
+        return
+    from imageprep import ImagePipeline
+    from rlwrapper import IMAGE_WIDTH
+
+    pipeline = ImagePipeline(Path(cache_folder) / IMAGE_CACHE_NAME, dpi)
+    images = exam.images() if images is None else list(images)
+    # PIL releases the GIL while decoding, resampling and encoding
+    with ThreadPoolExecutor() as pool:
+        prepared = dict(
+            zip(
+                images,
+                pool.map(lambda image: pipeline.prepare(image, IMAGE_WIDTH), images),
+            )
+        )
+    exam.map_images(lambda image: prepared.get(image, image))
+    LOGGER.info(
+        "%d images at %d dpi: %d of %d bytes saved",
+        pipeline.images,
+        dpi,
+        pipeline.saved_bytes,
+        pipeline.source_bytes,
+    )
+
+
+def seeded(parameters: Mapping[str, Any], output_folder: Path) -> Dict[str, Any]:
+    """Return parameters with the seed the variants are written with in
+    output_folder (see open_manifest), so that what they use is known
+    before generate writes them.
+    """
+    return dict(parameters, seed=open_manifest(parameters, output_folder).seed)
+
+
+def used_images(exam: Exam, parameters: Mapping[str, Any]) -> List[Path]:
+    """Return the images of the questions, and of their answers, used by
+    the variants shuffled with parameters["seed"]: with questions sampled,
+    only the ones of the sampled questions.
+    """
+    if int(parameters["questions"]) <= 0:
+        return exam.images()
+    engine = permutation_engine(exam, parameters, parameters["seed"])
+    used = engine.used_questions(int(parameters["number"]))
+    questions = exam.questions
+    return Exam(*(questions[index] for index in used)).images()
+
+
+def document_images(documents: Iterable[Document]) -> List[Path]:
+    """Return the images of the documents, each once, in order."""
+    return list(
+        dict.fromkeys(
+            item.image
+            for _, items, _ in documents
+            for item in items
+            if item.image != Path()
+        )
+    )
+
+
+def prefetch_images(images: Iterable[Path]) -> None:
+    """Start reading and decoding images on a pool of threads (see
+    rlwrapper.ImageCache.prefetch), so that they are ready when laid out.
+    """
+    from rlwrapper import IMAGE_CACHE
+
+    IMAGE_CACHE.prefetch(images)
+
+
+def convert(
+    input_file: Path, parameters: Mapping[str, Any], output_folder: Path
+) -> List[Tuple[Path, ...]]:
+    """Read the questions of input_file, or of its cache in output_folder,
+    resample their images if requested and write the variants of the exam
+    in output_folder. Return the written files, none if input_file has no
+    question.
+    """
+    with instrument(parameters["profile"], output_folder) as stages:
+        with stages.stage("load"):
+            exam = load_exam(input_file, parameters, output_folder)
+
+        if not exam.questions:
+            LOGGER.warning("Empty rows.")
+            return []
+
+        parameters = seeded(parameters, output_folder)
+        with stages.stage("images"):
+            prepare_images(
+                exam, parameters, output_folder, used_images(exam, parameters)
+            )
+        return generate(exam, parameters, output_folder)
+
+
+def init_worker(timed: bool) -> None:
+    global _worker_cache
+    from rlwrapper import FlowableCache
+
+    _worker_cache = FlowableCache()
+    STAGES.clear()
+    if timed:
+        STAGES.enable()
+
+
+def write_worker_documents(
+    number: int, documents: List[Document], output_folder: Path
+) -> Records:
+    """Write the documents of a variant and return the timing of its stages."""
+    prefetch_images(document_images(documents))
+    STAGES.clear()
+    with STAGES.variant(number):
+        write_documents(documents, output_folder, _worker_cache)
+    return STAGES.records()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Convert CSV files to exam and correction PDF files without any
+window: tkinter is not imported. For each input file a JSON line,
+with its status and the written files, is printed on standard output.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Mapping
+import parameter
+import batch
+from utility import exception_printer
+from _version import __version__
+
+LOGNAME = "quest2pdf." + __name__
+LOGGER = logging.getLogger(LOGNAME)
+
+# exit status
+EXIT_OK = 0
+EXIT_FAILED = 1  # at least one input file not converted
+EXIT_USAGE = 2  # wrong arguments, as argparse does
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Convert the input files given by argv; return the exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", nargs="+", type=Path, help="CSV files")
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=Path("."),
+        help="folder where a sub folder, named as the input file, "
+        "is created for each input file, so input files must have "
+        "different names (default: current folder)",
+    )
+    parser.add_argument(
+        "-p",
+        "--param",
+        nargs=2,
+        action="append",
+        default=[],
+        metavar=("KEY", "VALUE"),
+        help="parameter overriding configuration file, e.g. -p number 3",
+    )
+    parser.add_argument("--version", action="version", version=__version__)
+    args = parser.parse_args(argv)
+    stems = [input_file.stem for input_file in args.input]
+    same = sorted({stem for stem in stems if stems.count(stem) > 1})
+    if same:
+        # their output would be written in the same sub folder
+        parser.error(f"input files with the same name: {', '.join(same)}")
+
+    param: Dict[str, Any] = parameter.param_parser(
+        [item for pair in args.param for item in pair]
+    )
+    LOGGER.debug(str(param))
+
+    failed = 0
+    for input_file in args.input:
+        status = convert_file(input_file, param, args.output / input_file.stem)
+        print(json.dumps(status), flush=True)
+        if status["status"] != "ok":
+            failed += 1
+
+    LOGGER.info("%d converted, %d failed", len(args.input) - failed, failed)
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+def convert_file(
+    input_file: Path, param: Mapping[str, Any], output_folder: Path
+) -> Dict[str, Any]:
+    """Convert an input file; errors are reported in the returned status:
+    "ok", "empty" (no question found) or "error".
+    """
+    status: Dict[str, Any] = {"input": str(input_file), "files": []}
+    start = time.perf_counter()
+    try:
+        output_folder.mkdir(parents=True, exist_ok=True)
+        files = batch.convert(input_file, param, output_folder)
+    except Exception as err:
+        LOGGER.critical("%s conversion failed: %s %s", input_file, err.__class__, err)
+        status["status"] = "error"
+        status["error"] = exception_printer(err)
+    else:
+        status["status"] = "ok" if files else "empty"
+        status["files"] = [str(file) for pair in files for file in pair]
+    status["seconds"] = round(time.perf_counter() - start, 3)
+
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Convert the jobs queued in a spool directory with a pool of warm
+workers: ReportLab, fonts and styles are loaded once for each worker.
+
+A job is a JSON file, {"input": CSV file, "output": folder,
+"parameters": {...}}, written in spool/incoming (see submit). It is moved
+to spool/running while converted; at the end its status, the one printed
+by cli.py plus the seconds waited in the queue, is written in spool/done
+with the same file name.
+
+Many daemons can share a spool: a running job is locked (flock) by the
+daemon converting it, and only the jobs left by a daemon that is dead
+are queued again. The spool must be on a local file system of a POSIX
+system.
+"""
+
+import argparse
+import fcntl
+import json
+import logging
+import os
+import random
+import signal
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED, Future
+from pathlib import Path
+from typing import Dict, Any, BinaryIO, List, Optional, Mapping
+import parameter
+from cli import convert_file
+
+LOGNAME = "quest2pdf." + __name__
+LOGGER = logging.getLogger(LOGNAME)
+
+INCOMING = "incoming"
+RUNNING = "running"
+DONE = "done"
+JOB_SUFFIX = ".json"
+
+
+def submit(
+    spool: Path,
+    input_file: Path,
+    output_folder: Path,
+    parameters: Optional[Mapping[str, Any]] = None,
+) -> str:
+    """Queue a job and return its name, the one of its status file."""
+    name = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}{JOB_SUFFIX}"
+    job = {
+        "input": str(input_file),
+        "output": str(output_folder),
+        "parameters": dict(parameters or {}),
+    }
+    incoming = Path(spool) / INCOMING
+    incoming.mkdir(parents=True, exist_ok=True)
+    # written aside and renamed, so that the daemon never reads half a job
+    _write_json(incoming / name, job)
+    return name
+
+
+class SpoolDaemon:
+    """Poll spool/incoming and convert the jobs found on a process pool;
+    with workers 0 the pool has a worker for each CPU.
+    """
+
+    def __init__(
+        self,
+        spool: Path,
+        parameters: Mapping[str, Any],
+        workers: int = 0,
+        poll: float = 0.5,
+    ):
+        self.spool = Path(spool)
+        self.parameters: Dict[str, Any] = dict(parameters)
+        self.workers: Optional[int] = workers if workers > 0 else None
+        self.poll: float = poll
+        # locks of the jobs claimed, held until their status is written
+        self._locks: Dict[str, BinaryIO] = {}
+        for folder in (INCOMING, RUNNING, DONE):
+            (self.spool / folder).mkdir(parents=True, exist_ok=True)
+        self._requeue()
+
+    def run(self, stop: threading.Event) -> None:
+        """Convert the queued jobs until stop is set. Jobs are claimed up to
+        twice the pool size, leaving the others to the daemons sharing the
+        spool, and the ones of a daemon that died are queued again.
+        """
+        backlog = 2 * (self.workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker
+        ) as pool:
+            pending: Dict[Future, Dict[str, Any]] = {}
+            while not stop.is_set() or pending:
+                if not stop.is_set():
+                    self._requeue()
+                    for job in self._claim(backlog - len(pending)):
+                        future = self._start(pool, job)
+                        if future is not None:
+                            pending[future] = job
+                if not pending:
+                    stop.wait(self.poll)
+                    continue
+                done, _ = wait(pending, timeout=self.poll, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._finish(future, pending.pop(future))
+
+    def run_once(self) -> List[str]:
+        """Convert the jobs queued now, wait for them and return their names."""
+        with ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker
+        ) as pool:
+            jobs = self._claim()
+            pending = [(self._start(pool, job), job) for job in jobs]
+            for future, job in pending:
+                if future is not None:
+                    self._finish(future, job)
+        return [job["name"] for job in jobs]
+
+    def _claim(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Lock and move at most limit incoming jobs to running, oldest
+        first; a job claimed by another daemon in the meanwhile is skipped.
+        """
+        claimed: List[Dict[str, Any]] = []
+        for path in sorted((self.spool / INCOMING).glob(f"*{JOB_SUFFIX}")):
+            if limit is not None and len(claimed) >= limit:
+                break
+            # locked before it is moved: a running job is never unlocked
+            lock = _lock(path)
+            if lock is None:
+                continue
+            running = self.spool / RUNNING / path.name
+            try:
+                os.rename(path, running)
+            except FileNotFoundError:
+                lock.close()
+                continue
+            self._locks[path.name] = lock
+            try:
+                job = json.loads(lock.read())
+                _check_job(job)
+            except ValueError as err:
+                LOGGER.error("invalid job %s: %s", path.name, err)
+                self._write_status(
+                    path.name, {"status": "error", "error": f"invalid job: {err}"}
+                )
+                continue
+            job["name"] = path.name
+            job["queued"] = time.time() - running.stat().st_mtime
+            claimed.append(job)
+        return claimed
+
+    def _start(
+        self, pool: ProcessPoolExecutor, job: Mapping[str, Any]
+    ) -> Optional[Future]:
+        """Submit the job or, if it can not be, write its error status."""
+        try:
+            return self._submit(pool, job)
+        except Exception as err:
+            LOGGER.error("job %s not started: %s", job["name"], err)
+            self._write_status(
+                job["name"],
+                {
+                    "status": "error",
+                    "error": f"{err.__class__.__name__}: {err}",
+                    "queued": round(job["queued"], 3),
+                },
+            )
+            return None
+
+    def _submit(self, pool: ProcessPoolExecutor, job: Mapping[str, Any]) -> Future:
+        parameters = dict(self.parameters)
+        parameters.update(job.get("parameters", {}))
+        if "delimiter" in job.get("parameters", {}):
+            parameters["delimiter"] = parameter.translate_delimiter(
+                parameters["delimiter"]
+            )
+        # variants are built by the worker itself, not by another pool
+        parameters["workers"] = 1
+        return pool.submit(
+            convert_file, Path(job["input"]), parameters, Path(job["output"])
+        )
+
+    def _finish(self, future: Future, job: Mapping[str, Any]) -> None:
+        try:
+            status = future.result()
+        except Exception as err:  # the worker died
+            status = {"status": "error", "error": f"{err.__class__.__name__}: {err}"}
+        status["queued"] = round(job["queued"], 3)
+        self._write_status(job["name"], status)
+        LOGGER.info("job %s %s", job["name"], status["status"])
+
+    def _write_status(self, name: str, status: Mapping[str, Any]) -> None:
+        _write_json(self.spool / DONE / name, status)
+        try:
+            (self.spool / RUNNING / name).unlink()
+        except FileNotFoundError:
+            pass
+        lock = self._locks.pop(name, None)
+        if lock is not None:
+            lock.close()
+
+    def _requeue(self) -> None:
+        """Jobs left running by a daemon that is dead, whose lock has been
+        released, are queued again.
+        """
+        for path in (self.spool / RUNNING).glob(f"*{JOB_SUFFIX}"):
+            lock = _lock(path)
+            if lock is None:
+                continue
+            with lock:
+                try:
+                    os.rename(path, self.spool / INCOMING / path.name)
+                except FileNotFoundError:
+                    continue
+            LOGGER.warning("job %s queued again", path.name)
+
+
+def _lock(path: Path) -> Optional[BinaryIO]:
+    """Return path open and locked, None if it is locked or missing."""
+    try:
+        lock = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock.close()
+        return None
+    return lock
+
+
+def _check_job(job: Any) -> None:
+    """Raise ValueError if job is not shaped as submit writes it."""
+    if not isinstance(job, dict):
+        raise ValueError("not a JSON object")
+    for key in ("input", "output"):
+        if not isinstance(job.get(key), str):
+            raise ValueError(f'"{key}" is not a file name')
+    if not isinstance(job.get("parameters", {}), dict):
+        raise ValueError('"parameters" is not a JSON object')
+
+
+def _init_worker() -> None:
+    # workers are reseeded, or forked processes would shuffle the same way
+    random.seed()
+    # load ReportLab, fonts and styles before the first job
+    import rlwrapper
+
+    rlwrapper.preload()
+
+
+def _write_json(file_name: Path, content: Mapping[str, Any]) -> None:
+    temporary = file_name.with_name(f".{file_name.name}.tmp")
+    temporary.write_text(json.dumps(content))
+    os.replace(temporary, file_name)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("spool", type=Path, help="spool directory")
+    parser.add_argument(
+        "-w", "--workers", type=int, default=0, help="pool size (default: CPUs)"
+    )
+    parser.add_argument(
+        "-p",
+        "--param",
+        nargs=2,
+        action="append",
+        default=[],
+        metavar=("KEY", "VALUE"),
+        help="parameter of all the jobs, overridden by the job ones",
+    )
+    parser.add_argument(
+        "--once", action="store_true", help="convert the queued jobs and exit"
+    )
+    args = parser.parse_args(argv)
+
+    param = parameter.param_parser([item for pair in args.param for item in pair])
+    daemon = SpoolDaemon(args.spool, param, args.workers)
+    if args.once:
+        daemon.run_once()
+        return 0
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    LOGGER.info("serving %s", args.spool)
+    daemon.run(stop)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
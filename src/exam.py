@@ -9,6 +9,10 @@
 
 from pathlib import Path
 from typing import Tuple, List, Optional, Iterator, Iterable, Any, Callable, Mapping
+from typing import Sequence, Type
+from functools import lru_cache
+from operator import itemgetter
+import copy
 import logging
 from random import shuffle
 from utility import safe_int
@@ -19,14 +23,19 @@ LOGGER = logging.getLogger(LOGNAME)
 LETTER_A = "A"
 SPACE = " "
 
+RowLoader = Callable[[Mapping[str, Any]], Optional["Question"]]
+
 
 class Answer:
-    """An answer with optional image.
+    """An answer with optional image. Attributes handled by subclasses
+    are declared in __slots__, and the ones set by load_sequentially are
+    class constants; an instance dictionary is allocated only when some
+    other attribute is set.
     """
 
-    def __init__(self):
-        self._attr_load_sequence: Tuple[str] = tuple()
-        self._type_caster_sequence: Tuple[CasterType, ...] = tuple()
+    __slots__ = ("__dict__",)
+    _attr_load_sequence: Tuple[str, ...] = ()
+    _type_caster_sequence: Tuple[CasterType, ...] = ()
 
     @property
     def attr_load_sequence(self) -> Tuple[str, ...]:
@@ -65,12 +74,13 @@ class Answer:
 
 
 class MultiChoiceAnswer(Answer):
+    __slots__ = ("_text", "_image")
+    _attr_load_sequence: Tuple[str, ...] = ("text", "image")
+    _type_caster_sequence: Tuple[CasterType, ...] = (str, Path)
+
     def __init__(self, text: str = "", image: Path = Path()):
         self.text: str = text
         self.image: Path = image
-        super().__init__()
-        self._attr_load_sequence: Tuple[str, ...] = ("text", "image")
-        self._type_caster_sequence: Tuple[CasterType, ...] = (str, Path)
 
     @property
     def text(self) -> str:
@@ -101,13 +111,13 @@ class MultiChoiceAnswer(Answer):
 
 
 class TrueFalseAnswer(Answer):
+    __slots__ = ("_boolean", "_text", "_image")
+    _attr_load_sequence: Tuple[str, ...] = ("boolean", "image")
+    _type_caster_sequence: Tuple[CasterType, ...] = (bool, Path)
+
     def __init__(self, boolean: bool = False, image: Path = Path()):
         self.boolean: bool = boolean
         self.image: Path = image
-        self._text = "True" if self.boolean else "False"
-        super().__init__()
-        self._attr_load_sequence: Tuple[str, ...] = ("boolean", "image")
-        self._type_caster_sequence: Tuple[CasterType, ...] = (bool, Path)
 
     @property
     def boolean(self) -> bool:
@@ -142,6 +152,21 @@ class Question:
     the level of difficulty.
     """
 
+    __slots__ = (
+        "__dict__",
+        "_text",
+        "_subject",
+        "_image",
+        "_level",
+        "_answers",
+        "_correct_answer",
+        "_correct_index",
+    )
+    _attr_load_sequence: Tuple[str, ...] = ("text", "subject", "image", "level")
+    _type_caster_sequence: Tuple[CasterType, ...] = (str, str, Path, safe_int)
+    _answer_type = Answer
+    _marker = "*"
+
     def __init__(
         self, text: str = "", subject: str = "", image: Path = Path(), level: int = 0
     ):
@@ -149,18 +174,9 @@ class Question:
         self.subject: str = subject
         self.image: Path = image
         self.level: int = level
-        self._answer_type = Answer
-        self._answers: List[self._answer_type] = []
-        self._correct_answer: Optional[self._answer_type] = None  # setter bypassed
+        self._answers: List[Answer] = []
+        self._correct_answer: Optional[Answer] = None  # setter bypassed
         self._correct_index: Optional[int] = None  # setter bypassed
-        self._attr_load_sequence: Tuple[str, ...] = (
-            "text",
-            "subject",
-            "image",
-            "level",
-        )
-        self._type_caster_sequence: Tuple[CasterType, ...] = (str, str, Path, safe_int)
-        self._marker = "*"
 
     @property
     def text(self) -> str:
@@ -269,6 +285,24 @@ class Question:
         self._correct_index = value
         # self._correct_letter = chr(ord(LETTER_A) + value)
 
+    def answer_order(self, keys: Sequence[float]) -> List[int]:
+        """Order of the answers in a shuffled variant, given a random
+        key for each answer: unchanged.
+        """
+        return list(range(len(self._answers)))
+
+    def permuted(self, order: Sequence[int], correct_index: int) -> "Question":
+        """Return a copy of the question with the answers in the given
+        order, correct_index being the new index of the correct answer
+        (negative if none). Answers are shared, not copied.
+        """
+        question = copy.copy(self)
+        question._answers = [self._answers[index] for index in order]
+        if correct_index >= 0:
+            question._correct_answer = question._answers[correct_index]
+            question._correct_index = correct_index
+        return question
+
     def add_parent_path(self, file_path: Path) -> None:
         self.image = (
             file_path.parent / self.image if self.image != Path() else self.image
@@ -280,6 +314,16 @@ class Question:
                 else answer.image
             )
 
+    def map_images(self, function: Callable[[Path], Path]) -> None:
+        """Replace the image of the question and of its answers, if any,
+        with function(image).
+        """
+        if self.image != Path():
+            self.image = function(self.image)
+        for answer in self.answers:
+            if answer.image != Path():
+                answer.image = function(answer.image)
+
     @property
     def attr_load_sequence(self) -> Tuple[str, ...]:
         return self._attr_load_sequence
@@ -363,11 +407,12 @@ class MultiChoiceQuest(Question):
     """Multi choice question.
     """
 
+    __slots__ = ("_correct_option",)
+    _answer_type = MultiChoiceAnswer
+
     def __init__(self, *args):
         self._correct_option: Optional[str] = None  # setter bypassed
         super().__init__(*args)
-        self._answer_type = MultiChoiceAnswer
-        self._answers: List[self._answer_type] = []
 
     @Question.correct_answer.setter
     def correct_answer(self, value) -> None:
@@ -392,6 +437,20 @@ class MultiChoiceQuest(Question):
         self._correct_index = pointer
         self._correct_option = chr(ord(LETTER_A) + pointer)
 
+    def answer_order(self, keys: Sequence[float]) -> List[int]:
+        """Answers are sorted by their random keys, if there is
+        a correct one.
+        """
+        if self._correct_answer is None:
+            return super().answer_order(keys)
+        return sorted(range(len(self._answers)), key=keys.__getitem__)
+
+    def permuted(self, order: Sequence[int], correct_index: int) -> Question:
+        question = super().permuted(order, correct_index)
+        if correct_index >= 0:
+            question._correct_option = chr(ord(LETTER_A) + correct_index)
+        return question
+
     def shuffle(self) -> None:
         """Shuffle the answers.
         """
@@ -411,10 +470,11 @@ class TrueFalseQuest(Question):
     """Multi choice question.
     """
 
+    __slots__ = ("correct_option",)
+    _answer_type = TrueFalseAnswer
+
     def __init__(self, *args):
         super().__init__(*args)
-        self._answer_type = TrueFalseAnswer
-        self._answers: List[self._answer_type] = []
         self.correct_option: str = ""
 
     def add_answer(self, answer, is_correct: bool = False) -> None:
@@ -457,6 +517,12 @@ class TrueFalseQuest(Question):
             raise
         return attributes
 
+    def answer_order(self, keys: Sequence[float]) -> List[int]:
+        """The True answer comes first, as shuffle does."""
+        if len(self._answers) == 2 and self._answers[1].boolean:
+            return [1, 0]
+        return super().answer_order(keys)
+
     def shuffle(self):
         try:
             if self.answers[1].boolean:
@@ -513,22 +579,45 @@ class Exam:
         for question in self._questions:
             question.add_parent_path(file_path)
 
+    def map_images(self, function: Callable[[Path], Path]) -> None:
+        for question in self._questions:
+            question.map_images(function)
+
+    def images(self) -> List[Path]:
+        """Images of questions and answers, each once, in order."""
+        images = {}
+        for question in self._questions:
+            images[question.image] = None
+            for answer in question.answers:
+                images[answer.image] = None
+        images.pop(Path(), None)
+        return list(images)
+
     def load(self, iterable: Iterable[Mapping[str, Any]]) -> None:
+        """Add a question for each row: the values of attribute_selector
+        keys, or of all the keys if not set, are loaded in sequence (see
+        Question.load_sequentially) by a loader compiled once for each
+        question type and set of keys.
+        """
         questions_classes = {
             "MultiChoice": MultiChoiceQuest,
             "TrueFalse": TrueFalseQuest,
         }
         default_key = "MultiChoice"
+        question_type_key = self._question_type_key
+        selector = self._attribute_selector
+        loaders = {}
         for row in iterable:
-            quest = questions_classes[row.get(self._question_type_key, default_key)]()
-            if self._attribute_selector:
-                data = [row[key] for key in self._attribute_selector]
-            else:
-                data = [row[key] for key in row]
-            if data:
+            type_name = row.get(question_type_key, default_key)
+            keys = selector or tuple(row)
+            loader = loaders.get((type_name, keys))
+            if loader is None:
+                loader = loaders[type_name, keys] = compile_row_loader(
+                    questions_classes[type_name], keys
+                )
+            quest = loader(row)
+            if quest is not None:
                 self.add_question(quest)
-                iterator = iter(data)
-                quest.load_sequentially(iterator)
 
     def shuffle(self):
         for question in self._questions:
@@ -539,3 +628,82 @@ class Exam:
         for question in self._questions:
             output.append(question.__str__())
         return "".join(output)
+
+
+@lru_cache(maxsize=64)
+def compile_row_loader(
+    question_type: Type[Question], keys: Tuple[str, ...]
+) -> RowLoader:
+    """Return a function turning a row into a question of the given
+    type, as load_sequentially would do with the values of keys, None if
+    there are no keys. The function is generated for the number of keys:
+    values are taken by an itemgetter and passed, cast, to the question
+    and answer constructors. Question types loading answers in their own
+    way get a loader calling load_sequentially.
+    """
+    answer_type = question_type._answer_type
+    answer_width = len(answer_type._attr_load_sequence)
+    if (
+        question_type._load_1_answer is not Question._load_1_answer
+        or question_type._attr_load_sequence != Question._attr_load_sequence
+        or answer_width == 0
+    ):
+        return _sequential_row_loader(question_type, keys)
+    if not keys:
+        return lambda row: None
+
+    values = [f"v{index}" for index in range(len(keys))]
+    head = len(question_type._attr_load_sequence)
+    arguments = ", ".join(
+        f"q{index}({value})" for index, value in enumerate(values[:head])
+    )
+    lines = [
+        "def load_row(row):",
+        f"    {', '.join(values)}, = getter(row)",
+        f"    question = question_type({arguments})",
+    ]
+    for start in range(head, len(keys), answer_width):
+        group = values[start : start + answer_width]
+        arguments = ", ".join(f"a{index}({value})" for index, value in enumerate(group))
+        # empty answers, without text and image, are skipped
+        lines.append(f"    if {' or '.join(f'{value} != EMPTY' for value in group)}:")
+        lines.append(f"        question.add_answer(answer_type({arguments}))")
+    lines.append("    return question")
+
+    namespace = {
+        "getter": _values_getter(keys),
+        "question_type": question_type,
+        "answer_type": answer_type,
+        "EMPTY": "",
+    }
+    for index, caster in enumerate(question_type._type_caster_sequence):
+        namespace[f"q{index}"] = _shared_path if caster is Path else caster
+    for index, caster in enumerate(answer_type._type_caster_sequence):
+        namespace[f"a{index}"] = _shared_path if caster is Path else caster
+    exec("\n".join(lines), namespace)
+    return namespace["load_row"]
+
+
+# image paths are mostly empty or repeated: equal paths are shared
+_shared_path = lru_cache(maxsize=4096)(Path)
+
+
+def _values_getter(keys: Tuple[str, ...]) -> Callable[[Mapping[str, Any]], Tuple]:
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda row: (row[key],)
+    return itemgetter(*keys)
+
+
+def _sequential_row_loader(
+    question_type: Type[Question], keys: Tuple[str, ...]
+) -> RowLoader:
+    def load_row(row: Mapping[str, Any]) -> Optional[Question]:
+        data = [row[key] for key in keys]
+        if not data:
+            return None
+        question = question_type()
+        question.load_sequentially(iter(data))
+        return question
+
+    return load_row
@@ -1,10 +1,17 @@
 from enum import Enum
 from collections import namedtuple
 from pathlib import Path
-from typing import Iterator, Generator
-import rlwrapper
+from typing import Any, BinaryIO, Iterator, Generator, Optional, Union
+import logging
+from timing import STAGES
 import exam
 
+LOGNAME = "quest2pdf." + __name__
+LOGGER = logging.getLogger(LOGNAME)
+
+# how RLInterface lays out the items: all at once or while they are read
+LAYOUTS = ("whole", "stream")
+
 
 class ItemLevel(Enum):
     """top level text
@@ -26,6 +33,10 @@ class ItemLevel(Enum):
 
 Item = namedtuple("Item", ["item_level", "text", "image"])
 
+# items of a section of CombinedRLInterface, listed in the outline with
+# title; options are heading, footer and bullet types, as for RLInterface
+Section = namedtuple("Section", ["title", "items", "options"])
+
 
 class SerializeExam:
     """Serialize questions, made of text and image, and
@@ -49,10 +60,20 @@ class SerializeExam:
 
 
 class RLInterface:
-    def __init__(self, input_generator: Iterator[Item], output_file: Path, **kwargs):
-        """This class print a two nesting level series of items in pdf.
+    def __init__(
+        self,
+        input_generator: Iterator[Item],
+        output_file: Union[Path, BinaryIO],
+        **kwargs,
+    ):
+        """This class print a two nesting level series of items in pdf,
+        in output_file, in the destination folder, or in a writable binary
+        file, e.g. BytesIO, a socket file or a zip archive member.
         """
-        file_name: Path = kwargs.get("destination", Path(".")) / output_file
+        # ReportLab is loaded only when a PDF is made
+        import rlwrapper
+
+        file_name = _output_file(output_file, kwargs)
         self._input = input_generator
         sub_item_bullet_type: str = kwargs.get("sub_item_bullet_type", "A")
         top_item_bullet_type: str = kwargs.get("top_item_bullet_type", "1")
@@ -64,20 +85,107 @@ class RLInterface:
             sub_item_bullet_type=sub_item_bullet_type,
             page_heading=page_heading,
             page_footer=page_footer,
+            flowable_cache=kwargs.get("flowable_cache"),
         )
+        self._layout: str = kwargs.get("layout", "whole")
+        self._fed: bool = False
+        if self._layout not in LAYOUTS:
+            LOGGER.warning("unknown layout %s: whole is used", self._layout)
 
     def build(self) -> None:
+        """Lay out all the items ("whole" layout) or lay them out while
+        they are read ("stream" layout), keeping memory bounded.
+        """
+        if self._layout == "stream":
+            with STAGES.stage("layout"):
+                self._doc.build_stream(self._feed)
+            return
         try:
-            item = next(self._input)
-            assert item.item_level == ItemLevel.top
-            self._doc.add_item(item)
-            while True:
+            with STAGES.stage("items"):
                 item = next(self._input)
-                if item.item_level == ItemLevel.top:
-                    self._doc.add_item(item)
-                elif item.item_level == ItemLevel.sub:
-                    self._doc.add_sub_item(item)
-                else:
-                    raise ValueError
+                assert item.item_level == ItemLevel.top
+                self._doc.add_item(item)
+                while True:
+                    _add_item(self._doc, next(self._input))
         except StopIteration:
-            self._doc.build()
+            with STAGES.stage("layout"):
+                self._doc.build()
+
+    def _feed(self) -> bool:
+        """Add the next item to the document, if any."""
+        item = next(self._input, None)
+        if item is None:
+            return False
+        if not self._fed:
+            assert item.item_level == ItemLevel.top
+            self._fed = True
+        _add_item(self._doc, item)
+        return True
+
+
+class CombinedRLInterface:
+    def __init__(
+        self, sections: Iterator[Section], output_file: Union[Path, BinaryIO], **kwargs
+    ):
+        """This class print many series of items in one pdf, a section for
+        each series, laying them out while they are read. output_file is
+        as for RLInterface.
+        """
+        import rlwrapper
+
+        file_name = _output_file(output_file, kwargs)
+        self._sections = sections
+        self._items: Optional[Iterator[Item]] = None
+        self._doc = rlwrapper.PDFDoc(
+            file_name, flowable_cache=kwargs.get("flowable_cache")
+        )
+
+    def build(self) -> None:
+        with STAGES.stage("layout"):
+            self._doc.build_stream(self._feed)
+
+    def _feed(self) -> bool:
+        """Add the next item to the document, starting the next section
+        when the items of the current one are over.
+        """
+        item = None if self._items is None else next(self._items, None)
+        if item is not None:
+            _add_item(self._doc, item)
+            return True
+        section = next(self._sections, None)
+        if section is None:
+            return False
+        options = section.options
+        self._doc.add_section(
+            section.title,
+            heading=options.get("heading", ""),
+            footer=options.get("footer", ""),
+            top_item_bullet_type=options.get("top_item_bullet_type", "1"),
+            sub_item_bullet_type=options.get("sub_item_bullet_type", "A"),
+        )
+        self._items = iter(section.items)
+        item = next(self._items, None)
+        if item is not None:
+            assert item.item_level == ItemLevel.top
+            self._doc.add_item(item)
+        return True
+
+
+def _output_file(
+    output_file: Union[Path, BinaryIO], options: dict
+) -> Union[Path, BinaryIO]:
+    """Return the file name in the destination folder, or the file
+    itself if it is written to.
+    """
+    if hasattr(output_file, "write"):
+        return output_file
+    return options.get("destination", Path(".")) / output_file
+
+
+def _add_item(doc: Any, item: Item) -> None:
+    if item.item_level == ItemLevel.top:
+        doc.add_item(item)
+    elif item.item_level == ItemLevel.sub:
+        doc.add_sub_item(item)
+    else:
+        raise ValueError
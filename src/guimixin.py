@@ -7,11 +7,14 @@ with a Frame (or a subclass derived from Frame) for its quit method
 """
 
 import glob
+import os
 from pathlib import Path
 from typing import Tuple
 import tkinter.scrolledtext as tk_st
-from tkinter.messagebox import *
-from tkinter.filedialog import *
+from tkinter import Tk, Toplevel, Frame, Label, Button, Entry, StringVar
+from tkinter import WORD, YES, BOTH, DISABLED, RIDGE, SUNKEN, X, LEFT, RIGHT
+from tkinter.messagebox import showinfo, showerror, askyesno
+from tkinter.filedialog import askopenfilename, asksaveasfilename, askdirectory
 
 
 class GuiMixin:
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import logging
+import math
+import os
+import threading
+from pathlib import Path
+from PIL import Image
+from manifest import file_digest
+
+LOGNAME = "quest2pdf." + __name__
+LOGGER = logging.getLogger(LOGNAME)
+
+JPEG_QUALITY = 85
+# an image of fewer colors is saved as a palette PNG: lossless if it is
+# not resampled, otherwise the blended colors are quantized back to as many
+PALETTE_COLORS = 256
+
+
+class ImagePipeline:
+    """Resample images to dpi at the width, in points, they are drawn
+    with, and recompress them: JPEG for opaque images of many colors,
+    palette PNG for the others. Results are cached in folder, keyed by
+    source content and target size, and are used only when smaller than
+    their source. The bytes saved are counted for each image prepared.
+    """
+
+    def __init__(self, folder: Path, dpi: int = 150, quality: int = JPEG_QUALITY):
+        self.folder = Path(folder)
+        self.dpi: int = dpi
+        self.quality: int = quality
+        self.images: int = 0
+        self.source_bytes: int = 0
+        self.output_bytes: int = 0
+        self._lock = threading.Lock()
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.source_bytes - self.output_bytes
+
+    def prepare(self, file_name: Path, width: float) -> Path:
+        """Return the file to be embedded for file_name drawn width points
+        wide: the cached one, converted now if needed, or file_name itself
+        if it is not bigger or can not be read.
+        """
+        file_name = Path(file_name)
+        digest = file_digest(file_name)
+        if digest == "missing":
+            return file_name
+        pixels = max(1, math.ceil(width * self.dpi / 72))
+        stem = f"{digest[:32]}-{pixels}-{self.quality}"
+        cached = next(
+            (
+                self.folder / f"{stem}{suffix}"
+                for suffix in (".jpg", ".png")
+                if (self.folder / f"{stem}{suffix}").exists()
+            ),
+            None,
+        )
+        if cached is None:
+            try:
+                cached = self._convert(file_name, pixels, stem)
+            except (OSError, ValueError, Image.DecompressionBombError) as err:
+                LOGGER.warning("image %s not resampled: %s", file_name, err)
+                return file_name
+
+        source_size = file_name.stat().st_size
+        size = cached.stat().st_size
+        with self._lock:
+            self.images += 1
+            self.source_bytes += source_size
+            self.output_bytes += min(size, source_size)
+        return cached if size < source_size else file_name
+
+    def _convert(self, file_name: Path, pixels: int, stem: str) -> Path:
+        with Image.open(file_name) as source:
+            image = _normalized(source)
+            # counted before resampling, that blends colors
+            colors = image.getcolors(PALETTE_COLORS)
+            if image.width > pixels:
+                height = max(1, round(image.height * pixels / image.width))
+                if image.mode not in ("L", "RGB", "RGBA"):
+                    image = image.convert("RGBA" if "A" in image.mode else "RGB")
+                image = image.resize((pixels, height), Image.LANCZOS)
+
+            if colors is not None:
+                suffix, options = ".png", {"optimize": True}
+                if image.mode not in ("1", "L", "P"):
+                    method = Image.Quantize.FASTOCTREE if "A" in image.mode else None
+                    image = image.quantize(len(colors), method)
+            elif "A" in image.mode:
+                suffix, options = ".png", {"optimize": True}
+            else:
+                suffix = ".jpg"
+                options = {"quality": self.quality, "optimize": True}
+                if image.mode not in ("L", "RGB"):
+                    image = image.convert("RGB")
+
+            self.folder.mkdir(parents=True, exist_ok=True)
+            cached = self.folder / f"{stem}{suffix}"
+            # written aside and renamed, so that no reader sees half a file
+            temporary = self.folder / f".{stem}.{os.getpid()}.{threading.get_ident()}"
+            image.save(
+                temporary, format="PNG" if suffix == ".png" else "JPEG", **options
+            )
+            os.replace(temporary, cached)
+        return cached
+
+
+def _normalized(image: Image.Image) -> Image.Image:
+    """Return image in a mode that can be resampled and saved as PNG or
+    JPEG: 16 bit gray scaled down to 8 bit, transparency and uncommon
+    modes converted to RGB(A).
+    """
+    if "transparency" in image.info:
+        return image.convert("RGBA")
+    if image.mode.startswith("I"):
+        return image.convert("I").point(lambda value: value / 256).convert("L")
+    if image.mode == "F":
+        return image.convert("L")
+    if image.mode in ("LA", "La", "PA", "RGBa"):
+        return image.convert("RGBA")
+    if image.mode not in ("1", "L", "P", "RGB", "RGBA"):
+        return image.convert("RGB")
+    return image
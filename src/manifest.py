@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import logging
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional
+from _version import __version__
+
+LOGNAME = "quest2pdf." + __name__
+LOGGER = logging.getLogger(LOGNAME)
+
+MANIFEST_NAME = "quest2pdf-manifest.json"
+
+
+def file_digest(file_name: Path) -> str:
+    """Return the SHA-256 of the file content; files are read again
+    only when their size or modification time changes.
+    """
+    path = Path(file_name).resolve()
+    try:
+        stat = path.stat()
+    except OSError:
+        return "missing"
+    return _file_digest(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=4096)
+def _file_digest(path: str, mtime_ns: int, size: int) -> str:
+    with open(path, "rb") as binary_file:
+        return hashlib.sha256(binary_file.read()).hexdigest()
+
+
+def items_digest(items: Iterable[Any], options: Dict[str, Any]) -> str:
+    """Return the SHA-256 of what a PDF file is made of: application
+    version, options, text and image (path and content) of the items.
+    """
+    digest = hashlib.sha256()
+    digest.update(__version__.encode())
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+    for item in items:
+        digest.update(f"\0{item.item_level.value}\0{item.text}\0".encode())
+        if item.image != Path("."):
+            digest.update(f"{item.image}\0{file_digest(item.image)}".encode())
+    return digest.hexdigest()
+
+
+def sections_digest(digests: Iterable[str]) -> str:
+    """Return the SHA-256 of a PDF file made of sections, given the
+    items_digest of each of them.
+    """
+    digest = hashlib.sha256()
+    for section in digests:
+        digest.update(section.encode())
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """Digest of the inputs of each PDF file written in a folder, and the
+    seed of the shuffling, saved in the same folder: a file whose digest
+    is unchanged, and that has not been modified since, is up to date.
+    """
+
+    def __init__(self, folder: Path, seed: Optional[str] = None):
+        self.folder = Path(folder)
+        self.seed: Optional[str] = seed
+        self._files: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, folder: Path) -> "BuildManifest":
+        """Read the manifest of folder: an empty one if missing or invalid."""
+        manifest = cls(folder)
+        try:
+            content = json.loads((manifest.folder / MANIFEST_NAME).read_text())
+            manifest.seed = content["seed"]
+            manifest._files = dict(content["files"])
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as err:
+            LOGGER.warning("invalid manifest in %s ignored: %s", folder, err)
+        return manifest
+
+    def save(self) -> None:
+        file_name = self.folder / MANIFEST_NAME
+        temporary = file_name.with_name(f".{MANIFEST_NAME}.tmp")
+        content = {"version": __version__, "seed": self.seed, "files": self._files}
+        temporary.write_text(json.dumps(content, indent=1, sort_keys=True))
+        os.replace(temporary, file_name)
+
+    def is_current(self, file_name: Path, digest: str) -> bool:
+        entry = self._files.get(Path(file_name).name)
+        if entry is None or entry["digest"] != digest:
+            return False
+        try:
+            stat = (self.folder / Path(file_name).name).stat()
+        except OSError:
+            return False
+        return (stat.st_size, stat.st_mtime_ns) == (entry["size"], entry["mtime_ns"])
+
+    def record(self, file_name: Path, digest: str) -> None:
+        """Record a file just written."""
+        stat = (self.folder / Path(file_name).name).stat()
+        self._files[Path(file_name).name] = {
+            "digest": digest,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
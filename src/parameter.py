@@ -11,22 +11,28 @@ logName = "quest2pdf." + __name__
 logger = logging.getLogger(logName)
 
 
+DEFAULT_DELIMITER = ","
+DELIMITERS_TRANSLATOR = {
+    "colon": ":",
+    "comma": ",",
+    "dash": "-",
+    "exclamation": "!",
+    "period": ".",
+    "semicolon": ";",
+    "space": " ",
+    "tab": "\t",
+}
+
+
+def translate_delimiter(name: str) -> str:
+    """Return the delimiter character named in configuration."""
+    return DELIMITERS_TRANSLATOR.get(name, DEFAULT_DELIMITER)
+
+
 def param_parser(args: Optional[List[str]] = []) -> Dict[str, Any]:
     """Arguments from command line have precedence over the ones
     coming from configuration file.
     """
-    default_delimiter = ","
-    delimiters_translator = {
-        "colon": ":",
-        "comma": ",",
-        "dash": "-",
-        "exclamation": "!",
-        "period": ".",
-        "semicolon": ";",
-        "space": " ",
-        "tab": "\t",
-    }
-
     default_values = get_default()
 
     log_conf_file = pathlib.Path(default_values["log_configuration_file"])
@@ -46,9 +52,7 @@ def param_parser(args: Optional[List[str]] = []) -> Dict[str, Any]:
 
     default_values.update(chosen_args)
 
-    default_values["delimiter"] = delimiters_translator.get(
-        default_values["delimiter"], default_delimiter
-    )
+    default_values["delimiter"] = translate_delimiter(default_values["delimiter"])
 
     return default_values
 
@@ -66,6 +70,15 @@ def get_default() -> Dict[str, Any]:
         "page_footer": "",
         "delimiter": "comma",
         "encoding": "utf-8",
+        "workers": 1,
+        "profile": "",
+        "seed": "",
+        "questions": 0,
+        "question_order": "loaded",
+        "answer_key": "",
+        "layout": "whole",
+        "combine": "",
+        "image_dpi": 0,
         # "version": __version__,
     }
 
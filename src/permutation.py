@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import logging
+import random
+from array import array
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
+from bank import NO_CORRECT
+from exam import Exam
+
+LOGNAME = "quest2pdf." + __name__
+LOGGER = logging.getLogger(LOGNAME)
+
+QUESTION_ORDERS = ("loaded", "shuffled")
+
+Stratum = Tuple[str, int]
+
+
+class VariantPermutation:
+    """Questions and answer order of a variant, as index arrays: the i-th
+    question of the variant is the questions[i]-th loaded one, its answers
+    are, in the variant order, order[offsets[i]:offsets[i + 1]] (indexes
+    into the loaded answers) and the correct one is correct[i],
+    NO_CORRECT if none.
+    """
+
+    __slots__ = ("number", "questions", "offsets", "order", "correct")
+
+    def __init__(
+        self,
+        number: int,
+        questions: array,
+        offsets: array,
+        order: array,
+        correct: array,
+    ):
+        self.number = number
+        self.questions = questions
+        self.offsets = offsets
+        self.order = order
+        self.correct = correct
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def answer_order(self, question: int) -> array:
+        return self.order[self.offsets[question] : self.offsets[question + 1]]
+
+    def apply(self, exam: Exam) -> Exam:
+        """Return the variant of exam, the one the permutation has been
+        computed for: questions are copied, answers are shared.
+        """
+        questions = exam.questions
+        offsets, order = self.offsets, self.order
+        try:
+            variant = Exam(
+                *(
+                    questions[loaded].permuted(
+                        order[offsets[index] : offsets[index + 1]], correct
+                    )
+                    for index, (loaded, correct) in enumerate(
+                        zip(self.questions, self.correct)
+                    )
+                )
+            )
+        except IndexError:
+            raise ValueError(
+                f"exam has {len(questions)} questions only: "
+                "the permutation has been computed for another exam"
+            ) from None
+        variant.attribute_selector = exam.attribute_selector
+        return variant
+
+
+class PermutationEngine:
+    """Compute the permutations of the variants of an exam. The
+    permutation of variant n depends on seed and n only, so any variant
+    can be computed again, on its own, in any process. Without seed
+    permutations are not reproducible.
+
+    With questions > 0 a variant is made of that many questions, drawn
+    from each stratum (subject and level) in proportion to its size: the
+    rows of each stratum are indexed once, so a variant costs O(questions)
+    whatever the size of the exam. With shuffle_questions the questions
+    of a variant are in random order, otherwise in loaded order.
+    """
+
+    def __init__(
+        self,
+        exam: Exam,
+        seed: Optional[str] = None,
+        questions: int = 0,
+        shuffle_questions: bool = False,
+        shuffle_answers: bool = True,
+    ):
+        self._exam = exam
+        self._seed = seed
+        self._questions = exam.questions
+        self._shuffle_questions = shuffle_questions
+        self._shuffle_answers = shuffle_answers
+        self._answers = array("H")
+        self._correct = array("h")
+        strata: Dict[Stratum, array] = {}
+        for index, question in enumerate(self._questions):
+            self._answers.append(len(question.answers))
+            correct_index = question.correct_index
+            self._correct.append(NO_CORRECT if correct_index is None else correct_index)
+            key = (question.subject, question.level)
+            rows = strata.get(key)
+            if rows is None:
+                rows = strata[key] = array("q")
+            rows.append(index)
+        self._strata: List[array] = list(strata.values())
+
+        if questions < 0 or questions >= len(self._questions):
+            if questions > len(self._questions):
+                LOGGER.warning(
+                    "%d questions requested, %d available: all are used",
+                    questions,
+                    len(self._questions),
+                )
+            questions = 0
+        self._quotas: Optional[List[int]] = (
+            _allocate([len(rows) for rows in self._strata], questions)
+            if questions
+            else None
+        )
+
+    @property
+    def exam(self) -> Exam:
+        return self._exam
+
+    @property
+    def seed(self) -> Optional[str]:
+        return self._seed
+
+    def _random(self, number: int) -> random.Random:
+        if self._seed is None:
+            return random.Random()
+        return random.Random(f"{self._seed}:{number}")
+
+    def _select(self, rng: random.Random) -> array:
+        """Indexes of the loaded questions of a variant, in loaded order."""
+        if self._quotas is None:
+            return array("q", range(len(self._questions)))
+        selected = array("q")
+        for rows, quota in zip(self._strata, self._quotas):
+            if quota:
+                selected.extend(
+                    rows[index] for index in rng.sample(range(len(rows)), quota)
+                )
+        return array("q", sorted(selected))
+
+    def used_questions(self, variants: int) -> array:
+        """Indexes of the loaded questions used by the first variants, in
+        loaded order: all of them unless questions are sampled.
+        """
+        if self._quotas is None:
+            return array("q", range(len(self._questions)))
+        used = set()
+        for number in range(variants):
+            # the same draws as the permutation of the variant starts with
+            used.update(self._select(self._random(number)))
+        return array("q", sorted(used))
+
+    def permutation(self, number: int) -> VariantPermutation:
+        """Permutation of the given variant: questions are selected and
+        ordered, then a random key is drawn for each of their answers in
+        one go, and each question orders its answers by their keys
+        (see Question.answer_order).
+        """
+        rng = self._random(number)
+        selected = self._select(rng)
+        if self._shuffle_questions:
+            rng.shuffle(selected)
+
+        offsets = array("q", [0])
+        for index in selected:
+            offsets.append(offsets[-1] + self._answers[index])
+        order = array("H")
+        correct = array("h")
+        if not self._shuffle_answers:
+            for index in selected:
+                order.extend(range(self._answers[index]))
+                correct.append(self._correct[index])
+            return VariantPermutation(number, selected, offsets, order, correct)
+
+        draw = rng.random
+        keys = [draw() for _ in repeat(None, offsets[-1])]
+        for position, index in enumerate(selected):
+            answers = self._questions[index].answer_order(
+                keys[offsets[position] : offsets[position + 1]]
+            )
+            order.extend(answers)
+            # the correct answer is looked up among the few of the question,
+            # not among the answers of the exam
+            base = self._correct[index]
+            correct.append(NO_CORRECT if base == NO_CORRECT else answers.index(base))
+        return VariantPermutation(number, selected, offsets, order, correct)
+
+    def variant(self, number: int) -> Exam:
+        """Return the exam of the given variant: exam itself if there is
+        nothing to sample or shuffle.
+        """
+        if not (self._quotas or self._shuffle_questions or self._shuffle_answers):
+            return self._exam
+        return self.permutation(number).apply(self._exam)
+
+
+def _allocate(sizes: List[int], total: int) -> List[int]:
+    """Split total among strata of the given sizes in proportion to them,
+    by largest remainder: quotas sum to total.
+    """
+    population = sum(sizes)
+    quotas = [size * total // population for size in sizes]
+    remainders = sorted(
+        range(len(sizes)),
+        key=lambda index: sizes[index] * total % population,
+        reverse=True,
+    )
+    for index in remainders[: total - sum(quotas)]:
+        quotas[index] += 1
+    return quotas
@@ -6,11 +6,10 @@ from tkinter import Menu, Label, YES, BOTH
 import _thread, queue
 from pathlib import Path
 from datetime import datetime
-from typing import Mapping, Dict, Any, List, Union
-from utility import CSVReader, exception_printer
+from typing import Mapping, Dict, Any, Union
+from utility import exception_printer
 from guimixin import MainWindow
-from exam import Exam
-from export import SerializeExam, RLInterface
+import batch
 from _version import __version__
 
 LOGNAME = "quest2pdf"
@@ -64,64 +63,10 @@ class ContentMix(MainWindow):
             self.errorbox("Indicare sorgente e destinazione")
 
     def to_pdf(self, input_file: Path, output_folder: Path):
-        rows = self._get_rows(input_file)
-
-        if not rows:
-            LOGGER.warning("Empty rows.")
-            self.errorbox("Invalid data")
-            return
-
         try:
-            exam = Exam()
-            exam.attribute_selector = (
-                "question",
-                "subject",
-                "image",
-                "void",
-                "A",
-                "void",
-                "B",
-                "void",
-                "C",
-                "void",
-                "D",
-                "void",
-            )
-            exam.load(rows)
-            exam.add_path_parent(input_file)
-            serial_exam = SerializeExam(exam)
-            for number in range(int(self.parameters["number"])):
-                if self.parameters["not_shuffle"] is False:
-                    exam.shuffle()
-                output_file_name_exam = Path(f"{self.parameters['exam']}_{number}.pdf")
-
-                if self.parameters["page_heading"] != "":
-                    exam_heading = f"{self.parameters['page_heading']} file n. {number}"
-                else:
-                    exam_heading = ""
-
-                exam_footer = self.parameters["page_footer"]
-
-                to_pdf_interface = RLInterface(
-                    serial_exam.assignment(),
-                    output_file_name_exam,
-                    destination=output_folder,
-                    heading=exam_heading,
-                    footer=exam_footer,
-                )
-                to_pdf_interface.build()
-                output_file_name_correction = Path(
-                    f"{self.parameters['correction']}_{number}.pdf"
-                )
-                to_pdf_interface = RLInterface(
-                    serial_exam.correction(),
-                    output_file_name_correction,
-                    destination=output_folder,
-                    top_item_bullet_type="A",
-                    sub_item_bullet_type="1",
-                    heading=output_file_name_exam.name,
-                )
-                to_pdf_interface.build()
+            if not batch.convert(input_file, self.parameters, output_folder):
+                self.errorbox("Invalid data")
+                return
         except Exception as err:
             LOGGER.critical("CSVReader failed: %s %s", err.__class__, err)
             self.errorbox(exception_printer(err))
@@ -130,22 +75,6 @@ class ContentMix(MainWindow):
 
         self.data_queue.put("end")
 
-    def _get_rows(self, input_file: Path) -> List[Dict[str, str]]:
-        try:
-            file_content = CSVReader(
-                str(input_file),
-                self.parameters["encoding"],
-                self.parameters["delimiter"],
-            )
-
-            rows = file_content.to_dictlist()
-        except Exception as err:
-            LOGGER.critical("CSVReader failed: %s %s", err.__class__, err)
-            self.errorbox(exception_printer(err))
-            raise
-
-        return rows
-
     def show_version(self) -> None:
         """Show application version
         """
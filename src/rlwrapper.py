@@ -1,6 +1,15 @@
 from pathlib import Path
+import copy
 import logging
-from typing import List, Union
+import os
+import threading
+import weakref
+from bisect import bisect_right
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from typing import List, Union, Dict, Tuple, Any, Callable, Hashable, Optional
+from typing import BinaryIO, Iterable
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import (
     SimpleDocTemplate,
@@ -10,13 +19,19 @@ from reportlab.platypus import (
     ListItem,
     Spacer,
     KeepTogether,
+    Flowable,
+    PageBreak,
 )
 from reportlab.pdfgen import canvas
+from reportlab.pdfbase import pdfmetrics
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.lib import utils
+from timing import STAGES
 
 NON_BREAK_SP = "<div>&nbsp;</div>"
+# width, in points, of the images of the items
+IMAGE_WIDTH = 80
 
 
 class Style:
@@ -36,26 +51,393 @@ class Style:
         return self._style_sheet["Title"]
 
 
+class FrozenParagraphStyle(ParagraphStyle):
+    """ParagraphStyle shared by many paragraphs: attributes can not
+    be changed; copies and clones are ordinary ParagraphStyle.
+    """
+
+    def __init__(self, style: ParagraphStyle):
+        self.__dict__.update(style.__dict__)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"shared style {self.name} is read only")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"shared style {self.name} is read only")
+
+    def _thaw(self) -> ParagraphStyle:
+        style = ParagraphStyle(self.name)
+        style.__dict__.update(self.__dict__)
+        return style
+
+    def __copy__(self) -> ParagraphStyle:
+        return self._thaw()
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> ParagraphStyle:
+        return self._thaw()
+
+    def clone(self, name: str, parent=None, **kwds) -> ParagraphStyle:
+        return self._thaw().clone(name, parent, **kwds)
+
+
+_STYLE_CACHE: Dict[Tuple[Tuple[str, Any], ...], Style] = {}
+
+
+def get_style(**kwargs) -> Style:
+    """Return a Style shared by all the callers asking for the same
+    kwargs: the sample style sheet is built once per kwargs and its
+    ParagraphStyle can not be modified.
+    """
+    key = tuple(sorted(kwargs.items()))
+    try:
+        return _STYLE_CACHE[key]
+    except KeyError:
+        pass
+
+    style = Style(**kwargs)
+    by_name = style._style_sheet.byName
+    for style_name, paragraph_style in by_name.items():
+        if isinstance(paragraph_style, ParagraphStyle):
+            by_name[style_name] = FrozenParagraphStyle(paragraph_style)
+    _STYLE_CACHE[key] = style
+    return style
+
+
+def preload() -> None:
+    """Build the shared style and load the fonts of its paragraphs, that
+    are otherwise loaded by the first document.
+    """
+    style = get_style()
+    for paragraph_style in (style.normal, style.title):
+        pdfmetrics.getFont(paragraph_style.fontName)
+
+
+CachedImage = namedtuple("CachedImage", ["width", "height", "payload", "reader"])
+
+
+class ImageCache:
+    """Image files read and decoded once per process: file content and
+    decoded pixels are kept, least recently used first out, within
+    max_bytes. Entries are keyed by resolved path, modification time and
+    size, so a changed file is read again. Images can be prefetched by a
+    pool of threads, ahead of their layout.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, threads: int = 4):
+        self.max_bytes: int = max_bytes
+        self.threads: int = threads
+        self._entries: "OrderedDict[Tuple[str, int, int], CachedImage]" = OrderedDict()
+        self._loading: Dict[Tuple[str, int, int], Future] = {}
+        self._nbytes: int = 0
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        _IMAGE_CACHES.add(self)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of file content and decoded pixels currently cached."""
+        return self._nbytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, file_name: Path) -> CachedImage:
+        """Return the cached image, reading and decoding the file if
+        needed; an image being read by another thread is waited for.
+        """
+        path = Path(file_name).resolve()
+        stat = path.stat()
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                return cached
+            loading = self._loading.get(key)
+            reading = loading is None
+            if reading:
+                loading = self._loading[key] = Future()
+        if not reading:
+            return loading.result()
+
+        try:
+            cached = _read_image(path)
+        except BaseException as err:
+            with self._lock:
+                del self._loading[key]
+            loading.set_exception(err)
+            raise
+
+        nbytes = _image_nbytes(cached)
+        with self._lock:
+            del self._loading[key]
+            if nbytes <= self.max_bytes:
+                self._entries[key] = cached
+                self._nbytes += nbytes
+                while self._nbytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._nbytes -= _image_nbytes(evicted)
+        loading.set_result(cached)
+        return cached
+
+    def prefetch(self, file_names: Iterable[Path]) -> List[Future]:
+        """Read and decode the given files on the thread pool, in order,
+        while the caller goes on; errors are raised again by get.
+        """
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.threads, thread_name_prefix="image"
+                )
+            pool = self._pool
+        return [pool.submit(self.get, file_name) for file_name in file_names]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def _after_fork(self) -> None:
+        """Forget the threads of the parent process: its pool, the reads
+        in progress, that would never complete, and the lock, that one of
+        them may hold.
+        """
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._pool = None
+
+
+# image caches of the process, reset in the child of a fork
+_IMAGE_CACHES: "weakref.WeakSet[ImageCache]" = weakref.WeakSet()
+
+
+def _reset_image_caches() -> None:
+    for cache in list(_IMAGE_CACHES):
+        cache._after_fork()
+
+
+# processes are forked on POSIX only
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_image_caches)
+
+
+def _read_image(path: Path) -> CachedImage:
+    payload = path.read_bytes()
+    reader = utils.ImageReader(BytesIO(payload))
+    # decoded as ReportLab does when drawing, alpha channel included
+    reader.getRGBData()
+    alpha = getattr(reader, "_dataA", None)
+    if alpha is not None:
+        alpha.getRGBData()
+    width, height = reader.getSize()
+    if not _known_reader(reader):
+        # another ReportLab version: pixels are decoded again when drawn
+        reader = None
+    return CachedImage(width, height, payload, reader)
+
+
+def _known_reader(reader: utils.ImageReader) -> bool:
+    """Tell whether reader keeps its decoded pixels in the private
+    attributes that this module reuses, as ReportLab 3.5 to 5.0 do.
+    """
+    attributes = vars(reader)
+    alpha = attributes.get("_dataA")
+    return (
+        isinstance(attributes.get("_data"), bytes)
+        and "_dataA" in attributes
+        and (alpha is None or isinstance(getattr(alpha, "_data", None), bytes))
+        and callable(getattr(reader, "_jpeg_fh", None))
+    )
+
+
+def _image_nbytes(cached: CachedImage) -> int:
+    if cached.reader is None:
+        return len(cached.payload)
+    alpha = cached.reader._dataA
+    return (
+        len(cached.payload)
+        + len(cached.reader._data)
+        + (len(alpha._data) if alpha is not None else 0)
+    )
+
+
+IMAGE_CACHE = ImageCache()
+
+
+class DecodedImage(Image):
+    """Image drawn from a reader whose pixels are already decoded."""
+
+    def __init__(self, reader: utils.ImageReader, payload: bytes, **kwargs):
+        self._img = reader
+        Image.__init__(self, BytesIO(payload), **kwargs)
+
+
+def _own_reader(cached: CachedImage) -> utils.ImageReader:
+    """Copy of the cached reader sharing its decoded pixels, with a file
+    of its own: JPEG images are embedded reading them from it.
+    """
+    reader = copy.copy(cached.reader)
+    reader.fp = BytesIO(cached.payload)
+    if "jpeg_fh" in reader.__dict__:
+        reader.jpeg_fh = reader._jpeg_fh
+    return reader
+
+
 def get_std_aspect_image(file_name: Path, width: int = 50 * mm) -> Image:
     """Return Image with original aspect and given width.
     """
     try:
-        image_reader = utils.ImageReader(str(file_name))
+        with STAGES.stage("image"):
+            cached = IMAGE_CACHE.get(file_name)
     except OSError:
         logging.critical("OS Error reading %s", file_name)
         raise
 
-    orig_width, orig_height = image_reader.getSize()
-    aspect = orig_height / float(orig_width)
+    aspect = cached.height / float(cached.width)
+
+    image = _image(cached, width, width * aspect)
+    image.filename = str(file_name)
+    return image
+
+
+def _image(cached: CachedImage, width: float, height: float) -> Image:
+    """Image drawing cached with its decoded pixels, if ReportLab takes
+    them as expected, or else decoding its payload again.
+    """
+    if cached.reader is not None:
+        reader = _own_reader(cached)
+        image = DecodedImage(reader, cached.payload, width=width, height=height)
+        if vars(image).get("_img") is reader:
+            return image
+    return Image(BytesIO(cached.payload), width=width, height=height)
+
+
+class WrapOnceParagraph(Paragraph):
+    """Paragraph that breaks its lines once for each available width:
+    wrapping it again, in the same width, costs nothing. It can be drawn
+    many times, in many documents.
+    """
+
+    def wrap(self, availWidth, availHeight):
+        # split may drop the broken lines: wrap again then
+        wrapped_width = getattr(self, "_wrapped_width", None)
+        if wrapped_width != availWidth or not hasattr(self, "blPara"):
+            self._wrapped_size = Paragraph.wrap(self, availWidth, availHeight)
+            self._wrapped_width = availWidth
+        return self._wrapped_size
+
+    def drawOn(self, canvas, x, y, _sW=0):
+        # the indenters of the lists set the mark of a flowable moved to the
+        # next frame on the paragraph, and the layout never clears it:
+        # a paragraph still marked could not be moved again
+        self.__dict__.pop("_postponed", None)
+        Paragraph.drawOn(self, canvas, x, y, _sW)
+
+
+class FlowableCache:
+    """Paragraphs built, and wrapped, once and reused by all the documents
+    sharing the cache, e.g. all the variants of an exam, which differ only
+    in the order of the items. Paragraphs are drawn by one document at a
+    time: a cache must not be shared among threads.
+    """
 
-    return Image(str(file_name), width=width, height=(width * aspect))
+    def __init__(self, max_items: int = 10000):
+        self.max_items: int = max_items
+        self._flowables: "OrderedDict[Hashable, Flowable]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._flowables)
+
+    def get(self, key: Hashable, build: Callable[[], Flowable]) -> Flowable:
+        """Return the flowable cached with key, calling build
+        to get it if not cached yet.
+        """
+        flowable = self._flowables.get(key)
+        if flowable is not None:
+            self._flowables.move_to_end(key)
+            return flowable
+
+        flowable = self._flowables[key] = build()
+        if len(self._flowables) > self.max_items:
+            self._flowables.popitem(last=False)
+        return flowable
+
+    def clear(self) -> None:
+        self._flowables.clear()
+
+
+class FlowableStream(list):
+    """Flowables made on demand: whenever the list is found empty, refill
+    is called to append the next ones, until it returns False. A document
+    template takes flowables from the front of the list, after checking
+    its length, so they are laid out while they are made.
+    """
+
+    def __init__(self, refill: Callable[[], bool]):
+        super().__init__()
+        self._refill = refill
+
+    def __len__(self) -> int:
+        while not list.__len__(self) and self._refill():
+            pass
+        return list.__len__(self)
+
+
+class SectionStart(Flowable):
+    """Zero size flowable starting a section on the page it is drawn on:
+    the page is bookmarked with key and listed in the document outline
+    with title; the canvas, if it can, numbers the section pages on
+    their own.
+    """
+
+    def __init__(self, title: str, key: str):
+        super().__init__()
+        self.title = title
+        self.key = key
+        self.width = self.height = 0
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def draw(self):
+        self.canv.bookmarkPage(self.key)
+        self.canv.addOutlineEntry(self.title, self.key, level=0)
+        self.canv.showOutline()
+        start_section = getattr(self.canv, "start_section", None)
+        if start_section is not None:
+            start_section()
+
+
+class _PageTexts(Flowable):
+    """Zero size flowable setting heading and footer of the pages begun
+    after the one it is drawn on.
+    """
+
+    def __init__(self, pdf_doc: "PDFDoc", heading: str, footer: str):
+        super().__init__()
+        self._pdf_doc = pdf_doc
+        self._heading = heading
+        self._footer = footer
+        self.width = self.height = 0
+
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+
+    def draw(self):
+        self._pdf_doc._set_page_texts(self._heading, self._footer)
 
 
 class PDFDoc:
-    """PDF Document builder. Mainly designed for ordered/unordered lists."""
+    """PDF Document builder. Mainly designed for ordered/unordered lists.
+    output_file is a file name or a writable binary file, e.g. BytesIO,
+    that gets the whole document when it is built.
+    """
 
-    def __init__(self, output_file: Path, **kwargs):
-        self._file_name: str = str(output_file)
+    def __init__(self, output_file: Union[Path, BinaryIO], **kwargs):
+        self._file_name: Union[str, BinaryIO] = (
+            output_file if hasattr(output_file, "write") else str(output_file)
+        )
         self._doc: List[ListFlowable, ...] = []
         self._in_progress_item: List[Union[ListFlowable, ListItem]] = []
         self._top_item_start: int = 1
@@ -67,6 +449,8 @@ class PDFDoc:
         self._1st_page_header_text = kwargs.get("page_heading", "header text")
         self._later_pages_header_text = kwargs.get("page_heading", " ")
         self._footer_text = kwargs.get("page_footer", " ")
+        self._flowable_cache: Optional[FlowableCache] = kwargs.get("flowable_cache")
+        self._sections: int = 0
         self._author = "Giancarlo"
         self._title = "esame"
         self._subject = "Corso"
@@ -75,11 +459,15 @@ class PDFDoc:
     def separator(self):
         """question_set separator.
         """
-        style = Style()
-        return ListFlowable(
-            [Paragraph(self._text_separator, style.title)],
-            bulletType="bullet",
-            start="",
+        paragraph = self._get_paragraph(self._text_separator, get_style().title)
+        return ListFlowable([paragraph], bulletType="bullet", start="")
+
+    def _get_paragraph(self, text: str, style: ParagraphStyle) -> Paragraph:
+        """Build a paragraph, or take it from the flowable cache."""
+        if self._flowable_cache is None:
+            return WrapOnceParagraph(text, style)
+        return self._flowable_cache.get(
+            (text, style), lambda: WrapOnceParagraph(text, style)
         )
 
     def _build_in_progress_item(self):
@@ -109,24 +497,81 @@ class PDFDoc:
             ListItem(item_list, bulletType=self._sub_item_bullet_type, value=value)
         )
 
+    def add_section(
+        self,
+        title: str,
+        heading: str = "",
+        footer: str = "",
+        top_item_bullet_type: str = "1",
+        sub_item_bullet_type: str = "A",
+    ):
+        """Start a section, on a new page but for the first one: its items
+        are numbered from 1 with the given bullet types, its pages have
+        heading, footer and page numbers of their own and it is listed in
+        the document outline with title. Images drawn by many sections
+        are embedded in the file once.
+        """
+        if len(self._in_progress_item) != 0:
+            self._build_in_progress_item()
+            self._in_progress_item = []
+        if self._sections:
+            self._doc.extend([_PageTexts(self, heading, footer), PageBreak()])
+        else:
+            self._set_page_texts(heading, footer)
+        self._doc.append(SectionStart(title, f"section{self._sections}"))
+        self._sections += 1
+        self._top_item_start = 1
+        self._top_item_bullet_type = top_item_bullet_type
+        self._sub_item_bullet_type = sub_item_bullet_type
+
+    def _set_page_texts(self, heading: str, footer: str):
+        self._1st_page_header_text = heading
+        self._later_pages_header_text = heading
+        self._footer_text = footer
+
     def _build_item(self, item) -> ListFlowable:
         """Build an item container.
         """
-        style = Style(spaceAfter=self._space_text_image)
+        style = get_style(spaceAfter=self._space_text_image)
         space = Spacer(1, self._space_after_item)
         if item.image != Path("."):
-            image = get_std_aspect_image(item.image, width=80)
-            question = [Paragraph(item.text + NON_BREAK_SP, style.normal), image, space]
+            image = get_std_aspect_image(item.image, width=IMAGE_WIDTH)
+            text = item.text + NON_BREAK_SP
+            question = [self._get_paragraph(text, style.normal), image, space]
         else:
-            question = [Paragraph(item.text, style.normal), space]
+            question = [self._get_paragraph(item.text, style.normal), space]
         return ListFlowable(question, leftIndent=0, bulletType="bullet", start="")
 
-    def build(self):
-        """Save _doc in a file.
+    def build(self, page_numbering: str = "replay"):
+        """Save _doc in a file. Page info is added by replaying all the pages
+        at the end ("replay") or by a form for each page ("form"), that does
+        not keep the pages in memory.
         """
         if len(self._in_progress_item) != 0:
             self._build_in_progress_item()
+        self._build(page_numbering)
+
+    def build_stream(self, feed: Callable[[], bool], page_numbering: str = "form"):
+        """Save the document while its items are added: feed is called
+        whenever a flowable is needed, adds the next item (add_item or
+        add_sub_item) and returns False when there are no more. Only the
+        items not yet laid out are kept in memory and, with "form" page
+        numbering, complete pages are not kept either.
+        """
+
+        def refill() -> bool:
+            if feed():
+                return True
+            if len(self._in_progress_item) != 0:
+                self._build_in_progress_item()
+                self._in_progress_item = []
+                return True
+            return False
 
+        self._doc = FlowableStream(refill)
+        self._build(page_numbering)
+
+    def _build(self, page_numbering: str):
         doc = SimpleDocTemplate(
             self._file_name,
             pagesize=A4,
@@ -140,13 +585,13 @@ class PDFDoc:
             self._doc,
             onFirstPage=self._first_page_head,
             onLaterPages=self._later_page_head,
-            canvasmaker=NumberedCanvas,
+            canvasmaker=PAGE_NUMBERING[page_numbering],
         )
 
     def _first_page_head(self, actual_canvas, doc):
         # Save the state of our canvas so we can draw on it
         actual_canvas.saveState()
-        style = Style()
+        style = get_style()
 
         # Header
         header = Paragraph(self._1st_page_header_text, style.normal)
@@ -168,7 +613,7 @@ class PDFDoc:
     def _later_page_head(self, actual_canvas, doc):
         # Save the state of our canvas so we can draw on it
         actual_canvas.saveState()
-        style = Style()
+        style = get_style()
 
         # Header
         header = Paragraph(self._later_pages_header_text, style.normal)
@@ -189,13 +634,20 @@ class PDFDoc:
 
 
 class NumberedCanvas(canvas.Canvas):
-    """Add page info to each page (page x of y)"""
+    """Add page info to each page (page x of y), counting the pages of
+    each section on their own (see SectionStart).
+    """
 
     def __init__(self, *args, **kwargs):
         canvas.Canvas.__init__(self, *args, **kwargs)
         self._saved_page_states = []
+        self._section_starts: List[int] = [1]
         self._text = "Pag. %d di %d"
 
+    def start_section(self):
+        if self._section_starts[-1] != self._pageNumber:
+            self._section_starts.append(self._pageNumber)
+
     def showPage(self):
         self._saved_page_states.append(dict(self.__dict__))
         self._startPage()
@@ -204,13 +656,74 @@ class NumberedCanvas(canvas.Canvas):
         num_pages = len(self._saved_page_states)
         for state in self._saved_page_states:
             self.__dict__.update(state)
-            self.draw_page_number(num_pages)
+            self.draw_page_number(
+                *_section_page(self._pageNumber, self._section_starts, num_pages)
+            )
             canvas.Canvas.showPage(self)
         canvas.Canvas.save(self)
 
-    def draw_page_number(self, page_count):
+    def draw_page_number(self, page_number, page_count):
         w, h = A4
         self.setFont("Helvetica", 9)
-        self.drawCentredString(
-            w / 2, 20 * mm, self._text % (self._pageNumber, page_count)
-        )
+        self.drawCentredString(w / 2, 20 * mm, self._text % (page_number, page_count))
+
+
+class FormNumberedCanvas(canvas.Canvas):
+    """Add page info to each page (page x of y), counting the pages of
+    each section on their own (see SectionStart). Pages are written as
+    soon as they are complete: each one refers to a form, drawing its page
+    info, defined when the page count is known.
+    """
+
+    def __init__(self, *args, **kwargs):
+        canvas.Canvas.__init__(self, *args, **kwargs)
+        self._section_starts: List[int] = [1]
+        self._text = "Pag. %d di %d"
+
+    def start_section(self):
+        if self._section_starts[-1] != self._pageNumber:
+            self._section_starts.append(self._pageNumber)
+
+    def showPage(self):
+        self.doForm(self._page_number_form(self._pageNumber))
+        canvas.Canvas.showPage(self)
+
+    def save(self):
+        if len(self._code):
+            self.showPage()
+        num_pages = self._pageNumber - 1
+        for page_number in range(1, num_pages + 1):
+            self.beginForm(self._page_number_form(page_number))
+            self.draw_page_number(
+                *_section_page(page_number, self._section_starts, num_pages)
+            )
+            self.endForm()
+        canvas.Canvas.save(self)
+
+    @staticmethod
+    def _page_number_form(page_number: int) -> str:
+        return f"pageNumber{page_number}"
+
+    def draw_page_number(self, page_number, page_count):
+        w, h = A4
+        self.setFont("Helvetica", 9)
+        self.drawCentredString(w / 2, 20 * mm, self._text % (page_number, page_count))
+
+
+def _section_page(
+    page_number: int, section_starts: List[int], page_count: int
+) -> Tuple[int, int]:
+    """Return number and page count, within its section, of a page of a
+    document of page_count pages whose sections start at section_starts.
+    """
+    section = bisect_right(section_starts, page_number) - 1
+    start = section_starts[section]
+    if section + 1 < len(section_starts):
+        end = section_starts[section + 1] - 1
+    else:
+        end = page_count
+    return page_number - start + 1, end - start + 1
+
+
+# canvases adding page info, selectable in PDFDoc.build
+PAGE_NUMBERING = {"replay": NumberedCanvas, "form": FormNumberedCanvas}
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import cProfile
+import io
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Tuple, Optional, Iterator, List
+
+LOGNAME = "quest2pdf." + __name__
+LOGGER = logging.getLogger(LOGNAME)
+
+# values of the profile parameter
+PROFILE_MODES = ("", "timing", "cprofile")
+PROFILE_FILE_NAME = "quest2pdf.prof"
+
+# (variant, stage) -> [count, wall seconds, cpu seconds, peak bytes]
+Records = Dict[Tuple[Optional[int], str], List[float]]
+
+
+class StageTimer:
+    """Wall time, CPU time and peak traced memory of the stages of a
+    conversion, summed up by variant and stage name. Stages may be nested:
+    the time of the inner ones is also counted in the outer one.
+    A disabled timer measures nothing. CPU time and peak memory are the
+    ones of the whole process, concurrent conversions included.
+    """
+
+    def __init__(self):
+        self.enabled: bool = False
+        self.current_variant: Optional[int] = None
+        self._records: Records = {}
+        # peaks of the inner stages, for each open stage
+        self._peaks: List[int] = []
+
+    def enable(self) -> None:
+        if not self.enabled:
+            self.enabled = True
+            _start_tracing()
+
+    def disable(self) -> None:
+        if self.enabled:
+            self.enabled = False
+            self.current_variant = None
+            _stop_tracing()
+
+    def clear(self) -> None:
+        self._records = {}
+
+    @contextmanager
+    def variant(self, number: int) -> Iterator[None]:
+        """Ascribe the stages run in the context to the given variant."""
+        previous, self.current_variant = self.current_variant, number
+        try:
+            yield
+        finally:
+            self.current_variant = previous
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        self._peaks.append(0)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            # inner stages reset the peak: take theirs into account
+            peak = max(tracemalloc.get_traced_memory()[1], self._peaks.pop())
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            record = self._records.setdefault(
+                (self.current_variant, name), [0, 0.0, 0.0, 0]
+            )
+            record[0] += 1
+            record[1] += wall
+            record[2] += cpu
+            record[3] = max(record[3], peak)
+
+    def records(self) -> Records:
+        return {key: list(value) for key, value in self._records.items()}
+
+    def merge(self, records: Records) -> None:
+        """Add the records of another timer, e.g. of a pool worker."""
+        for key, (count, wall, cpu, peak) in records.items():
+            record = self._records.setdefault(key, [0, 0.0, 0.0, 0])
+            record[0] += count
+            record[1] += wall
+            record[2] += cpu
+            record[3] = max(record[3], peak)
+
+    def summary(self) -> str:
+        lines = []
+        for (variant, name), (count, wall, cpu, peak) in sorted(
+            self._records.items(),
+            key=lambda item: (-1 if item[0][0] is None else item[0][0], item[0][1]),
+        ):
+            lines.append(
+                f"variant {'-' if variant is None else variant:>3} {name:<8}"
+                f" x{count:<5} wall {wall:8.3f} s cpu {cpu:8.3f} s"
+                f" peak {peak / 2 ** 20:7.1f} MiB"
+            )
+        return "\n".join(lines)
+
+
+# enabled timers, and whether they started tracing memory allocations:
+# the last one to be disabled stops it
+_tracers = {"count": 0, "started": False}
+_tracers_lock = threading.Lock()
+
+
+def _start_tracing() -> None:
+    with _tracers_lock:
+        if _tracers["count"] == 0:
+            _tracers["started"] = not tracemalloc.is_tracing()
+            if _tracers["started"]:
+                tracemalloc.start()
+        _tracers["count"] += 1
+
+
+def _stop_tracing() -> None:
+    with _tracers_lock:
+        _tracers["count"] -= 1
+        if _tracers["count"] == 0 and _tracers["started"]:
+            tracemalloc.stop()
+
+
+class _CurrentTimer:
+    """The timer of the conversion running in the calling context (see
+    instrument), or else the one of the process, e.g. of a pool worker.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(_CURRENT_TIMER.get(), name)
+
+
+_CURRENT_TIMER: ContextVar[StageTimer] = ContextVar(
+    "current_timer", default=StageTimer()
+)
+# stages of the conversion running in the calling context: concurrent
+# conversions, in threads or asyncio tasks, have a timer each
+STAGES = _CurrentTimer()
+
+
+@contextmanager
+def instrument(mode: str, output_folder: Path) -> Iterator[StageTimer]:
+    """Time the stages of a conversion ("timing") on a timer of its own,
+    STAGES in the context, and profile it with cProfile too ("cprofile"),
+    whose statistics are saved in output_folder; at the end log a summary.
+    Peak memory is traced, which slows the conversion down.
+    """
+    if mode not in PROFILE_MODES:
+        LOGGER.warning("unknown profile %r: not profiling", mode)
+        mode = ""
+    if mode == "":
+        yield _CURRENT_TIMER.get()
+        return
+
+    timer = StageTimer()
+    timer.enable()
+    token = _CURRENT_TIMER.set(timer)
+    profiler = cProfile.Profile() if mode == "cprofile" else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield timer
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        _CURRENT_TIMER.reset(token)
+        timer.disable()
+        LOGGER.info("stage timing:\n%s", timer.summary())
+        if profiler is not None:
+            _log_profile(profiler, Path(output_folder) / PROFILE_FILE_NAME)
+
+
+def _log_profile(profiler: cProfile.Profile, file_name: Path) -> None:
+    import pstats
+
+    profiler.dump_stats(str(file_name))
+    text = io.StringIO()
+    stats = pstats.Stats(profiler, stream=text)
+    stats.sort_stats("cumulative").print_stats(20)
+    LOGGER.info("profile saved in %s\n%s", file_name, text.getvalue())
@@ -2,47 +2,92 @@
 # -*- coding: utf-8 -*-
 import re
 import logging
+import codecs
 import csv
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, BinaryIO
 
 
 LOGNAME = "quest2pdf"
 LOGGER = logging.getLogger(LOGNAME)
+LINE_END = re.compile(r"(?<=\n)|(?<=\r)(?!\n)")
 
 
 class CSVReader:
     """Convert from a Comma Separated Value file to different
-    formats.
+    formats. In stream mode the file is not read on creation:
+    rows are read one by one by iter_rows.
     """
 
-    def __init__(self, file_name: str, encoding: str = "utf-8", delimiter: str = ","):
+    def __init__(
+        self,
+        file_name: str,
+        encoding: str = "utf-8",
+        delimiter: str = ",",
+        stream: bool = False,
+    ):
         self.file_name: str = file_name
-        encoding: str = encoding
+        self.encoding: str = encoding
         self.delimiter: str = delimiter
+        self.stream: bool = stream
+        self.rows: List[Dict[str, str]] = []
 
-        try:
+        if not stream:
             self._read(encoding)
-        except UnicodeError as err:
-            msg: str = "Error in reading %s encoding %s: %s"
-            LOGGER.error(msg, self.file_name, encoding, err)
-            raise
 
     def to_dictlist(self) -> List[Dict[str, str]]:
         """Return a list of dictionaries with the file contents.
         """
+        if self.stream:
+            return list(self.iter_rows())
         return self.rows
 
+    def iter_rows(self) -> Iterator[Dict[str, str]]:
+        """Yield a dictionary for each row. In stream mode the file is read
+        while iterating, so only one row at a time is kept in memory.
+        """
+        if self.stream:
+            return self._iter_file(self.encoding)
+        return iter(self.rows)
+
     def _read(self, encoding: str, err: Optional[str] = None) -> None:
         """Read the file and fill self.rows.
         """
+        self.rows = list(self._iter_file(encoding, err))
+
+    def _iter_file(
+        self, encoding: str, err: Optional[str] = None
+    ) -> Iterator[Dict[str, str]]:
+        row_number: int = 0
         try:
-            with open(self.file_name, "r", encoding=encoding, errors=err) as csvfile:
-                cvs_reader = csv.DictReader(csvfile, delimiter=self.delimiter)
-                self.rows: List[Dict[str, str]]
-                self.rows = [row for row in cvs_reader]
+            with open(self.file_name, "rb") as csvfile:
+                lines = _decoded_lines(csvfile, encoding, err)
+                cvs_reader = csv.DictReader(lines, delimiter=self.delimiter)
+                for row_number, row in enumerate(cvs_reader, 1):
+                    yield row
         except FileNotFoundError:
             LOGGER.critical("Input file %s not found.", self.file_name)
             raise
+        except UnicodeError as error:
+            msg: str = "Error in reading %s encoding %s at row %d: %s"
+            LOGGER.error(msg, self.file_name, encoding, row_number + 1, error)
+            raise
+
+
+def _decoded_lines(
+    binary_file: BinaryIO, encoding: str, err: Optional[str] = None
+) -> Iterator[str]:
+    """Decode binary_file line by line, keeping line endings, so that
+    a decoding error is raised by the line (and the row) it belongs to.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(err or "strict")
+    pending: str = ""
+    for chunk in binary_file:
+        pending += decoder.decode(chunk)
+        *lines, pending = LINE_END.split(pending)
+        yield from lines
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield from LINE_END.split(pending)
 
 
 def exception_printer(exception_instance: Exception) -> str:
@@ -0,0 +1,116 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import aiobatch
+from manifest import MANIFEST_NAME
+
+
+def save_question_data(file_path, questions=2):
+    rows = ["question,subject,image,void,A,B,C,D"]
+    rows += [f"Q{number},S1,,,a,b,c,d" for number in range(questions)]
+    file_path.write_text("\n".join(rows))
+    return file_path
+
+
+def test_events(tmp_path):
+    input_file = save_question_data(tmp_path / "questions.csv")
+
+    async def collect():
+        with ThreadPoolExecutor(2) as executor:
+            converter = aiobatch.AsyncConverter(executor=executor)
+            return [
+                event
+                async for event in converter.events(
+                    input_file, {"number": 3}, tmp_path / "out"
+                )
+            ]
+
+    events = asyncio.run(collect())
+
+    assert [event.stage for event in events] == ["load"] + ["variant"] * 3 + ["done"]
+    assert [event.done for event in events] == [0, 1, 2, 3, 3]
+    assert {event.total for event in events} == {3}
+    assert sorted(event.variant for event in events[1:4]) == [0, 1, 2]
+    assert events[-1].files == [
+        tmp_path / "out" / f"{name}_{number}.pdf"
+        for number in range(3)
+        for name in ("Exam", "Correction")
+    ]
+    assert all(file.exists() for file in events[-1].files)
+
+
+def test_convert_max_jobs(tmp_path):
+    input_file = save_question_data(tmp_path / "questions.csv")
+    stages = []
+
+    async def convert_both():
+        with ThreadPoolExecutor(2) as executor:
+            converter = aiobatch.AsyncConverter(max_jobs=1, executor=executor)
+            return await asyncio.gather(
+                *(
+                    converter.convert(
+                        input_file,
+                        {"number": 2},
+                        tmp_path / job,
+                        lambda event, job=job: stages.append((job, event.stage)),
+                    )
+                    for job in ("first", "second")
+                )
+            )
+
+    first, second = asyncio.run(convert_both())
+
+    assert len(first) == len(second) == 4
+    # the second job starts when the first one is over
+    assert stages.index(("second", "load")) > stages.index(("first", "done"))
+
+
+def test_convert_cancel(tmp_path):
+    input_file = save_question_data(tmp_path / "questions.csv")
+    output_folder = tmp_path / "out"
+
+    async def cancel_after_first_variant():
+        with ThreadPoolExecutor(1) as executor:
+            converter = aiobatch.AsyncConverter(executor=executor)
+
+            def progress(event):
+                if event.stage == "variant":
+                    task.cancel()
+
+            task = asyncio.ensure_future(
+                converter.convert(input_file, {"number": 5}, output_folder, progress)
+            )
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    asyncio.run(cancel_after_first_variant())
+
+    files = json.loads((output_folder / MANIFEST_NAME).read_text())["files"]
+    assert len(files) == 2
+
+
+def test_convert_module(tmp_path):
+    input_file = save_question_data(tmp_path / "questions.csv")
+    parameters = {"number": 2, "combine": "interleaved", "delimiter": "comma"}
+
+    files = asyncio.run(aiobatch.convert(input_file, parameters))
+
+    assert files == [tmp_path / "Exam_all.pdf"]
+    assert files[0].exists()
+
+
+def test_convert_empty(tmp_path):
+    input_file = save_question_data(tmp_path / "questions.csv", questions=0)
+
+    assert asyncio.run(aiobatch.convert(input_file, {})) == []
+
+
+def test_convert_profile(tmp_path):
+    input_file = save_question_data(tmp_path / "questions.csv")
+
+    with pytest.raises(ValueError, match="profile"):
+        asyncio.run(aiobatch.convert(input_file, {"profile": "timing"}))
+    assert not (tmp_path / MANIFEST_NAME).exists()
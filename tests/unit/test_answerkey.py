@@ -0,0 +1,82 @@
+import csv
+import json
+
+import pytest
+
+from answerkey import variant_keys, write_answer_keys
+from exam import (
+    Exam,
+    MultiChoiceQuest,
+    MultiChoiceAnswer,
+    TrueFalseQuest,
+    TrueFalseAnswer,
+)
+from export import SerializeExam
+from permutation import PermutationEngine
+
+
+@pytest.fixture
+def engine():
+    questions = []
+    for number in range(6):
+        question = MultiChoiceQuest(f"question {number}", f"subject {number % 2}")
+        question.answers = [
+            MultiChoiceAnswer(f"answer {number}.{option}") for option in range(4)
+        ]
+        questions.append(question)
+    true_false = TrueFalseQuest("true or false", "subject 0")
+    true_false.answers = (TrueFalseAnswer(False), TrueFalseAnswer(True))
+    questions.append(true_false)
+    return PermutationEngine(Exam(*questions), "seed", 4, shuffle_questions=True)
+
+
+def exam_name(number):
+    return f"Exam_{number}.pdf"
+
+
+def test_variant_keys(engine):
+    for number in range(5):
+        correction = [
+            item.text for item in SerializeExam(engine.variant(number)).correction()
+        ]
+
+        keys = variant_keys(engine, engine.permutation(number))
+
+        assert len(keys) == 4
+        assert keys == correction[1:]
+
+
+def test_variant_keys_no_correct():
+    engine = PermutationEngine(Exam(MultiChoiceQuest("question", "subject")), "seed")
+    correction = [item.text for item in SerializeExam(engine.variant(0)).correction()]
+
+    assert variant_keys(engine, engine.permutation(0)) == correction[1:] == ["None"]
+
+
+def test_write_answer_keys_csv(tmp_path, engine):
+    write_answer_keys(tmp_path / "key.csv", engine, 3, exam_name)
+
+    with open(tmp_path / "key.csv", newline="") as key_file:
+        rows = list(csv.reader(key_file))
+    assert rows[0] == ["variant", "exam", "1", "2", "3", "4"]
+    for number, row in enumerate(rows[1:]):
+        assert row == [str(number), exam_name(number)] + variant_keys(
+            engine, engine.permutation(number)
+        )
+    assert len(rows) == 4
+
+
+def test_write_answer_keys_json(tmp_path, engine):
+    write_answer_keys(tmp_path / "key.json", engine, 3, exam_name)
+
+    content = json.loads((tmp_path / "key.json").read_text())
+    assert content["seed"] == "seed"
+    assert content["variant"] == [0, 1, 2]
+    assert content["exam"] == [exam_name(number) for number in range(3)]
+    assert content["keys"][2] == variant_keys(engine, engine.permutation(2))
+    assert content["rows"][2] == list(engine.permutation(2).questions)
+
+
+def test_write_answer_keys_unknown(tmp_path, engine):
+    with pytest.raises(ValueError):
+        write_answer_keys(tmp_path / "key.parquet", engine, 3, exam_name)
@@ -0,0 +1,217 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+import exam
+from bank import CACHE_PREFIX, QuestionBank, open_cached, source_signature
+from unit_helper import save_mono_question_data
+from utility import CSVReader
+
+
+@pytest.fixture
+def dummy_bank():
+    questions = []
+    for number in range(12):
+        q = exam.MultiChoiceQuest(
+            f"question {number}", f"subject {number % 3}", Path(), number % 4
+        )
+        q.answers = (
+            exam.MultiChoiceAnswer(f"answer {number}.1", Path("a.png")),
+            exam.MultiChoiceAnswer(f"answer {number}.2"),
+        )
+        q.correct_option = "B"
+        questions.append(q)
+    q = exam.TrueFalseQuest("true false", "subject 3", Path("b.png"), 5)
+    q.answers = (exam.TrueFalseAnswer(False), exam.TrueFalseAnswer(True))
+    questions.append(q)
+
+    return QuestionBank(questions)
+
+
+def test_bank_empty():
+    bank = QuestionBank()
+
+    assert len(bank) == 0
+    assert bank.subjects == ()
+    assert list(bank.select(min_level=1)) == []
+    assert list(bank.select("subject", min_level=1)) == []
+
+
+def test_bank_subjects(dummy_bank):
+    assert len(dummy_bank) == 13
+    assert dummy_bank.subjects == ("subject 0", "subject 1", "subject 2", "subject 3")
+    assert list(dummy_bank.subject_rows("subject 1")) == [1, 4, 7, 10]
+    assert list(dummy_bank.subject_rows("not a subject")) == []
+
+
+def test_bank_question(dummy_bank):
+    for number in range(12):
+        question = dummy_bank.question(number)
+
+        assert type(question) == exam.MultiChoiceQuest
+        assert question.text == f"question {number}"
+        assert question.subject == f"subject {number % 3}"
+        assert question.level == number % 4
+        assert question.image == Path()
+        assert [answer.text for answer in question.answers] == [
+            f"answer {number}.1",
+            f"answer {number}.2",
+        ]
+        assert question.answers[0].image == Path("a.png")
+        assert question.correct_option == "B"
+
+    question = dummy_bank.question(12)
+
+    assert type(question) == exam.TrueFalseQuest
+    assert question.image == Path("b.png")
+    assert question.correct_answer.boolean is False
+    assert question.answers[1].boolean is True
+
+
+def test_bank_masks(dummy_bank):
+    subject_mask = dummy_bank.subject_mask("subject 0", "subject 3")
+    level_mask = dummy_bank.level_mask(2, 3)
+
+    assert list(dummy_bank.indexes(subject_mask)) == [0, 3, 6, 9, 12]
+    assert list(dummy_bank.indexes(level_mask)) == [2, 3, 6, 7, 10, 11]
+    mask = dummy_bank.intersection(subject_mask, level_mask)
+    assert list(dummy_bank.indexes(mask)) == [3, 6]
+    mask = dummy_bank.union(subject_mask, level_mask)
+    assert list(dummy_bank.indexes(mask)) == [0, 2, 3, 6, 7, 9, 10, 11, 12]
+    assert list(dummy_bank.indexes(dummy_bank.subject_mask("none"))) == []
+
+
+@pytest.mark.parametrize(
+    "subject, min_level, max_level, expected",
+    [
+        (None, None, None, list(range(13))),
+        (None, 3, None, [3, 7, 11, 12]),
+        (None, None, 0, [0, 4, 8]),
+        ("subject 0", 1, 2, [6, 9]),
+        ("subject 1", 3, None, [7]),
+        ("subject 1", None, None, [1, 4, 7, 10]),
+        ("none", None, None, []),
+    ],
+)
+def test_bank_select(dummy_bank, subject, min_level, max_level, expected):
+    selected = dummy_bank.select(subject, min_level, max_level)
+
+    assert list(selected) == expected
+
+
+def test_bank_to_exam(dummy_bank):
+    selected = dummy_bank.select("subject 2", min_level=2)
+    ex = dummy_bank.to_exam(selected)
+
+    assert [question.text for question in ex.questions] == [
+        "question 2",
+        "question 11",
+    ]
+    assert len(dummy_bank.to_exam().questions) == 13
+
+
+def test_bank_wrong_type():
+    with pytest.raises(TypeError):
+        QuestionBank([exam.Question()])
+
+
+def test_bank_load(tmp_path):
+    data_file = tmp_path / "data.csv"
+    save_mono_question_data(data_file)
+    selector = ("question", "subject", "image", "void", "A", "void", "B", "void")
+    ex = exam.Exam()
+    ex.attribute_selector = selector
+    ex.load(CSVReader(str(data_file)).to_dictlist())
+
+    bank = QuestionBank()
+    bank.load(CSVReader(str(data_file), stream=True).iter_rows(), selector)
+
+    assert str(bank.to_exam()) == str(ex)
+
+
+def test_bank_cache(tmp_path, dummy_bank):
+    cache_file = tmp_path / "bank.cache"
+    dummy_bank.save(cache_file, {"path": "data.csv"})
+
+    bank, source = QuestionBank.open(cache_file)
+
+    assert source == {"path": "data.csv"}
+    assert str(bank.to_exam()) == str(dummy_bank.to_exam())
+    assert bank.subjects == dummy_bank.subjects
+    assert bank.select("subject 1", min_level=1) == dummy_bank.select(
+        "subject 1", min_level=1
+    )
+    bank.add_question(exam.MultiChoiceQuest("new", "subject 1"))
+    assert list(bank.subject_rows("subject 1")) == [1, 4, 7, 10, 13]
+
+
+@pytest.mark.parametrize("level", [-5, 40000, 2**40])
+def test_bank_cache_level(tmp_path, level):
+    cache_file = tmp_path / "bank.cache"
+    question = exam.MultiChoiceQuest("question", "subject", Path(), level)
+    QuestionBank([question, exam.MultiChoiceQuest("easy", "subject")]).save(cache_file)
+
+    bank, _ = QuestionBank.open(cache_file)
+
+    assert bank.question(0).level == level
+    assert list(bank.select(min_level=level)) == ([0, 1] if level < 0 else [0])
+
+
+@pytest.mark.parametrize("content", [b"", b"not a cache at all", None])
+def test_bank_cache_invalid(tmp_path, dummy_bank, content):
+    cache_file = tmp_path / "bank.cache"
+    if content is None:
+        dummy_bank.save(cache_file)
+        content = cache_file.read_bytes()[:-1]
+    cache_file.write_bytes(content)
+
+    with pytest.raises(ValueError):
+        QuestionBank.open(cache_file)
+
+
+def test_bank_open_cached_corrupted(tmp_path, dummy_bank, caplog):
+    source_file = tmp_path / "data.csv"
+    source_file.write_text("questions")
+    cache_file = tmp_path / "bank.cache"
+    dummy_bank.save(cache_file, source_signature(source_file))
+    # subjects missing from the header: codes out of range
+    content = cache_file.read_bytes()
+    magic, cache_format, length = CACHE_PREFIX.unpack_from(content)
+    header = json.loads(content[CACHE_PREFIX.size : CACHE_PREFIX.size + length])
+    header["subjects"] = []
+    header = json.dumps(header).encode("utf-8")
+    cache_file.write_bytes(
+        CACHE_PREFIX.pack(magic, cache_format, len(header))
+        + header
+        + content[CACHE_PREFIX.size + length :]
+    )
+
+    assert open_cached(cache_file, source_file, {}) is None
+    assert "bank cache" in caplog.text
+
+
+def test_bank_open_cached(tmp_path, dummy_bank, caplog):
+    source_file = tmp_path / "data.csv"
+    source_file.write_text("questions")
+    cache_file = tmp_path / "bank.cache"
+    options = {"delimiter": ","}
+    assert open_cached(cache_file, source_file, options) is None
+
+    source = source_signature(source_file)
+    source["options"] = options
+    dummy_bank.save(cache_file, source)
+
+    assert len(open_cached(cache_file, source_file, options)) == 13
+    assert open_cached(cache_file, source_file, {"delimiter": ";"}) is None
+    # touched, same content: signed again
+    os.utime(source_file, ns=(0, 0))
+    assert len(open_cached(cache_file, source_file, options)) == 13
+    assert QuestionBank.open(cache_file)[1]["mtime_ns"] == 0
+    assert QuestionBank.open(cache_file)[1]["options"] == options
+    source_file.write_text("changed")
+    assert open_cached(cache_file, source_file, options) is None
+    cache_file.write_bytes(b"broken")
+    assert open_cached(cache_file, source_file, options) is None
+    assert "bank cache" in caplog.text
@@ -0,0 +1,330 @@
+import io
+import json
+import zipfile
+from pathlib import Path
+
+import pytest
+from PIL import Image as PILImage
+
+import batch
+from exam import MultiChoiceQuest, MultiChoiceAnswer, Exam
+from manifest import MANIFEST_NAME
+from parameter import get_default
+
+
+@pytest.fixture
+def dummy_exam():
+    q1 = MultiChoiceQuest("question 1", "subject 1")
+    q1.answers = (MultiChoiceAnswer("answer 1"), MultiChoiceAnswer("answer 2"))
+    q2 = MultiChoiceQuest("question 2", "subject 2")
+    q2.answers = (MultiChoiceAnswer("answer 3"), MultiChoiceAnswer("answer 4"))
+
+    return Exam(q1, q2)
+
+
+def test_variant_file_names():
+    parameters = get_default()
+
+    assert batch.variant_file_names(parameters, 3) == (
+        Path("Exam_3.pdf"),
+        Path("Correction_3.pdf"),
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_generate(tmp_path, dummy_exam, workers):
+    parameters = get_default()
+    parameters["number"] = 4
+    parameters["workers"] = workers
+
+    output = batch.generate(dummy_exam, parameters, tmp_path)
+
+    assert output == [
+        (tmp_path / f"Exam_{number}.pdf", tmp_path / f"Correction_{number}.pdf")
+        for number in range(4)
+    ]
+    for exam_file, correction_file in output:
+        assert exam_file.exists()
+        assert correction_file.exists()
+
+
+def test_generate_not_shuffle(tmp_path, dummy_exam):
+    parameters = get_default()
+    parameters["not_shuffle"] = True
+
+    batch.generate(dummy_exam, parameters, tmp_path)
+
+    assert dummy_exam.questions[0].answers[0].text == "answer 1"
+    assert dummy_exam.questions[1].answers[0].text == "answer 3"
+
+
+def read_manifest(folder):
+    return json.loads((folder / MANIFEST_NAME).read_text())["files"]
+
+
+def file_state(output):
+    return [file.stat().st_mtime_ns for files in output for file in files]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_generate_incremental(tmp_path, dummy_exam, workers):
+    parameters = get_default()
+    parameters["number"] = 2
+    parameters["workers"] = workers
+
+    first = batch.generate(dummy_exam, parameters, tmp_path)
+    before = file_state(first)
+    second = batch.generate(dummy_exam, parameters, tmp_path)
+
+    assert second == first
+    assert file_state(second) == before
+
+    # corrections show the options only
+    dummy_exam.questions[0].text = "question 1 changed"
+    (tmp_path / "Correction_1.pdf").unlink()
+    third = batch.generate(dummy_exam, parameters, tmp_path)
+    after = file_state(third)
+
+    assert after[0] != before[0] and after[2] != before[2]
+    assert after[1] == before[1]
+    assert third[1][1].exists()
+
+
+def test_generate_seed(tmp_path, dummy_exam):
+    parameters = get_default()
+    parameters["number"] = 3
+    parameters["seed"] = "my seed"
+
+    engine = batch.permutation_engine(dummy_exam, parameters, "my seed")
+    first = [batch.variant_exam(engine, number) for number in range(3)]
+    (tmp_path / "first").mkdir()
+    (tmp_path / "second").mkdir()
+    batch.generate(dummy_exam, parameters, tmp_path / "first")
+    batch.generate(dummy_exam, parameters, tmp_path / "second")
+
+    for number in range(3):
+        again = batch.variant_exam(
+            batch.permutation_engine(dummy_exam, parameters, "my seed"), number
+        )
+        assert [question.correct_option for question in again.questions] == [
+            question.correct_option for question in first[number].questions
+        ]
+
+    digests = [
+        {name: entry["digest"] for name, entry in read_manifest(folder).items()}
+        for folder in (tmp_path / "first", tmp_path / "second")
+    ]
+    assert len(digests[0]) == 6
+    assert digests[0] == digests[1]
+
+
+def test_generate_sample(tmp_path, dummy_exam, caplog):
+    parameters = get_default()
+    parameters["number"] = 2
+    parameters["questions"] = "1"
+    parameters["question_order"] = "random"
+
+    output = batch.generate(dummy_exam, parameters, tmp_path)
+
+    assert len(output) == 2
+    assert "unknown question order random" in caplog.text
+    engine = batch.permutation_engine(dummy_exam, parameters, "seed")
+    assert len(batch.variant_exam(engine, 0).questions) == 1
+
+
+def test_load_exam_cache(tmp_path, monkeypatch):
+    input_file = tmp_path / "questions.csv"
+    input_file.write_text("question,subject,image,void,A,B,C,D\nQ1,S1,i.png,,a,b,c,d\n")
+    parameters = get_default()
+    parameters["delimiter"] = ","
+
+    exam = batch.load_exam(input_file, parameters, tmp_path)
+    assert (tmp_path / batch.BANK_CACHE_NAME).exists()
+    monkeypatch.setattr(batch, "CSVReader", None)
+    cached = batch.load_exam(input_file, parameters, tmp_path)
+
+    assert str(cached) == str(exam)
+    assert cached.questions[0].image == tmp_path / "i.png"
+    assert cached.attribute_selector == batch.ATTRIBUTE_SELECTOR
+
+
+def test_load_exam_cache_cwd(tmp_path, monkeypatch):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "questions.csv").write_text(
+        "question,subject,image,void,A,B,C,D\nQ1,S1,i.png,,a,b,c,d\n"
+    )
+    parameters = get_default()
+    parameters["delimiter"] = ","
+
+    monkeypatch.chdir(tmp_path)
+    exam = batch.load_exam(Path("data/questions.csv"), parameters, tmp_path)
+    assert exam.questions[0].image == Path("data/i.png")
+    monkeypatch.chdir(data)
+    monkeypatch.setattr(batch, "CSVReader", None)
+    cached = batch.load_exam(Path("questions.csv"), parameters, tmp_path)
+
+    assert cached.questions[0].image == Path("i.png")
+
+
+def test_prepare_images(tmp_path):
+    image = Path("tests/unit/resources/a.png").resolve()
+    exam = Exam(MultiChoiceQuest("question", "subject", image))
+    parameters = get_default()
+
+    batch.prepare_images(exam, parameters, tmp_path)
+    assert exam.questions[0].image == image
+
+    parameters["image_dpi"] = 72
+    batch.prepare_images(exam, parameters, tmp_path)
+    prepared = exam.questions[0].image
+    assert prepared.parent == tmp_path / batch.IMAGE_CACHE_NAME
+    assert prepared.stat().st_size < image.stat().st_size
+
+
+def test_convert_images_workers(tmp_path):
+    rows = ["question,subject,image,void,A,void,B,void,C,void,D"]
+    for number in range(6):
+        image = PILImage.effect_noise((600, 400), 64).convert("RGB")
+        image.save(tmp_path / f"image{number}.png")
+        rows.append(f"Q{number},S,image{number}.png,,a,,b,,c,,d")
+    input_file = tmp_path / "questions.csv"
+    input_file.write_text("\n".join(rows))
+    parameters = get_default()
+    parameters.update(number=2, workers=2, delimiter=",")
+
+    output = batch.convert(input_file, parameters, tmp_path)
+
+    assert [file.name for group in output for file in group] == [
+        "Exam_0.pdf",
+        "Correction_0.pdf",
+        "Exam_1.pdf",
+        "Correction_1.pdf",
+    ]
+
+
+def test_generate_prefetch(tmp_path, dummy_exam, monkeypatch):
+    images = [Path("tests/unit/resources") / f"{name}.png" for name in "ab"]
+    dummy_exam.questions[0].image = images[0]
+    dummy_exam.questions[1].answers[0].image = images[1]
+    parameters = get_default()
+    parameters["number"] = 2
+    prefetched = []
+    monkeypatch.setattr(batch, "prefetch_images", prefetched.extend)
+
+    batch.generate(dummy_exam, parameters, tmp_path)
+
+    # the images of each variant, when the variant is to be written
+    assert sorted(prefetched) == sorted(images * 2)
+
+
+def test_convert_sampled_images(tmp_path, monkeypatch):
+    rows = ["question,subject,image,void,A,void,B,void,C,void,D"]
+    for number in range(8):
+        image = PILImage.effect_noise((300, 200), 64).convert("RGB")
+        image.save(tmp_path / f"image{number}.png")
+        rows.append(f"Q{number},S,image{number}.png,,a,,b,,c,,d")
+    input_file = tmp_path / "questions.csv"
+    input_file.write_text("\n".join(rows))
+    parameters = get_default()
+    parameters.update(number=2, questions=1, image_dpi=72, delimiter=",")
+    prefetched = []
+    monkeypatch.setattr(batch, "prefetch_images", prefetched.extend)
+
+    batch.convert(input_file, parameters, tmp_path)
+
+    # only the images of the sampled questions are resampled and prefetched
+    resampled = list((tmp_path / batch.IMAGE_CACHE_NAME).iterdir())
+    assert 1 <= len(resampled) <= 2
+    assert set(prefetched) == set(resampled)
+
+
+@pytest.mark.parametrize("answer_format", ["csv", "json", "xml"])
+def test_generate_answer_key(tmp_path, dummy_exam, answer_format):
+    parameters = get_default()
+    parameters["number"] = 3
+    parameters["answer_key"] = answer_format
+
+    batch.generate(dummy_exam, parameters, tmp_path)
+
+    key_file = tmp_path / f"Correction_key.{answer_format}"
+    assert key_file.exists() == (answer_format != "xml")
+
+
+def test_generate_stream(tmp_path, dummy_exam):
+    parameters = get_default()
+    parameters["layout"] = "stream"
+
+    output = batch.generate(dummy_exam, parameters, tmp_path)
+
+    assert b"/FormXob.pageNumber" in output[0][0].read_bytes()
+
+
+@pytest.mark.parametrize(
+    "combine, files",
+    [
+        ("variants", ("Exam_all.pdf", "Correction_all.pdf")),
+        ("interleaved", ("Exam_all.pdf",)),
+    ],
+)
+def test_generate_combined(tmp_path, dummy_exam, combine, files):
+    parameters = get_default()
+    parameters["number"] = 3
+    parameters["combine"] = combine
+
+    output = batch.generate(dummy_exam, parameters, tmp_path)
+
+    assert output == [tuple(tmp_path / file for file in files)]
+    assert sorted(file.name for file in tmp_path.glob("*.pdf")) == sorted(files)
+    content = output[0][0].read_bytes()
+    assert b"(Exam_2)" in content
+    assert (b"(Correction_2)" in content) == (combine == "interleaved")
+    before = file_state(output)
+    assert batch.generate(dummy_exam, parameters, tmp_path) == output
+    assert file_state(output) == before
+
+    dummy_exam.questions[0].text = "question 1 changed"
+    batch.generate(dummy_exam, parameters, tmp_path)
+    assert file_state(output)[0] != before[0]
+
+
+def test_generate_combined_unknown(tmp_path, dummy_exam, caplog):
+    parameters = get_default()
+    parameters["combine"] = "all"
+
+    output = batch.generate(dummy_exam, parameters, tmp_path)
+
+    assert output == [(tmp_path / "Exam_0.pdf", tmp_path / "Correction_0.pdf")]
+    assert "unknown combine mode all" in caplog.text
+
+
+class WriteOnly(io.RawIOBase):
+    """A socket alike: it can be written, not seeked."""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+
+def test_write_archive(tmp_path, dummy_exam, monkeypatch):
+    parameters = get_default()
+    parameters["number"] = 2
+    parameters["seed"] = "seed"
+    monkeypatch.chdir(tmp_path)
+    archive = WriteOnly()
+
+    files = batch.write_archive(dummy_exam, parameters, archive)
+
+    names = ["Exam_0.pdf", "Correction_0.pdf", "Exam_1.pdf", "Correction_1.pdf"]
+    assert files == [Path(name) for name in names]
+    assert list(tmp_path.iterdir()) == []
+    with zipfile.ZipFile(io.BytesIO(archive.data)) as zip_file:
+        assert zip_file.namelist() == names
+        for name in names:
+            assert zip_file.read(name).startswith(b"%PDF")
@@ -0,0 +1,84 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import cli
+from _version import __version__
+
+
+def save_question_data(file_path):
+    text = "question,subject,image,void,A,B,C,D\nQ1,S1,,,a,b,c,d\nQ2,S2,,,a,b,c,d\n"
+    file_path.write_text(text)
+
+
+def test_cli_lazy_imports():
+    code = (
+        "import sys, cli; print('tkinter' in sys.modules, 'reportlab' in sys.modules)"
+    )
+    src = Path(cli.__file__).parent
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=src,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert output.stdout == "False False\n"
+
+
+def test_cli(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    save_question_data(tmp_path / "first.csv")
+    save_question_data(tmp_path / "second.csv")
+
+    status = cli.main(["first.csv", "second.csv", "-o", "out", "-p", "number", "2"])
+
+    assert status == cli.EXIT_OK
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["input"] for line in lines] == ["first.csv", "second.csv"]
+    assert [line["status"] for line in lines] == ["ok", "ok"]
+    assert lines[0]["files"] == [
+        str(Path("out/first") / name)
+        for name in ("Exam_0.pdf", "Correction_0.pdf", "Exam_1.pdf", "Correction_1.pdf")
+    ]
+    for file in lines[0]["files"] + lines[1]["files"]:
+        assert (tmp_path / file).exists()
+
+
+def test_cli_version(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(["--version"])
+
+    assert exit_info.value.code == cli.EXIT_OK
+    assert capsys.readouterr().out.strip() == __version__
+
+
+def test_cli_same_name(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "other").mkdir()
+    save_question_data(tmp_path / "exam.csv")
+    save_question_data(tmp_path / "other" / "exam.csv")
+
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(["exam.csv", "other/exam.csv"])
+
+    assert exit_info.value.code == cli.EXIT_USAGE
+    assert "exam" in capsys.readouterr().err
+    assert not (tmp_path / "exam").exists()
+
+
+def test_cli_failed(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    save_question_data(tmp_path / "good.csv")
+    (tmp_path / "empty.csv").write_text("question,subject\n")
+
+    status = cli.main(["good.csv", "empty.csv", "missing.csv"])
+
+    assert status == cli.EXIT_FAILED
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [line["status"] for line in lines] == ["ok", "empty", "error"]
+    assert lines[2]["error"].startswith("FileNotFoundError")
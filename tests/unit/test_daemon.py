@@ -0,0 +1,107 @@
+import fcntl
+import json
+import threading
+
+import daemon
+from parameter import get_default, translate_delimiter
+
+
+def save_question_data(file_path, delimiter=","):
+    rows = ("question,subject,image,void,A,B,C,D", "Q1,S1,,,a,b,c,d")
+    file_path.write_text("\n".join(row.replace(",", delimiter) for row in rows))
+
+
+def read_status(spool, name):
+    return json.loads((spool / daemon.DONE / name).read_text())
+
+
+def default_parameters():
+    parameters = get_default()
+    parameters["delimiter"] = translate_delimiter(parameters["delimiter"])
+    return parameters
+
+
+def test_submit(tmp_path):
+    spool = tmp_path / "spool"
+    name = daemon.submit(spool, tmp_path / "a.csv", tmp_path / "out", {"number": 2})
+
+    job = json.loads((spool / daemon.INCOMING / name).read_text())
+    assert job == {
+        "input": str(tmp_path / "a.csv"),
+        "output": str(tmp_path / "out"),
+        "parameters": {"number": 2},
+    }
+    assert [path.name for path in (spool / daemon.INCOMING).iterdir()] == [name]
+
+
+def test_daemon_run_once(tmp_path):
+    spool = tmp_path / "spool"
+    save_question_data(tmp_path / "good.csv", delimiter=";")
+    good = daemon.submit(
+        spool,
+        tmp_path / "good.csv",
+        tmp_path / "out",
+        {"number": 2, "delimiter": "semicolon"},
+    )
+    missing = daemon.submit(spool, tmp_path / "missing.csv", tmp_path / "missing")
+    (spool / daemon.INCOMING / "bad.json").write_text("{")
+    (spool / daemon.INCOMING / "list.json").write_text("[1]")
+    (spool / daemon.INCOMING / "no_input.json").write_text('{"output": "out"}')
+
+    names = daemon.SpoolDaemon(spool, default_parameters(), workers=2).run_once()
+
+    assert names == [good, missing]
+    status = read_status(spool, good)
+    assert status["status"] == "ok"
+    assert len(status["files"]) == 4
+    assert status["seconds"] >= 0 and status["queued"] >= 0
+    assert read_status(spool, missing)["status"] == "error"
+    for name in ("bad.json", "list.json", "no_input.json"):
+        assert read_status(spool, name)["status"] == "error"
+    assert list((spool / daemon.INCOMING).iterdir()) == []
+    assert list((spool / daemon.RUNNING).iterdir()) == []
+
+
+def test_daemon_run(tmp_path):
+    spool = tmp_path / "spool"
+    save_question_data(tmp_path / "good.csv")
+    name = daemon.submit(spool, tmp_path / "good.csv", tmp_path / "out")
+    # left running by a stopped daemon
+    (spool / daemon.RUNNING).mkdir()
+    (spool / daemon.INCOMING / name).rename(spool / daemon.RUNNING / name)
+
+    spool_daemon = daemon.SpoolDaemon(spool, default_parameters(), 1, poll=0.05)
+    stop = threading.Event()
+    thread = threading.Thread(target=spool_daemon.run, args=(stop,))
+    thread.start()
+    try:
+        for _ in range(200):
+            if (spool / daemon.DONE / name).exists():
+                break
+            stop.wait(0.05)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert read_status(spool, name)["status"] == "ok"
+    assert (tmp_path / "out" / "Exam_0.pdf").exists()
+
+
+def test_daemon_requeue(tmp_path):
+    spool = tmp_path / "spool"
+    names = [daemon.submit(spool, tmp_path / "a.csv", tmp_path / "out") for _ in "ab"]
+    (spool / daemon.RUNNING).mkdir()
+    for name in names:
+        (spool / daemon.INCOMING / name).rename(spool / daemon.RUNNING / name)
+    # the first one is being converted by a live daemon
+    with open(spool / daemon.RUNNING / names[0], "rb") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        daemon.SpoolDaemon(spool, default_parameters())
+
+        assert [path.name for path in (spool / daemon.RUNNING).iterdir()] == names[:1]
+        assert [path.name for path in (spool / daemon.INCOMING).iterdir()] == names[1:]
+
+        # and a job claimed by another daemon is skipped
+        (spool / daemon.RUNNING / names[0]).rename(spool / daemon.INCOMING / names[0])
+        claimed = daemon.SpoolDaemon(spool, default_parameters())._claim()
+        assert [job["name"] for job in claimed] == names[1:]
@@ -2,6 +2,7 @@ import exam
 import pytest
 from pathlib import Path
 from utility import safe_int
+import pickle
 import random
 
 
@@ -944,6 +945,36 @@ def test_exam_add_path_parent():
     assert ex.questions[1].answers[0].image == Path()
 
 
+def test_exam_map_images():
+    image = Path("images/image.png")
+    q1 = exam.MultiChoiceQuest("q1 text", "")
+    q1.answers = (exam.MultiChoiceAnswer("a1 text", image),)
+    q2 = exam.MultiChoiceQuest("q2 text", "", image)
+    q2.add_answer(exam.MultiChoiceAnswer("a2 text"))
+    ex = exam.Exam(q1, q2)
+    ex.map_images(lambda file_path: file_path.with_suffix(".jpg"))
+
+    assert ex.questions[0].image == Path()
+    assert ex.questions[0].answers[0].image == Path("images/image.jpg")
+    assert ex.questions[1].image == Path("images/image.jpg")
+    assert ex.questions[1].answers[0].image == Path()
+
+
+def test_exam_images():
+    first = Path("images/first.png")
+    second = Path("images/second.png")
+    q1 = exam.MultiChoiceQuest("q1 text", "")
+    q1.answers = (
+        exam.MultiChoiceAnswer("a1 text", second),
+        exam.MultiChoiceAnswer("a2 text"),
+    )
+    q2 = exam.MultiChoiceQuest("q2 text", "", first)
+    q2.add_answer(exam.MultiChoiceAnswer("a3 text", second))
+
+    assert exam.Exam(q1, q2).images() == [second, first]
+    assert exam.Exam().images() == []
+
+
 def test_exam_load1():
     """test empty iterable
     """
@@ -1190,3 +1221,75 @@ def test_exam_mixquestion():
     assert ex.questions[0].correct_option == "A"
     assert ex.questions[1].text == "mc quest2 text"
     assert ex.questions[1].correct_answer.text == "False"
+
+
+@pytest.mark.parametrize(
+    "cls",
+    [
+        exam.MultiChoiceAnswer,
+        exam.TrueFalseAnswer,
+        exam.MultiChoiceQuest,
+        exam.TrueFalseQuest,
+    ],
+)
+def test_compact_sequences(cls):
+    """load sequences are shared class constants
+    """
+    obj1 = cls()
+    obj2 = cls()
+
+    assert obj1.attr_load_sequence is obj2.attr_load_sequence
+    assert obj1.type_caster_sequence is obj2.type_caster_sequence
+    assert obj1.attr_load_sequence is cls._attr_load_sequence
+
+
+def test_compact_slots_pickle():
+    q = exam.MultiChoiceQuest("text", "subject", Path("image.png"), 2)
+    q.answers = (exam.MultiChoiceAnswer("a1"), exam.MultiChoiceAnswer("a2"))
+    q.correct_option = "B"
+
+    copy = pickle.loads(pickle.dumps(q))
+
+    assert str(copy) == str(q)
+    assert copy.correct_answer is copy.answers[1]
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        (),
+        ("Q",),
+        ("Q", "S", "i.png"),
+        ("Q", "S", "", "2", "A", "", "B", "b.png"),
+        ("Q", "S", "", "x", "A", "", "", "", "C", ""),
+        ("Q", "S", "", "", "A", "", "B"),
+        ("Q", "S", "", "", "A", "", ""),
+    ],
+)
+@pytest.mark.parametrize("question_type", [exam.MultiChoiceQuest, exam.TrueFalseQuest])
+def test_compile_row_loader(values, question_type):
+    """compiled loaders load as load_sequentially does
+    """
+    keys = tuple(f"key {index}" for index in range(len(values)))
+    row = dict(zip(keys, values))
+    if question_type is exam.TrueFalseQuest:
+        row = dict(zip(keys, values[:6]))
+        keys = keys[:6]
+
+    loaded = exam.compile_row_loader(question_type, keys)(row)
+
+    if not keys:
+        assert loaded is None
+        return
+    expected = question_type()
+    expected.load_sequentially(iter([row[key] for key in keys]))
+    assert str(loaded) == str(expected)
+    assert type(loaded) is question_type
+
+
+def test_compile_row_loader_cached():
+    keys = ("question", "subject")
+
+    loader = exam.compile_row_loader(exam.MultiChoiceQuest, keys)
+
+    assert exam.compile_row_loader(exam.MultiChoiceQuest, keys) is loader
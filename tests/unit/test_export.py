@@ -1,6 +1,8 @@
 import pytest
+import io
 import pathlib
 from export import ItemLevel, SerializeExam, Item, RLInterface
+from export import CombinedRLInterface, Section
 import exam
 
 
@@ -110,6 +112,15 @@ class MonkeyPDFDoc:
     def build(self):
         pass
 
+    @staticmethod
+    def add_section(title, **kwargs):
+        MonkeyPDFDoc.output["item"].append((title, kwargs))
+
+    @staticmethod
+    def build_stream(feed):
+        while feed():
+            pass
+
     @staticmethod
     def clear():
         MonkeyPDFDoc.output = {"init": [], "item": []}
@@ -234,3 +245,90 @@ def test_rlinterface7(monkeypatch):
             Item(ItemLevel.sub, "text 4", "image 4"),
         ],
     }
+
+
+@pytest.mark.parametrize(
+    "items",
+    [
+        (),
+        (
+            Item(ItemLevel.top, "text 1", "image 1"),
+            Item(ItemLevel.sub, "text 2", "image 2"),
+            Item(ItemLevel.top, "text 3", "image 3"),
+        ),
+    ],
+)
+def test_rlinterface_stream(monkeypatch, items):
+    MonkeyPDFDoc.clear()
+    monkeypatch.setattr("rlwrapper.PDFDoc", MonkeyPDFDoc)
+    file_name = pathlib.Path("file")
+    interface = RLInterface(iter(items), file_name, layout="stream")
+    interface.build()
+
+    assert MonkeyPDFDoc.output == {"init": [file_name], "item": list(items)}
+
+
+def test_rlinterface_buffer(monkeypatch):
+    MonkeyPDFDoc.clear()
+    monkeypatch.setattr("rlwrapper.PDFDoc", MonkeyPDFDoc)
+    buffer = io.BytesIO()
+    items = (Item(ItemLevel.top, "text 1", "image 1"),)
+    RLInterface(iter(items), buffer, destination=pathlib.Path("folder")).build()
+    CombinedRLInterface(iter(()), buffer, destination=pathlib.Path("folder")).build()
+
+    assert MonkeyPDFDoc.output["init"] == [buffer, buffer]
+
+
+def test_rlinterface_stream_errors(monkeypatch):
+    MonkeyPDFDoc.clear()
+    monkeypatch.setattr("rlwrapper.PDFDoc", MonkeyPDFDoc)
+    input_iter = iter((Item(ItemLevel.sub, "text", "image"),))
+    interface = RLInterface(input_iter, pathlib.Path("file"), layout="stream")
+    with pytest.raises(AssertionError):
+        interface.build()
+    input_iter = iter((Item(ItemLevel.top, "text", "image"), Item(3, "text", "")))
+    interface = RLInterface(input_iter, pathlib.Path("file"), layout="stream")
+    with pytest.raises(ValueError):
+        interface.build()
+
+
+def test_combined_rlinterface(monkeypatch):
+    MonkeyPDFDoc.clear()
+    monkeypatch.setattr("rlwrapper.PDFDoc", MonkeyPDFDoc)
+    first = (
+        Item(ItemLevel.top, "text 1", "image 1"),
+        Item(ItemLevel.sub, "text 2", "image 2"),
+    )
+    second = (Item(ItemLevel.top, "text 3", "image 3"),)
+    sections = (
+        Section("first", first, {"heading": "heading", "layout": "whole"}),
+        Section("empty", (), {}),
+        Section("second", second, {"top_item_bullet_type": "A"}),
+    )
+    file_name = pathlib.Path("file")
+    CombinedRLInterface(iter(sections), file_name).build()
+
+    default = {
+        "heading": "",
+        "footer": "",
+        "top_item_bullet_type": "1",
+        "sub_item_bullet_type": "A",
+    }
+    assert MonkeyPDFDoc.output == {
+        "init": [file_name],
+        "item": [
+            ("first", {**default, "heading": "heading"}),
+            *first,
+            ("empty", default),
+            ("second", {**default, "top_item_bullet_type": "A"}),
+            *second,
+        ],
+    }
+
+
+def test_combined_rlinterface_errors(monkeypatch):
+    MonkeyPDFDoc.clear()
+    monkeypatch.setattr("rlwrapper.PDFDoc", MonkeyPDFDoc)
+    sections = iter((Section("first", (Item(ItemLevel.sub, "text", "image"),), {}),))
+    with pytest.raises(AssertionError):
+        CombinedRLInterface(sections, pathlib.Path("file")).build()
@@ -0,0 +1,110 @@
+import random
+
+import pytest
+from PIL import Image
+
+from imageprep import ImagePipeline
+
+
+def save_image(file_name, mode, size, colors=None):
+    rng = random.Random(0)
+    image = Image.new(mode, size)
+    bands = len(image.getbands())
+
+    def color():
+        if bands == 1:
+            return rng.randrange(256)
+        return tuple(rng.randrange(256) for _ in range(bands))
+
+    palette = [color() for _ in range(colors or 1)]
+    image.putdata(
+        [
+            palette[rng.randrange(len(palette))] if colors else color()
+            for _ in range(size[0] * size[1])
+        ]
+    )
+    image.save(file_name)
+    return file_name
+
+
+def test_prepare_photo(tmp_path):
+    source = save_image(tmp_path / "photo.png", "RGB", (600, 300))
+    pipeline = ImagePipeline(tmp_path / "cache", dpi=144)
+
+    prepared = pipeline.prepare(source, 80)
+
+    assert prepared.parent == tmp_path / "cache"
+    assert prepared.suffix == ".jpg"
+    with Image.open(prepared) as image:
+        assert image.size == (160, 80)
+    assert pipeline.images == 1
+    assert pipeline.saved_bytes == source.stat().st_size - prepared.stat().st_size
+    assert pipeline.saved_bytes > 0
+
+
+@pytest.mark.parametrize("mode", ["RGB", "RGBA"])
+def test_prepare_palette(tmp_path, mode):
+    source = save_image(tmp_path / "drawing.png", mode, (400, 400), colors=4)
+    pipeline = ImagePipeline(tmp_path / "cache", dpi=72)
+
+    prepared = pipeline.prepare(source, 100)
+
+    assert prepared.suffix == ".png"
+    with Image.open(prepared) as image:
+        assert image.mode == "P"
+        assert image.size == (100, 100)
+
+
+def test_prepare_cached(tmp_path, monkeypatch):
+    source = save_image(tmp_path / "photo.png", "RGB", (600, 300))
+    prepared = ImagePipeline(tmp_path / "cache").prepare(source, 80)
+
+    def convert(*args):
+        raise AssertionError("converted again")
+
+    pipeline = ImagePipeline(tmp_path / "cache")
+    monkeypatch.setattr(pipeline, "_convert", convert)
+    assert pipeline.prepare(source, 80) == prepared
+    assert ImagePipeline(tmp_path / "cache", dpi=300).prepare(source, 80) != prepared
+
+
+def test_prepare_source_kept(tmp_path, caplog):
+    small = save_image(tmp_path / "small.png", "L", (8, 8), colors=2)
+    not_image = tmp_path / "not_image.png"
+    not_image.write_bytes(b"not an image")
+    pipeline = ImagePipeline(tmp_path / "cache")
+
+    assert pipeline.prepare(small, 80) == small
+    assert pipeline.prepare(not_image, 80) == not_image
+    assert pipeline.prepare(tmp_path / "missing.png", 80) == tmp_path / "missing.png"
+    assert pipeline.saved_bytes == 0
+    assert "not resampled" in caplog.text
+
+
+def test_prepare_16_bit(tmp_path):
+    gradient = Image.linear_gradient("L").resize((512, 256)).convert("I")
+    source = tmp_path / "gray16.png"
+    gradient.point(lambda value: value * 257).convert("I;16").save(source)
+    pipeline = ImagePipeline(tmp_path / "cache", dpi=72)
+
+    prepared = pipeline.prepare(source, 128)
+
+    with Image.open(prepared) as image:
+        assert image.mode == "L"
+        assert image.size == (128, 64)
+        assert image.getextrema()[1] > 200
+
+
+@pytest.mark.parametrize(
+    "error", [ValueError("image has wrong mode"), Image.DecompressionBombError()]
+)
+def test_prepare_error_source_kept(tmp_path, monkeypatch, caplog, error):
+    source = save_image(tmp_path / "photo.png", "RGB", (600, 300))
+    pipeline = ImagePipeline(tmp_path / "cache")
+
+    def convert(*args):
+        raise error
+
+    monkeypatch.setattr(pipeline, "_convert", convert)
+    assert pipeline.prepare(source, 80) == source
+    assert "not resampled" in caplog.text
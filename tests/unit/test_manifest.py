@@ -0,0 +1,60 @@
+from pathlib import Path
+
+from export import Item, ItemLevel
+from manifest import BuildManifest, MANIFEST_NAME, file_digest, items_digest
+from manifest import sections_digest
+
+
+def test_file_digest(tmp_path):
+    image = tmp_path / "image.png"
+    image.write_bytes(b"first")
+    first = file_digest(image)
+    image.write_bytes(b"second")
+
+    assert file_digest(image) != first
+    assert file_digest(tmp_path / "missing.png") == "missing"
+
+
+def test_items_digest(tmp_path):
+    image = tmp_path / "image.png"
+    image.write_bytes(b"image")
+    items = [Item(ItemLevel.top, "question", image)]
+    digest = items_digest(items, {"heading": ""})
+
+    assert items_digest(items, {"heading": ""}) == digest
+    assert items_digest(items, {"heading": "changed"}) != digest
+    assert items_digest([Item(ItemLevel.top, "question", Path("."))], {}) != digest
+    image.write_bytes(b"changed image")
+    assert items_digest(items, {"heading": ""}) != digest
+
+
+def test_sections_digest():
+    digest = sections_digest(["a", "b"])
+
+    assert sections_digest(["a", "b"]) == digest
+    assert sections_digest(["b", "a"]) != digest
+    assert sections_digest(["a"]) != digest
+
+
+def test_build_manifest(tmp_path):
+    (tmp_path / "Exam_0.pdf").write_bytes(b"pdf")
+    manifest = BuildManifest(tmp_path, "seed")
+    manifest.record(Path("Exam_0.pdf"), "digest")
+    manifest.save()
+
+    loaded = BuildManifest.load(tmp_path)
+    assert loaded.seed == "seed"
+    assert loaded.is_current(Path("Exam_0.pdf"), "digest")
+    assert not loaded.is_current(Path("Exam_0.pdf"), "other digest")
+    assert not loaded.is_current(Path("Exam_1.pdf"), "digest")
+    (tmp_path / "Exam_0.pdf").write_bytes(b"modified pdf")
+    assert not loaded.is_current(Path("Exam_0.pdf"), "digest")
+
+
+def test_build_manifest_invalid(tmp_path, caplog):
+    (tmp_path / MANIFEST_NAME).write_text("{")
+
+    manifest = BuildManifest.load(tmp_path)
+
+    assert manifest.seed is None
+    assert "invalid manifest" in caplog.text
@@ -43,6 +43,15 @@ def test_app_conf_file_curr_dir(tmp_path, caplog, monkeypatch):
         "encoding": "utf-8",
         "delimiter": ",",
         "not_shuffle": False,
+        "workers": 1,
+        "profile": "",
+        "seed": "",
+        "questions": 0,
+        "question_order": "loaded",
+        "answer_key": "",
+        "layout": "whole",
+        "combine": "",
+        "image_dpi": 0,
     }
 
     script_home_empty_dir = tmp_path / "empty"
@@ -246,6 +255,15 @@ def test_given_args(tmp_path, monkeypatch):
         "encoding": "utf-8",
         "delimiter": ",",
         "not_shuffle": False,
+        "workers": 1,
+        "profile": "",
+        "seed": "",
+        "questions": 0,
+        "question_order": "loaded",
+        "answer_key": "",
+        "layout": "whole",
+        "combine": "",
+        "image_dpi": 0,
     }
 
     monkeypatch.chdir(tmp_path)
@@ -0,0 +1,165 @@
+import pickle
+from pathlib import Path
+
+import pytest
+
+from bank import NO_CORRECT
+from exam import (
+    Exam,
+    MultiChoiceQuest,
+    MultiChoiceAnswer,
+    TrueFalseQuest,
+    TrueFalseAnswer,
+    Question,
+)
+from permutation import PermutationEngine, _allocate
+
+
+@pytest.fixture
+def mixed_exam():
+    questions = []
+    for number in range(20):
+        question = MultiChoiceQuest(f"question {number}", "subject")
+        question.answers = [
+            MultiChoiceAnswer(f"answer {number}.{option}") for option in range(4)
+        ]
+        questions.append(question)
+    true_false = TrueFalseQuest("true or false", "subject")
+    true_false.answers = (TrueFalseAnswer(False), TrueFalseAnswer(True))
+    questions.append(true_false)
+    questions.append(Question("open question"))
+    return Exam(*questions)
+
+
+def test_permutation(mixed_exam):
+    engine = PermutationEngine(mixed_exam, "seed")
+
+    permutation = engine.permutation(3)
+
+    assert len(permutation) == 22
+    assert permutation.order.itemsize == 2
+    for index in range(20):
+        assert sorted(permutation.answer_order(index)) == [0, 1, 2, 3]
+        assert permutation.answer_order(index)[permutation.correct[index]] == 0
+    assert list(permutation.answer_order(20)) == [1, 0]
+    assert permutation.correct[20] == 1
+    assert list(permutation.answer_order(21)) == []
+    assert permutation.correct[21] == NO_CORRECT
+
+
+def test_permutation_reproducible(mixed_exam):
+    engine = PermutationEngine(mixed_exam, "seed")
+    variants = [engine.permutation(number) for number in range(5)]
+
+    # any variant again, out of order and by another engine
+    again = PermutationEngine(mixed_exam, "seed").permutation(4)
+    assert again.order == variants[4].order
+    assert again.correct == variants[4].correct
+    assert len({permutation.order.tobytes() for permutation in variants}) == 5
+    other_seed = PermutationEngine(mixed_exam, "other").permutation(4)
+    assert other_seed.order != variants[4].order
+
+
+def test_permutation_apply(mixed_exam):
+    engine = PermutationEngine(mixed_exam, "seed")
+    permutation = engine.permutation(0)
+
+    variant = engine.variant(0)
+
+    for index, (question, original) in enumerate(
+        zip(variant.questions, mixed_exam.questions)
+    ):
+        assert question.text == original.text
+        assert question.answers == tuple(
+            original.answers[answer] for answer in permutation.answer_order(index)
+        )
+        if index < 20:
+            assert question.correct_answer is original.correct_answer
+            assert question.correct_option == chr(ord("A") + permutation.correct[index])
+    # the loaded exam is left as it was
+    assert [question.correct_option for question in mixed_exam.questions[:20]] == [
+        "A"
+    ] * 20
+    assert str(pickle.loads(pickle.dumps(variant))) == str(variant)
+    with pytest.raises(ValueError):
+        permutation.apply(Exam())
+
+
+@pytest.fixture
+def bank_exam():
+    questions = []
+    # subject A: 60 questions of level 1 and 30 of level 2, subject B: 10
+    for number in range(100):
+        subject, level = (
+            ("A", 1) if number < 60 else ("A", 2) if number < 90 else ("B", 1)
+        )
+        question = MultiChoiceQuest(f"question {number}", subject, Path(), level)
+        question.answers = [MultiChoiceAnswer(f"{number}.{option}") for option in "ab"]
+        questions.append(question)
+    return Exam(*questions)
+
+
+def test_permutation_sample(bank_exam):
+    engine = PermutationEngine(bank_exam, "seed", questions=10)
+
+    permutations = [engine.permutation(number) for number in range(20)]
+
+    for permutation in permutations:
+        selected = list(permutation.questions)
+        assert selected == sorted(set(selected))
+        strata = [
+            (bank_exam.questions[index].subject, bank_exam.questions[index].level)
+            for index in selected
+        ]
+        assert strata.count(("A", 1)) == 6
+        assert strata.count(("A", 2)) == 3
+        assert strata.count(("B", 1)) == 1
+    assert len({permutation.questions.tobytes() for permutation in permutations}) > 1
+    again = PermutationEngine(bank_exam, "seed", questions=10).permutation(7)
+    assert again.questions == permutations[7].questions
+    assert again.order == permutations[7].order
+
+    variant = engine.variant(7)
+    assert [question.text for question in variant.questions] == [
+        f"question {index}" for index in permutations[7].questions
+    ]
+
+
+def test_permutation_question_order(bank_exam):
+    engine = PermutationEngine(
+        bank_exam, "seed", shuffle_questions=True, shuffle_answers=False
+    )
+
+    permutation = engine.permutation(0)
+
+    assert sorted(permutation.questions) == list(range(100))
+    assert list(permutation.questions) != list(range(100))
+    assert list(permutation.order) == [0, 1] * 100
+    variant = permutation.apply(bank_exam)
+    assert [question.correct_option for question in variant.questions] == ["A"] * 100
+
+
+@pytest.mark.parametrize("questions", [0, 100, 1000])
+def test_permutation_no_sample(bank_exam, questions):
+    engine = PermutationEngine(bank_exam, "seed", questions, shuffle_answers=False)
+
+    assert engine.variant(0) is bank_exam
+
+
+@pytest.mark.parametrize("questions", [0, 10])
+def test_permutation_used_questions(bank_exam, questions):
+    engine = PermutationEngine(bank_exam, "seed", questions)
+
+    used = engine.used_questions(3)
+
+    expected = set()
+    for number in range(3):
+        expected.update(engine.permutation(number).questions)
+    assert list(used) == sorted(expected)
+    assert (len(used) < 100) == (questions > 0)
+
+
+def test_allocate():
+    assert _allocate([60, 30, 10], 10) == [6, 3, 1]
+    assert _allocate([5, 3, 2], 3) == [1, 1, 1]
+    assert sum(_allocate([7, 7, 7], 4)) == 4
@@ -1,10 +1,22 @@
 from pathlib import Path
 import logging
+import os
+import threading
+from io import BytesIO
 import pytest
 from collections import namedtuple
+from concurrent.futures import Future
 from reportlab.lib.styles import ParagraphStyle
-from rlwrapper import Style, get_std_aspect_image, PDFDoc
-from reportlab.platypus import ListFlowable, ListItem, KeepTogether
+from copy import deepcopy
+from rlwrapper import Style, get_style, get_std_aspect_image, PDFDoc
+from rlwrapper import ImageCache, IMAGE_CACHE, FlowableCache, WrapOnceParagraph
+from rlwrapper import FlowableStream, FormNumberedCanvas, NumberedCanvas
+from rlwrapper import _section_page
+import rlwrapper
+from reportlab import rl_config
+from reportlab.pdfbase import pdfmetrics
+from PIL import Image as PILImage
+from reportlab.platypus import ListFlowable, ListItem, KeepTogether, Image
 
 RESOURCES = Path("tests/unit/resources")
 
@@ -30,6 +42,49 @@ def test_style_kwargs():
     assert style.normal.spaceAfter == 50
 
 
+def test_get_style_shared():
+    assert get_style() is get_style()
+    assert get_style(spaceAfter=50) is get_style(spaceAfter=50)
+    assert get_style(spaceAfter=50) is not get_style()
+
+
+def test_preload(monkeypatch):
+    monkeypatch.setattr(rlwrapper, "_STYLE_CACHE", {})
+    rlwrapper.preload()
+
+    assert list(rlwrapper._STYLE_CACHE) == [()]
+    assert get_style().normal.fontName in pdfmetrics._fonts
+
+
+def test_get_style_kwargs():
+    style = get_style(spaceAfter=50, fontSize=12)
+
+    assert style.title.spaceAfter == 50
+    assert style.normal.spaceAfter == 50
+    assert style.normal.fontSize == 12
+    assert style.normal.name == "Normal"
+
+
+def test_get_style_read_only():
+    style = get_style()
+
+    with pytest.raises(AttributeError):
+        style.normal.spaceAfter = 50
+    assert style.normal.spaceAfter == Style().normal.spaceAfter
+
+
+def test_get_style_copy():
+    normal = deepcopy(get_style().normal)
+    normal.spaceAfter = 50
+    clone = get_style().normal.clone("Clone", spaceBefore=50)
+
+    assert type(normal) == ParagraphStyle
+    assert normal.spaceAfter == 50
+    assert type(clone) == ParagraphStyle
+    assert clone.spaceBefore == 50
+    assert get_style().normal.spaceBefore == Style().normal.spaceBefore
+
+
 def test_std_aspect_image():
     file_name = "a.png"
     path = RESOURCES / file_name
@@ -39,6 +94,162 @@ def test_std_aspect_image():
     assert file_name in image.identity()
 
 
+def test_std_aspect_image_cached(monkeypatch):
+    read_files = []
+    read_bytes = Path.read_bytes
+
+    def monkey_read_bytes(self):
+        read_files.append(self)
+        return read_bytes(self)
+
+    IMAGE_CACHE.clear()
+    monkeypatch.setattr(Path, "read_bytes", monkey_read_bytes)
+    path = RESOURCES / "b.png"
+    image_1 = get_std_aspect_image(path, width=80)
+    image_2 = get_std_aspect_image(path, width=40)
+
+    assert len(read_files) == 1
+    assert image_1.drawWidth == 80
+    assert image_2.drawWidth == 40
+    assert image_1.drawHeight == 2 * image_2.drawHeight
+
+
+def test_image_cache_hit():
+    cache = ImageCache()
+    path = RESOURCES / "a.png"
+    cached = cache.get(path)
+
+    assert cache.get(path) is cached
+    assert cache.get(path.resolve()) is cached
+    assert len(cached.payload) == path.stat().st_size
+    assert len(cached.reader.getRGBData()) == cached.width * cached.height * 3
+    assert cache.nbytes == (
+        len(cached.payload)
+        + len(cached.reader.getRGBData())
+        + len(cached.reader._dataA.getRGBData())
+    )
+    assert len(cache) == 1
+
+
+def test_image_cache_changed_file(tmp_path):
+    cache = ImageCache()
+    path = tmp_path / "image.png"
+    path.write_bytes((RESOURCES / "a.png").read_bytes())
+    cached = cache.get(path)
+    path.write_bytes((RESOURCES / "b.png").read_bytes())
+
+    assert cache.get(path).payload == (RESOURCES / "b.png").read_bytes()
+    assert cache.get(path) is not cached
+
+
+def test_image_cache_budget():
+    sizes = {}
+    for name in "abc":
+        cache = ImageCache()
+        cache.get(RESOURCES / f"{name}.png")
+        sizes[name] = cache.nbytes
+    cache = ImageCache(max_bytes=sizes["a"] + sizes["b"])
+    for name in "abc":
+        cache.get(RESOURCES / f"{name}.png")
+
+    assert cache.nbytes <= cache.max_bytes
+    assert 0 < len(cache) < 3
+
+    cache = ImageCache(max_bytes=0)
+    cache.get(RESOURCES / "a.png")
+
+    assert len(cache) == 0
+
+
+def test_image_cache_prefetch(tmp_path, monkeypatch):
+    read_files = []
+    read_bytes = Path.read_bytes
+    release = threading.Event()
+
+    def monkey_read_bytes(self):
+        read_files.append(self.name)
+        release.wait(5)
+        return read_bytes(self)
+
+    monkeypatch.setattr(Path, "read_bytes", monkey_read_bytes)
+    cache = ImageCache()
+    names = ["a.png", "b.png", "missing.png"]
+    futures = cache.prefetch(RESOURCES / name for name in names)
+    waiting = threading.Thread(target=cache.get, args=(RESOURCES / "a.png",))
+    waiting.start()
+    release.set()
+    waiting.join()
+
+    assert futures[0].result() is cache.get(RESOURCES / "a.png")
+    assert futures[1].result().width > 0
+    with pytest.raises(OSError):
+        futures[2].result()
+    assert sorted(read_files) == ["a.png", "b.png"]
+    assert len(cache) == 2
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="processes are not forked")
+def test_image_cache_fork():
+    cache = ImageCache()
+    cache.prefetch([RESOURCES / "a.png"])[0].result()
+    # a read in progress in a thread of the parent when it forks
+    cache._loading["key"] = Future()
+    cache._lock.acquire()
+
+    pid = os.fork()
+    if pid == 0:
+        clean = not cache._loading and cache._pool is None
+        cached = cache.prefetch([RESOURCES / "a.png"])[0].result(5)
+        os._exit(0 if clean and cached.width > 0 else 1)
+    cache._lock.release()
+
+    assert os.waitpid(pid, 0)[1] == 0
+
+
+def test_std_aspect_image_jpeg(tmp_path):
+    path = tmp_path / "image.jpg"
+    PILImage.open(RESOURCES / "a.png").convert("RGB").save(path)
+    Item = namedtuple("Item", ["text", "image"])
+    for name in ("first.pdf", "second.pdf"):
+        doc = PDFDoc(tmp_path / name)
+        doc.add_item(Item("question", path))
+        doc.add_sub_item(Item("answer", path))
+        doc.build()
+
+    for name in ("first.pdf", "second.pdf"):
+        assert (tmp_path / name).read_bytes().count(b"/DCTDecode") == 1
+
+
+@pytest.mark.parametrize("fallback", ["reader", "image"])
+def test_std_aspect_image_fallback(tmp_path, monkeypatch, fallback):
+    # ReportLab keeps decoded pixels in private attributes, that may change
+    if fallback == "reader":
+        monkeypatch.setattr(rlwrapper, "_known_reader", lambda reader: False)
+    else:
+        monkeypatch.setattr(
+            rlwrapper,
+            "DecodedImage",
+            lambda reader, payload, **kwargs: Image(BytesIO(payload), **kwargs),
+        )
+    IMAGE_CACHE.clear()
+    file = tmp_path / "temp.pdf"
+    doc = PDFDoc(file)
+    Item = namedtuple("Item", ["text", "image"])
+    doc.add_item(Item("question", RESOURCES / "a.png"))
+    doc.build()
+    IMAGE_CACHE.clear()
+
+    assert b"/Subtype /Image" in file.read_bytes()
+
+
+def test_known_reader():
+    reader = IMAGE_CACHE.get(RESOURCES / "a.png").reader
+    assert rlwrapper._known_reader(reader)
+    del reader._dataA
+    assert not rlwrapper._known_reader(reader)
+    IMAGE_CACHE.clear()
+
+
 def test_std_aspect_image_fail(caplog):
     file_name = Path("not_exist.png")
     path = RESOURCES / file_name
@@ -47,6 +258,57 @@ def test_std_aspect_image_fail(caplog):
     assert caplog.record_tuples[0][1] == logging.CRITICAL
 
 
+def test_flowable_cache():
+    cache = FlowableCache(max_items=2)
+    built = []
+
+    def build(text):
+        built.append(text)
+        return WrapOnceParagraph(text, get_style().normal)
+
+    first = cache.get("a", lambda: build("a"))
+    assert cache.get("a", lambda: build("a")) is first
+    cache.get("b", lambda: build("b"))
+    cache.get("a", lambda: build("a"))
+    cache.get("c", lambda: build("c"))
+    assert len(cache) == 2
+    assert cache.get("a", lambda: build("a")) is first
+    cache.get("b", lambda: build("b"))
+
+    assert built == ["a", "b", "c", "b"]
+
+
+def test_wrap_once_paragraph(monkeypatch):
+    paragraph = WrapOnceParagraph("some text " * 50, get_style().normal)
+    size = paragraph.wrap(300, 800)
+    calls = []
+    monkeypatch.setattr(
+        "reportlab.platypus.Paragraph.breakLines",
+        lambda self, *args: calls.append(args),
+    )
+
+    assert paragraph.wrap(300, 800) == size
+    assert calls == []
+
+
+def test_pdfdoc_flowable_cache(tmp_path):
+    Item = namedtuple("Item", ["text", "image"])
+    cache = FlowableCache()
+    for number in range(2):
+        file = tmp_path / f"temp{number}.pdf"
+        doc = PDFDoc(file, flowable_cache=cache)
+        # the same answers and separators, moved to the next page many times
+        for question in range(40):
+            repeat = 400 if question % 3 == 0 else 2
+            doc.add_item(Item(f"question {question} " * repeat, Path(".")))
+            doc.add_sub_item(Item("yes", Path(".")))
+            doc.add_sub_item(Item("no", Path(".")))
+        doc.build()
+
+        assert file.exists()
+    assert len(cache) == 43
+
+
 def test_pdf_separator():
     doc = PDFDoc(Path("file"))
 
@@ -61,6 +323,31 @@ def test_pdfdoc(tmp_path):
     assert file.exists()
 
 
+def test_pdfdoc_buffer(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Item = namedtuple("Item", ["text", "image"])
+    buffer = BytesIO()
+    doc = PDFDoc(buffer)
+    doc.add_item(Item("question", Path(".")))
+    doc.build()
+
+    assert buffer.getvalue().startswith(b"%PDF")
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("page_numbering", ["replay", "form"])
+def test_pdfdoc_page_numbering(tmp_path, page_numbering):
+    Item = namedtuple("Item", ["text", "image"])
+    file = tmp_path / "temp.pdf"
+    doc = PDFDoc(file)
+    for number in range(3):
+        doc.add_item(Item("question " * 1000, Path(".")))
+    doc.build(page_numbering)
+
+    forms = b"/FormXob.pageNumber" in file.read_bytes()
+    assert forms == (page_numbering == "form")
+
+
 def test_pdfdoc1(tmp_path):
     image = str(RESOURCES / "a.png")
     Item = namedtuple("Item", ["text", "image"])
@@ -138,3 +425,99 @@ def test_pdfdoc2(tmp_path):
     assert doc._top_item_start == 3
 
     assert file.exists()
+
+
+def test_flowable_stream():
+    source = iter(range(5))
+
+    def refill():
+        value = next(source, None)
+        if value is None:
+            return False
+        stream.append(value)
+        return True
+
+    stream = FlowableStream(refill)
+    taken = []
+    while len(stream):
+        taken.append(stream[0])
+        del stream[0]
+
+    assert taken == [0, 1, 2, 3, 4]
+
+
+def test_pdfdoc_build_stream(tmp_path, monkeypatch):
+    monkeypatch.setattr(rl_config, "invariant", 1)
+    Item = namedtuple("Item", ["text", "image"])
+    items = [
+        (number % 3 == 0, Item(f"item {number} " * (20 + number), Path(".")))
+        for number in range(60)
+    ]
+    whole = PDFDoc(tmp_path / "whole.pdf")
+    for top, item in items:
+        whole.add_item(item) if top else whole.add_sub_item(item)
+    whole.build("form")
+
+    stream = PDFDoc(tmp_path / "stream.pdf")
+    source = iter(items)
+    pending = []
+
+    def feed():
+        pending.append(list.__len__(stream._doc))
+        top, item = next(source, (None, None))
+        if item is None:
+            return False
+        stream.add_item(item) if top else stream.add_sub_item(item)
+        return True
+
+    stream.build_stream(feed)
+
+    assert max(pending) <= 1
+    stream_bytes = (tmp_path / "stream.pdf").read_bytes()
+    assert stream_bytes == (tmp_path / "whole.pdf").read_bytes()
+
+
+@pytest.mark.parametrize(
+    "page_number, expected",
+    [(1, (1, 2)), (2, (2, 2)), (3, (1, 1)), (4, (1, 3)), (6, (3, 3))],
+)
+def test_section_page(page_number, expected):
+    assert _section_page(page_number, [1, 3, 4], 6) == expected
+
+
+@pytest.mark.parametrize(
+    "page_numbering, canvas_class",
+    [("replay", NumberedCanvas), ("form", FormNumberedCanvas)],
+)
+def test_pdfdoc_sections(tmp_path, monkeypatch, page_numbering, canvas_class):
+    numbers = []
+    monkeypatch.setattr(
+        canvas_class,
+        "draw_page_number",
+        lambda self, number, count: numbers.append((number, count)),
+    )
+    Item = namedtuple("Item", ["text", "image"])
+    image = RESOURCES / "a.png"
+    file = tmp_path / "temp.pdf"
+    doc = PDFDoc(file)
+    for section, pages in (("first", 2), ("second", 1)):
+        doc.add_section(section, heading=f"{section} heading")
+        doc.add_item(Item("question " * 700 * pages, image))
+        doc.add_sub_item(Item("answer", Path(".")))
+    doc.build(page_numbering)
+
+    first = numbers[0][1]
+    second = len(numbers) - first
+    assert first > second > 0
+    assert numbers == [(number, first) for number in range(1, first + 1)] + [
+        (number, second) for number in range(1, second + 1)
+    ]
+    content = file.read_bytes()
+    assert b"/Outlines" in content
+    assert b"(first)" in content and b"(second)" in content
+
+    single = PDFDoc(tmp_path / "single.pdf")
+    single.add_item(Item("question", image))
+    single.build(page_numbering)
+    images = (tmp_path / "single.pdf").read_bytes().count(b"/Subtype /Image")
+    assert content.count(b"/Subtype /Image") == images
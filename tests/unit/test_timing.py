@@ -0,0 +1,118 @@
+import logging
+import threading
+
+import pytest
+
+import batch
+import timing
+from exam import MultiChoiceQuest, MultiChoiceAnswer, Exam
+from parameter import get_default
+from timing import StageTimer, STAGES
+
+
+def test_stage_timer_disabled():
+    timer = StageTimer()
+    with timer.stage("load"):
+        pass
+
+    assert timer.records() == {}
+
+
+def test_stage_timer():
+    timer = StageTimer()
+    timer.enable()
+    try:
+        with timer.stage("load"):
+            pass
+        for number in range(2):
+            with timer.variant(number):
+                with timer.stage("layout"):
+                    with timer.stage("image"):
+                        data = bytearray(2**20)
+                    del data
+                with timer.stage("layout"):
+                    pass
+    finally:
+        timer.disable()
+
+    records = timer.records()
+    assert set(records) == {
+        (None, "load"),
+        (0, "image"),
+        (0, "layout"),
+        (1, "image"),
+        (1, "layout"),
+    }
+    count, wall, cpu, peak = records[(0, "layout")]
+    assert count == 2
+    assert wall >= 0 and cpu >= 0
+    # the peak of the inner stage is also the one of the outer stage
+    assert peak >= 2**20
+    assert "variant   1 layout" in timer.summary()
+
+
+def test_stage_timer_merge():
+    timer = StageTimer()
+    timer.merge({(0, "layout"): [1, 2.0, 1.0, 10]})
+    timer.merge({(0, "layout"): [1, 1.0, 1.0, 5], (1, "layout"): [1, 1.0, 1.0, 5]})
+
+    assert timer.records() == {
+        (0, "layout"): [2, 3.0, 2.0, 10],
+        (1, "layout"): [1, 1.0, 1.0, 5],
+    }
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_instrument(tmp_path, caplog, workers):
+    question = MultiChoiceQuest("question 1", "subject 1")
+    question.answers = (MultiChoiceAnswer("answer 1"), MultiChoiceAnswer("answer 2"))
+    parameters = get_default()
+    parameters["number"] = 2
+    parameters["workers"] = workers
+
+    with caplog.at_level(logging.INFO):
+        with timing.instrument("cprofile", tmp_path) as stages:
+            with stages.stage("load"):
+                exam = Exam(question)
+            batch.generate(exam, parameters, tmp_path)
+
+    assert not stages.enabled
+    assert not STAGES.enabled
+    assert (tmp_path / timing.PROFILE_FILE_NAME).exists()
+    for variant in range(2):
+        for stage in ("shuffle", "items", "layout"):
+            assert (variant, stage) in stages.records()
+    assert "stage timing" in caplog.text
+    assert "variant   1 layout" in caplog.text
+
+
+def test_instrument_concurrent(tmp_path):
+    # every conversion has a timer of its own, whatever thread it runs in
+    timers = {}
+    started = threading.Barrier(2)
+
+    def convert(number):
+        with timing.instrument("timing", tmp_path) as stages:
+            started.wait()
+            with STAGES.variant(number):
+                with STAGES.stage("layout"):
+                    started.wait()
+        timers[number] = stages
+
+    threads = [threading.Thread(target=convert, args=(n,)) for n in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert timers[0] is not timers[1]
+    for number in range(2):
+        assert list(timers[number].records()) == [(number, "layout")]
+    assert not STAGES.enabled
+
+
+def test_instrument_unknown(tmp_path, caplog):
+    with timing.instrument("unknown", tmp_path) as stages:
+        assert not stages.enabled
+
+    assert caplog.record_tuples[0][1] == logging.WARNING
@@ -1,5 +1,7 @@
+import logging
 import pytest
-from utility import exception_printer, safe_int
+from utility import CSVReader, exception_printer, safe_int
+from unit_helper import save_mono_question_data
 
 
 def test_exception_printer0():
@@ -14,3 +16,46 @@ def test_safe_int(number, expected):
     result = safe_int(number)
 
     assert result == expected
+
+
+def test_csvreader(tmp_path):
+    data_file = tmp_path / "data.csv"
+    save_mono_question_data(data_file)
+    reader = CSVReader(str(data_file))
+
+    rows = reader.to_dictlist()
+
+    assert [row["question"] for row in rows] == ["Q1", "Q2"]
+    assert list(reader.iter_rows()) == rows
+
+
+def test_csvreader_stream(tmp_path):
+    data_file = tmp_path / "data.csv"
+    reader = CSVReader(str(data_file), stream=True)
+    save_mono_question_data(data_file)
+
+    rows = reader.iter_rows()
+
+    assert next(rows)["question"] == "Q1"
+    assert next(rows)["question"] == "Q2"
+    with pytest.raises(StopIteration):
+        next(rows)
+    assert reader.to_dictlist() == CSVReader(str(data_file)).to_dictlist()
+
+
+def test_csvreader_stream_not_found(tmp_path):
+    reader = CSVReader(str(tmp_path / "data.csv"), stream=True)
+
+    with pytest.raises(FileNotFoundError):
+        list(reader.iter_rows())
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_csvreader_encoding_error(tmp_path, caplog, stream):
+    data_file = tmp_path / "data.csv"
+    data_file.write_bytes("question\nQ1\nQ2\n".encode() + "Q3 è\n".encode("latin-1"))
+
+    with pytest.raises(UnicodeError):
+        CSVReader(str(data_file), stream=stream).to_dictlist()
+    assert caplog.record_tuples[-1][1] == logging.ERROR
+    assert "at row 3" in caplog.record_tuples[-1][2]